@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+قياس أداء واجهة API على بيانات اصطناعية قابلة للتكرار
+- يملأ قاعدة بيانات مؤقتة بمستخدمين وطلبات من الأنواع الستة وملفات PDF ومواعيد واستشارات
+- يستدعي المسارات الحقيقية عبر Flask test client (افتراضياً) أو عبر خادم gunicorn محلي
+- يطبع تقرير JSON لكل مسار: p50/p95/p99 والإنتاجية وعدد الاستعلامات لكل طلب
+- عند تمرير --baseline يُقارن التقرير بتقرير سابق ويُنهى بالرمز 1 عند وجود تراجع
+
+الاستخدام:
+    python benchmarks/bench_api.py --users 1000 --requests 20000 --output report.json
+    python benchmarks/bench_api.py --gunicorn --workers 4 --concurrency 8
+    python benchmarks/bench_api.py --baseline report.json --max-regression 0.25
+"""
+
+import argparse
+import http.cookiejar
+import json
+import os
+import platform
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import (
+    BACKEND_DIR, QueryCounter, create_bench_app, latency_summary, login, seed_appointments,
+    seed_consultations, seed_pdfs, seed_requests, seed_users, seeded_national_id
+)
+
+# (الاسم، الدور، الطريقة، المسار، عدد مرات التكرار كنسبة من --iterations)
+ENDPOINTS = [
+    ('login', 'anonymous', 'POST', '/api/login', 1.0),
+    ('user_requests', 'user', 'GET', '/api/requests', 1.0),
+    ('user_pdf_files', 'user', 'GET', '/api/pdf/user-files', 1.0),
+    ('admin_requests', 'admin', 'GET', '/api/admin/requests?limit=50', 1.0),
+    ('admin_requests_filtered', 'admin', 'GET', '/api/admin/requests?limit=50&type=appointment&status=pending', 1.0),
+    ('dashboard_stats', 'admin', 'GET', '/api/admin/dashboard/stats', 1.0),
+    ('export_ndjson', 'admin', 'GET', '/api/admin/export/requests?format=ndjson', 0.02),
+]
+
+
+class TestClientSession:
+    """جلسة عبر Flask test client داخل نفس العملية"""
+
+    def __init__(self, app, national_id=None):
+        self.client = app.test_client()
+        if national_id:
+            login(self.client, national_id)
+
+    def request(self, method, path, payload=None):
+        response = self.client.open(path, method=method, json=payload)
+        body = response.get_data()
+        return response.status_code, len(body)
+
+
+class HttpSession:
+    """جلسة HTTP حقيقية مع ملفات تعريف الارتباط (لخادم gunicorn أو أي خادم خارجي)"""
+
+    def __init__(self, base_url, national_id=None):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+        if national_id:
+            status, _ = self.request('POST', '/api/login', {'national_id': national_id})
+            if status != 200:
+                raise RuntimeError(f'login failed for {national_id}: {status}')
+
+    def request(self, method, path, payload=None):
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            req.add_header('Content-Type', 'application/json')
+        try:
+            with self.opener.open(req, timeout=120) as response:
+                return response.status, len(response.read())
+        except urllib.error.HTTPError as error:
+            return error.code, len(error.read())
+
+
+def seed(app, args):
+    """ملء قاعدة البيانات بالأحجام المطلوبة وإرجاع الأعداد الفعلية"""
+    started = time.perf_counter()
+    seed_users(app, args.users)
+    seed_requests(app, args.requests)
+    seed_pdfs(app, args.pdfs)
+    seed_appointments(app, args.appointments)
+    seed_consultations(app, args.consultations)
+    return round(time.perf_counter() - started, 1)
+
+
+def table_counts(app):
+    from src.models import db, User, Request, PDFFile, Appointment, Consultation
+    with app.app_context():
+        return {
+            model.__tablename__: db.session.query(db.func.count(model.id)).scalar()
+            for model in (User, Request, PDFFile, Appointment, Consultation)
+        }
+
+
+def sample_user_ids(app, count):
+    """أرقام هوية المستخدمين الذين تُوزع عليهم طلبات المستخدم (من لديهم طلبات)"""
+    from src.models import db, User, Request
+    with app.app_context():
+        rows = db.session.query(User.national_id).join(Request, Request.user_id == User.id).filter(
+            User.national_id != 'admin'
+        ).distinct().order_by(User.national_id).limit(count).all()
+    return [national_id for (national_id,) in rows] or [seeded_national_id(0)]
+
+
+def run_endpoint(sessions_per_worker, endpoint, iterations, national_ids):
+    """
+    تنفيذ مسار واحد بعدد مرات محدد موزع على العمال
+    sessions_per_worker: لكل عامل قاموس {الدور: [جلسات]}
+    """
+    name, role, method, path, _ = endpoint
+    workers = len(sessions_per_worker)
+    durations = [[] for _ in range(workers)]
+    errors = [0] * workers
+    statuses = [{} for _ in range(workers)]
+
+    def work(index):
+        sessions = sessions_per_worker[index]
+        for i in range(index, iterations, workers):
+            payload = None
+            if role == 'anonymous':
+                session = sessions['anonymous'][0]
+                payload = {'national_id': national_ids[i % len(national_ids)]}
+            else:
+                pool = sessions[role]
+                session = pool[i % len(pool)]
+            started = time.perf_counter()
+            status, _ = session.request(method, path, payload)
+            durations[index].append(time.perf_counter() - started)
+            statuses[index][status] = statuses[index].get(status, 0) + 1
+            if status >= 400:
+                errors[index] += 1
+
+    started = time.perf_counter()
+    if workers == 1:
+        work(0)
+    else:
+        threads = [threading.Thread(target=work, args=(index,)) for index in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+
+    merged_statuses = {}
+    for worker_statuses in statuses:
+        for status, count in worker_statuses.items():
+            merged_statuses[str(status)] = merged_statuses.get(str(status), 0) + count
+    result = {'endpoint': name, 'method': method, 'path': path}
+    result.update(latency_summary([d for worker in durations for d in worker], elapsed))
+    result['errors'] = sum(errors)
+    result['statuses'] = merged_statuses
+    return result
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(db_path, upload_folder, workers, extra_args):
+    """تشغيل gunicorn على قاعدة البيانات المملوءة والانتظار حتى يستجيب"""
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', UPLOAD_FOLDER=upload_folder)
+    command = [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+               '--workers', str(workers), '--log-level', 'warning'] + extra_args + ['src.main:create_app()']
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('gunicorn exited before accepting connections')
+        try:
+            urllib.request.urlopen(base_url + '/api/check-session', timeout=2)
+            return process, base_url
+        except urllib.error.HTTPError:
+            return process, base_url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('gunicorn did not start within 60 seconds')
+
+
+def environment_info(app, mode):
+    from src.models import db
+    from src.utils import jsonlib
+    with app.app_context():
+        dialect = db.engine.dialect.name
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        'mode': mode,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'database': dialect,
+        'sqlite_version': sqlite3.sqlite_version if dialect == 'sqlite' else None,
+        'json_backend': jsonlib.BACKEND,
+        'git_revision': revision,
+    }
+
+
+def compare_with_baseline(report, baseline, max_regression):
+    """مقارنة p95 وعدد الاستعلامات لكل مسار مع تقرير سابق وإرجاع قائمة التراجعات"""
+    previous = {item['endpoint']: item for item in baseline.get('endpoints', [])}
+    regressions = []
+    for item in report['endpoints']:
+        before = previous.get(item['endpoint'])
+        if not before:
+            continue
+        if before.get('p95_ms') and item.get('p95_ms') and \
+                item['p95_ms'] > before['p95_ms'] * (1 + max_regression):
+            regressions.append({
+                'endpoint': item['endpoint'], 'metric': 'p95_ms',
+                'baseline': before['p95_ms'], 'current': item['p95_ms'],
+            })
+        if before.get('queries_per_request') is not None and item.get('queries_per_request') is not None and \
+                item['queries_per_request'] > before['queries_per_request']:
+            regressions.append({
+                'endpoint': item['endpoint'], 'metric': 'queries_per_request',
+                'baseline': before['queries_per_request'], 'current': item['queries_per_request'],
+            })
+        if item['errors'] > before.get('errors', 0):
+            regressions.append({
+                'endpoint': item['endpoint'], 'metric': 'errors',
+                'baseline': before.get('errors', 0), 'current': item['errors'],
+            })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--pdfs', type=int, default=2000)
+    parser.add_argument('--appointments', type=int, default=2000)
+    parser.add_argument('--consultations', type=int, default=2000)
+    parser.add_argument('--iterations', type=int, default=200, help='عدد مرات استدعاء كل مسار')
+    parser.add_argument('--sample-users', type=int, default=20, help='عدد المستخدمين الذين تُوزع عليهم الطلبات')
+    parser.add_argument('--endpoints', help='أسماء المسارات مفصولة بفواصل (الافتراضي: الكل)')
+    parser.add_argument('--db', help='ملف SQLite؛ إن كان موجوداً ومملوءاً يُعاد استخدامه دون إعادة الملء')
+    parser.add_argument('--gunicorn', action='store_true', help='القياس عبر خادم gunicorn محلي')
+    parser.add_argument('--workers', type=int, default=2, help='عدد عمليات gunicorn')
+    parser.add_argument('--gunicorn-args', default='', help='خيارات إضافية لـ gunicorn')
+    parser.add_argument('--base-url', help='القياس عبر خادم يعمل مسبقاً على نفس قاعدة البيانات')
+    parser.add_argument('--concurrency', type=int, default=1, help='عدد العملاء المتزامنين (وضع HTTP فقط)')
+    parser.add_argument('--output', help='حفظ التقرير في ملف JSON')
+    parser.add_argument('--baseline', help='تقرير سابق للمقارنة')
+    parser.add_argument('--max-regression', type=float, default=0.25, help='نسبة التراجع المسموحة في p95')
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='sehhaty-bench-'), 'bench.db')
+    app = create_bench_app(db_path)
+    counts = table_counts(app)
+    seed_seconds = None
+    if counts['request'] == 0:
+        seed_seconds = seed(app, args)
+        counts = table_counts(app)
+
+    endpoints = ENDPOINTS
+    if args.endpoints:
+        wanted = set(args.endpoints.split(','))
+        endpoints = [endpoint for endpoint in ENDPOINTS if endpoint[0] in wanted]
+    national_ids = sample_user_ids(app, args.sample_users)
+
+    server = None
+    if args.gunicorn:
+        server, base_url = start_gunicorn(db_path, app.config['UPLOAD_FOLDER'], args.workers,
+                                          args.gunicorn_args.split())
+        mode = 'gunicorn'
+    elif args.base_url:
+        base_url = args.base_url
+        mode = 'http'
+    else:
+        base_url = None
+        mode = 'test_client'
+
+    try:
+        if base_url:
+            def make_session(national_id=None):
+                return HttpSession(base_url, national_id)
+            workers = max(1, args.concurrency)
+        else:
+            def make_session(national_id=None):
+                return TestClientSession(app, national_id)
+            workers = 1
+
+        sessions_per_worker = [{
+            'anonymous': [make_session()],
+            'admin': [make_session('admin')],
+            'user': [make_session(national_id) for national_id in national_ids],
+        } for _ in range(workers)]
+
+        results = []
+        for endpoint in endpoints:
+            iterations = max(1, int(args.iterations * endpoint[4]))
+            # تسخين: طلب واحد قبل القياس لتعبئة الذواكر المؤقتة وتجميع الاستعلامات
+            run_endpoint(sessions_per_worker[:1], endpoint, 1, national_ids)
+            if base_url:
+                result = run_endpoint(sessions_per_worker, endpoint, iterations, national_ids)
+                result['queries_per_request'] = None
+            else:
+                with QueryCounter(app) as counter:
+                    result = run_endpoint(sessions_per_worker, endpoint, iterations, national_ids)
+                result['queries_per_request'] = round(counter.count / iterations, 2)
+            results.append(result)
+            print(f"{result['endpoint']:26} p50={result['p50_ms']}ms p95={result['p95_ms']}ms "
+                  f"p99={result['p99_ms']}ms rps={result['throughput_rps']} q={result['queries_per_request']}",
+                  file=sys.stderr)
+    finally:
+        if server:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report = {
+        'environment': environment_info(app, mode),
+        'config': {
+            'iterations': args.iterations, 'concurrency': workers,
+            'gunicorn_workers': args.workers if args.gunicorn else None,
+            'sample_users': len(national_ids),
+        },
+        'data': dict(counts, seed_seconds=seed_seconds),
+        'endpoints': results,
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as handle:
+            report['regressions'] = compare_with_baseline(report, json.load(handle), args.max_regression)
+        exit_code = 1 if report['regressions'] else 0
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            handle.write(output + '\n')
+    print(output)
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+قياس عدد الاستعلامات وزمن الاستجابة للمسارات المحمية مع ذاكرة المستخدم المصادق المؤقتة وبدونها
+
+الاستخدام:
+    python benchmarks/bench_auth.py --iterations 500
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import (
+    QueryCounter, create_bench_app, login, seed_requests, seed_users, seeded_national_id
+)
+
+ENDPOINTS = [
+    ('user', '/api/requests/999999999'),
+    ('user', '/api/pdf/user-files'),
+    ('admin', '/api/admin/statistics'),
+]
+
+
+def measure(app, clients, iterations):
+    results = []
+    for role, url in ENDPOINTS:
+        client = clients[role]
+        client.get(url)
+        with QueryCounter(app) as counter:
+            started = time.perf_counter()
+            for _ in range(iterations):
+                client.get(url)
+            elapsed = time.perf_counter() - started
+        results.append({
+            'endpoint': url,
+            'queries_per_request': round(counter.count / iterations, 2),
+            'mean_ms': round(elapsed / iterations * 1000, 3),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=500)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='sehhaty-bench-'), 'bench.db')
+    app = create_bench_app(db_path)
+    seed_users(app, 10)
+    seed_requests(app, 50)
+    clients = {
+        'admin': login(app.test_client(), 'admin'),
+        'user': login(app.test_client(), seeded_national_id(0)),
+    }
+
+    report = {}
+    for label, ttl in [('without_cache', 0), ('with_cache', 30)]:
+        app.config['AUTH_CACHE_TTL'] = ttl
+        report[label] = measure(app, clients, args.iterations)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
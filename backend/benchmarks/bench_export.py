@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+مقارنة تصدير الطلبات الحالي (JSON كامل) مع التصدير المتدفق (NDJSON/CSV)
+يقيس لكل صيغة: زمن أول بايت، الزمن الكلي، حجم الاستجابة، وذروة الذاكرة المقيمة
+
+الاستخدام:
+    python benchmarks/bench_export.py --requests 100000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import create_bench_app, login, peak_rss_kb, seed_requests, seed_users
+
+FORMATS = ['json', 'ndjson', 'csv']
+
+
+def run_worker(db_path, export_format):
+    """تشغيل تصدير واحد في عملية مستقلة حتى لا تتأثر قياسات الذاكرة ببعضها"""
+    app = create_bench_app(db_path)
+    client = login(app.test_client())
+    baseline_rss = peak_rss_kb()
+
+    started = time.perf_counter()
+    response = client.get(f'/api/admin/export/requests?format={export_format}', buffered=False)
+    chunks = iter(response.response)
+    first = next(chunks, b'')
+    ttfb = time.perf_counter() - started
+    size = len(first)
+    for chunk in chunks:
+        size += len(chunk)
+    total = time.perf_counter() - started
+    response.close()
+
+    print(json.dumps({
+        'format': export_format,
+        'status': response.status_code,
+        'ttfb_ms': round(ttfb * 1000, 1),
+        'total_ms': round(total * 1000, 1),
+        'bytes': size,
+        'peak_rss_kb': peak_rss_kb(),
+        'rss_growth_kb': peak_rss_kb() - baseline_rss,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=50000)
+    parser.add_argument('--formats', default=','.join(FORMATS))
+    parser.add_argument('--worker', nargs=2, metavar=('DB', 'FORMAT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='sehhaty-bench-'), 'bench.db')
+    app = create_bench_app(db_path)
+    seed_users(app, args.users)
+    seed_requests(app, args.requests)
+
+    results = []
+    for export_format in args.formats.split(','):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--worker', db_path, export_format],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(json.dumps({'users': args.users, 'requests': args.requests, 'results': results},
+                     ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
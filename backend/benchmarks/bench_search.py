@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+مقارنة البحث القديم (LIKE '%q%' على أربعة أعمدة) مع فهرس البحث الحالي على بيانات اصطناعية كبيرة
+يقيس زمن الاستعلام الوسيط لكل نوع بحث ويعرض عدد النتائج لكل طريقة
+
+الاستخدام:
+    python benchmarks/bench_search.py --users 1000000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import create_bench_app, seed_users, seeded_national_id
+
+PAGE_SIZE = 20
+
+
+def legacy_filter(User, q):
+    return (
+        User.full_name.contains(q) |
+        User.national_id.contains(q) |
+        User.email.contains(q) |
+        User.phone.contains(q)
+    )
+
+
+def timed(query, repeat):
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = query.order_by(None).limit(PAGE_SIZE).all()
+        durations.append(time.perf_counter() - started)
+    return round(statistics.median(durations) * 1000, 2), len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='sehhaty-bench-'), 'bench.db')
+    app = create_bench_app(db_path)
+    started = time.perf_counter()
+    seed_users(app, args.users)
+    seed_seconds = time.perf_counter() - started
+
+    from src.models import db, User
+    from src.utils.search import get_search_backend
+
+    queries = {
+        'اسم كامل': 'عبدالله الشهري',
+        'اسم بكتابة مختلفة': 'اسامه',
+        'اسم عائلة بدون ال': 'قحطاني',
+        'بادئة رقم الهوية': seeded_national_id(args.users // 2)[:8],
+        'رقم هوية كامل': seeded_national_id(args.users - 1),
+        'بادئة الجوال': '0500012',
+    }
+    results = []
+    with app.app_context():
+        backend = get_search_backend(db)
+        for label, q in queries.items():
+            legacy_ms, legacy_rows = timed(User.query.filter(legacy_filter(User, q)), args.repeat)
+            indexed_ms, indexed_rows = timed(User.query.filter(backend.user_filter(User, q)), args.repeat)
+            results.append({
+                'query': label, 'text': q,
+                'legacy_ms': legacy_ms, 'legacy_rows': legacy_rows,
+                'indexed_ms': indexed_ms, 'indexed_rows': indexed_rows,
+            })
+
+    print(json.dumps({
+        'users': args.users, 'backend': backend.name,
+        'seed_seconds': round(seed_seconds, 1), 'results': results
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+قياس زمن بدء عملية العامل: كل تكرار في عملية Python جديدة حتى لا تؤثر الوحدات المحملة مسبقاً
+- import: استيراد src.main وحده (لا يحمّل المسارات ولا يتصل بقاعدة البيانات)
+- create_app: إنشاء التطبيق، وعدد الاتصالات المفتوحة أثناءه (يجب أن يكون 0)
+- first_response: من بداية العملية حتى أول استجابة لـ /api/check-session
+- worker_with_bootstrap: ما كانت تفعله كل عملية سابقاً عند الاستيراد (التطبيق + التهيئة) على قاعدة موجودة
+- bootstrap_fresh و bootstrap_existing: أمر التهيئة على قاعدة جديدة وعلى قاعدة مهيأة
+مع --importtime تُطبع أبطأ الوحدات حسب python -X importtime
+
+الاستخدام:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --repeat 10 --importtime 15
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPTS = {
+    'import': """
+import time
+started = time.perf_counter()
+import src.main
+result = {'seconds': time.perf_counter() - started}
+""",
+    'create_app': """
+import time
+started = time.perf_counter()
+from src.main import create_app
+app = create_app()
+from src.utils.database import pool_stats
+result = {'seconds': time.perf_counter() - started, 'connects': pool_stats.connects}
+""",
+    'first_response': """
+import time
+started = time.perf_counter()
+from src.main import create_app
+response = create_app().test_client().get('/api/check-session')
+assert response.status_code == 200, response.status_code
+result = {'seconds': time.perf_counter() - started}
+""",
+    'worker_with_bootstrap': """
+import time
+started = time.perf_counter()
+from src.main import create_app
+from src.utils.bootstrap import bootstrap
+app = create_app()
+bootstrap(app)
+response = app.test_client().get('/api/check-session')
+assert response.status_code == 200, response.status_code
+result = {'seconds': time.perf_counter() - started}
+""",
+    'bootstrap': """
+import time
+started = time.perf_counter()
+from src.main import create_app
+from src.utils.bootstrap import bootstrap
+bootstrap(create_app())
+result = {'seconds': time.perf_counter() - started}
+""",
+}
+
+
+def run_script(name, env):
+    code = SCRIPTS[name] + '\nimport json\nprint(json.dumps(result))\n'
+    output = subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    seconds = [sample['seconds'] for sample in samples]
+    summary = {
+        'runs': len(seconds),
+        'median_ms': round(statistics.median(seconds) * 1000, 1),
+        'min_ms': round(min(seconds) * 1000, 1),
+        'max_ms': round(max(seconds) * 1000, 1),
+    }
+    if 'connects' in samples[0]:
+        summary['db_connects'] = max(sample['connects'] for sample in samples)
+    return summary
+
+
+def slowest_imports(env, limit):
+    """أبطأ الوحدات عند استيراد src.main وإنشاء التطبيق (الزمن التراكمي بالمللي ثانية)"""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'from src.main import create_app; create_app()'],
+                            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        if not name.startswith(' '):
+            rows.append((int(cumulative), name.strip()))
+    rows.sort(reverse=True)
+    return [{'module': name, 'cumulative_ms': round(us / 1000, 1)} for us, name in rows[:limit]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--importtime', type=int, default=0, help='عدد الوحدات الأبطأ المطبوعة (0 لتعطيله)')
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix='sehhaty-startup-')
+    db_path = os.path.join(folder, 'startup.db')
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}')
+
+    report = {'python': sys.version.split()[0], 'repeat': args.repeat}
+    # قاعدة جديدة لكل تكرار حتى يُقاس إنشاء الجداول كل مرة
+    fresh = []
+    for _ in range(args.repeat):
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        fresh.append(run_script('bootstrap', env))
+    report['bootstrap_fresh'] = summarize(fresh)
+    report['bootstrap_existing'] = summarize([run_script('bootstrap', env) for _ in range(args.repeat)])
+    for name in ('import', 'create_app', 'first_response', 'worker_with_bootstrap'):
+        report[name] = summarize([run_script(name, env) for _ in range(args.repeat)])
+    if args.importtime:
+        report['slowest_imports'] = slowest_imports(env, args.importtime)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+قياس سرعة التحقق من بيانات إنشاء الطلبات عبر سجل المخططات لكل نوع طلب
+(بيانات صالحة، وبيانات ينقصها آخر حقل فتمر الفحوص على جميع الحقول قبل الخطأ)
+
+الاستخدام:
+    python benchmarks/bench_validation.py --iterations 100000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.request_schemas import get_schema
+
+PAYLOADS = {
+    'appointment': {'specialty': 'قلب', 'city': 'الرياض', 'preferredDate': '2025-03-01', 'preferredTime': '10:30'},
+    'consultation': {'consultationType': 'عامة', 'description': 'صداع مستمر'},
+    'medical_request': {'reportType': 'شامل', 'purpose': 'عمل'},
+    'medical_excuse': {'startDate': '2025-03-01', 'endDate': '2025-03-03', 'region': 'الرياض', 'workplace': 'شركة'},
+    'review_certificate': {'reviewDate': '2025-03-01', 'region': 'الرياض', 'workplace': 'شركة'},
+    'patient_companion_report': {
+        'patientName': 'مريض', 'patientNationalId': '1000000001', 'hospitalEntryDate': '2025-03-01',
+        'hospitalExitDate': '2025-03-05', 'medicalCondition': 'مستقرة', 'region': 'الرياض',
+        'companionName': 'مرافق', 'companionNationalId': '1000000002', 'relationship': 'أخ',
+    },
+}
+
+
+def measure(validate, payload, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        validate(payload)
+    elapsed = time.perf_counter() - started
+    return {
+        'validations_per_second': round(iterations / elapsed),
+        'mean_us': round(elapsed / iterations * 1e6, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=100000)
+    args = parser.parse_args()
+
+    report = {}
+    for request_type, payload in PAYLOADS.items():
+        stage = get_schema(request_type).create
+        incomplete = {key: value for key, value in payload.items() if key != stage.field_names[-1]}
+        if stage.validate(payload) is not None or stage.validate(incomplete) is None:
+            sys.exit(f'بيانات القياس لا تطابق مخطط {request_type}')
+        report[request_type] = {
+            'fields': len(stage.fields),
+            'valid': measure(stage.validate, payload, args.iterations),
+            'invalid': measure(stage.validate, incomplete, args.iterations),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
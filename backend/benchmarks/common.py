@@ -0,0 +1,272 @@
+"""
+أدوات مشتركة لسكربتات قياس الأداء
+تُنشئ التطبيق على قاعدة بيانات مؤقتة وتملؤها ببيانات اصطناعية
+"""
+
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+from datetime import datetime, time, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+REQUEST_TYPES = [
+    'appointment', 'consultation', 'medical_request',
+    'medical_excuse', 'review_certificate', 'patient_companion_report'
+]
+REQUEST_STATUSES = ['pending', 'in_progress', 'completed', 'cancelled']
+
+
+def create_bench_app(db_path):
+    """إنشاء التطبيق على ملف SQLite محدد وتهيئة مخططه (DATABASE_URL يُورث لخوادم gunicorn المحلية)"""
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    from src.main import create_app
+    from src.utils.bootstrap import bootstrap
+    app = create_app({'UPLOAD_FOLDER': tempfile.mkdtemp(prefix='sehhaty-bench-uploads-')})
+    bootstrap(app)
+    return app
+
+
+def sample_request_data(request_type, rnd):
+    """بيانات طلب اصطناعية قريبة من الحقيقية لكل نوع"""
+    day = (datetime(2025, 1, 1) + timedelta(days=rnd.randint(0, 365))).strftime('%Y-%m-%d')
+    region = rnd.choice(['الرياض', 'مكة المكرمة', 'المنطقة الشرقية', 'القصيم'])
+    if request_type == 'appointment':
+        return {'specialty': rnd.choice(['طب الأسرة', 'الباطنة', 'الأطفال']), 'city': region,
+                'preferredDate': day, 'preferredTime': 'morning'}
+    if request_type == 'consultation':
+        return {'consultationType': 'immediate', 'description': 'صداع مستمر ' * rnd.randint(1, 20)}
+    if request_type == 'medical_request':
+        return {'reportType': 'تقرير طبي', 'purpose': 'جهة العمل'}
+    if request_type == 'medical_excuse':
+        return {'startDate': day, 'endDate': day, 'region': region, 'workplace': 'وزارة الصحة'}
+    if request_type == 'review_certificate':
+        return {'reviewDate': day, 'region': region, 'workplace': 'وزارة التعليم'}
+    return {
+        'patientName': 'مريض تجريبي', 'patientNationalId': '1098765432',
+        'hospitalEntryDate': day, 'hospitalExitDate': day,
+        'medicalCondition': 'حالة مستقرة ' * rnd.randint(10, 200), 'region': region,
+        'companionName': 'مرافق تجريبي', 'companionNationalId': '1012345678', 'relationship': 'ابن'
+    }
+
+
+def seeded_national_id(index):
+    """رقم الهوية للمستخدم الاصطناعي رقم index (يبدأ من 0)"""
+    return f'1{index:09d}'
+
+
+def seed_users(app, count, batch_size=5000, seed=1):
+    """إدراج مستخدمين اصطناعيين دفعة واحدة لكل batch_size"""
+    from src.models import db, User
+    from src.utils.search import build_search_name
+    rnd = random.Random(seed)
+    first_names = ['محمد', 'أحمد', 'عبدالله', 'فاطمة', 'عائشة', 'إبراهيم', 'أسامة', 'نورة']
+    family_names = ['العتيبي', 'القحطاني', 'الشهري', 'الغامدي', 'الدوسري', 'الزهراني']
+    now = datetime.utcnow()
+    with app.app_context():
+        start = db.session.query(db.func.count(User.id)).filter(User.national_id != 'admin').scalar()
+        for offset in range(0, count, batch_size):
+            rows = []
+            for i in range(offset, min(offset + batch_size, count)):
+                n = start + i
+                full_name = f'{rnd.choice(first_names)} {rnd.choice(first_names)} {rnd.choice(family_names)}'
+                rows.append({
+                    'full_name': full_name,
+                    'search_name': build_search_name(full_name),
+                    'national_id': seeded_national_id(n),
+                    'email': f'user{n}@example.com',
+                    'phone': f'05{n % 100000000:08d}',
+                    'status': 'active',
+                    'registration_date': now - timedelta(minutes=n),
+                })
+            db.session.execute(db.insert(User), rows)
+            db.session.commit()
+
+
+def seed_requests(app, count, batch_size=5000, seed=2):
+    """إدراج طلبات اصطناعية من جميع الأنواع موزعة على المستخدمين الموجودين"""
+    from src.models import db, User, Request
+    rnd = random.Random(seed)
+    now = datetime.utcnow()
+    with app.app_context():
+        user_ids = [uid for (uid,) in db.session.query(User.id).filter(User.national_id != 'admin')]
+        for offset in range(0, count, batch_size):
+            rows = []
+            for i in range(offset, min(offset + batch_size, count)):
+                request_type = rnd.choice(REQUEST_TYPES)
+                created = now - timedelta(seconds=i * 37)
+                rows.append({
+                    'user_id': rnd.choice(user_ids),
+                    'type': request_type,
+                    'status': rnd.choice(REQUEST_STATUSES),
+                    'data': json.dumps(sample_request_data(request_type, rnd), ensure_ascii=False),
+                    'created_date': created,
+                    'updated_date': created,
+                })
+            db.session.execute(db.insert(Request), rows)
+            db.session.commit()
+
+
+def _request_ids(db, Request, request_type=None):
+    query = db.session.query(Request.id, Request.user_id)
+    if request_type:
+        query = query.filter(Request.type == request_type)
+    return query.order_by(Request.id).all()
+
+
+def seed_pdfs(app, count, batch_size=5000, seed=3):
+    """
+    إنشاء ملفات PDF صغيرة حقيقية في مجلد الرفع وسجلاتها، مرتبطة بطلبات التقارير الطبية أولاً
+    حتى تعيد /api/pdf/user-files ملفات فعلية يُفحص وجودها على القرص
+    """
+    from src.models import db, Request, PDFFile
+    rnd = random.Random(seed)
+    folder = app.config['UPLOAD_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    now = datetime.utcnow()
+    with app.app_context():
+        targets = _request_ids(db, Request, 'medical_request') or _request_ids(db, Request)
+        if not targets:
+            return
+        for offset in range(0, count, batch_size):
+            rows = []
+            for i in range(offset, min(offset + batch_size, count)):
+                request_id, _ = targets[i % len(targets)]
+                filename = f'bench_{request_id}_{i}.pdf'
+                file_path = os.path.join(folder, filename)
+                content = b'%PDF-1.4\n' + os.urandom(rnd.randint(512, 4096)) + b'\n%%EOF\n'
+                with open(file_path, 'wb') as handle:
+                    handle.write(content)
+                rows.append({
+                    'request_id': request_id,
+                    'filename': filename,
+                    'original_filename': f'تقرير_{i}.pdf',
+                    'file_path': file_path,
+                    'file_size': len(content),
+                    'mime_type': 'application/pdf',
+                    'upload_date': now - timedelta(seconds=i * 11),
+                    'uploaded_by': 'admin',
+                    'is_active': True,
+                })
+            db.session.execute(db.insert(PDFFile), rows)
+            db.session.commit()
+
+
+def seed_appointments(app, count, batch_size=5000, seed=4):
+    """إنشاء مواعيد مرتبطة بطلبات المواعيد الموجودة"""
+    from src.models import db, Request, Appointment
+    rnd = random.Random(seed)
+    now = datetime.utcnow()
+    with app.app_context():
+        targets = _request_ids(db, Request, 'appointment')
+        if not targets:
+            return
+        for offset in range(0, count, batch_size):
+            rows = []
+            for i in range(offset, min(offset + batch_size, count)):
+                request_id, user_id = targets[i % len(targets)]
+                rows.append({
+                    'request_id': request_id,
+                    'user_id': user_id,
+                    'doctor_name': f'د. طبيب {i % 50}',
+                    'specialty': rnd.choice(['طب الأسرة', 'الباطنة', 'الأطفال']),
+                    'hospital_name': rnd.choice(['مستشفى الملك فهد', 'مستشفى الملك خالد']),
+                    'appointment_date': (now + timedelta(days=rnd.randint(1, 60))).date(),
+                    'appointment_time': time(rnd.randint(8, 15), rnd.choice([0, 30])),
+                    'status': rnd.choice(['scheduled', 'completed', 'cancelled']),
+                    'confirmation_number': f'APT-BENCH-{i:08d}',
+                    'created_at': now,
+                    'updated_at': now,
+                })
+            db.session.execute(db.insert(Appointment), rows)
+            db.session.commit()
+
+
+def seed_consultations(app, count, batch_size=5000, seed=5):
+    """إنشاء استشارات مرتبطة بطلبات الاستشارات الموجودة"""
+    from src.models import db, Request, Consultation
+    rnd = random.Random(seed)
+    now = datetime.utcnow()
+    with app.app_context():
+        targets = _request_ids(db, Request, 'consultation')
+        if not targets:
+            return
+        for offset in range(0, count, batch_size):
+            rows = []
+            for i in range(offset, min(offset + batch_size, count)):
+                request_id, user_id = targets[i % len(targets)]
+                rows.append({
+                    'request_id': request_id,
+                    'user_id': user_id,
+                    'doctor_name': f'د. استشاري {i % 30}',
+                    'specialty': rnd.choice(['طب الأسرة', 'الباطنة', 'الأطفال']),
+                    'whatsapp_number': f'05{i % 100000000:08d}',
+                    'consultation_type': rnd.choice(['immediate', 'scheduled']),
+                    'status': rnd.choice(REQUEST_STATUSES),
+                    'duration_minutes': 30,
+                    'created_at': now,
+                    'updated_at': now,
+                })
+            db.session.execute(db.insert(Consultation), rows)
+            db.session.commit()
+
+
+def percentile(sorted_values, pct):
+    """النسبة المئوية بطريقة أقرب رتبة على قائمة مرتبة"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def latency_summary(durations, elapsed):
+    """ملخص زمن الاستجابة (بالمللي ثانية) والإنتاجية لقائمة أزمنة بالثواني"""
+    ordered = sorted(durations)
+    summary = {'count': len(ordered)}
+    for pct in (50, 95, 99):
+        value = percentile(ordered, pct)
+        summary[f'p{pct}_ms'] = round(value * 1000, 3) if value is not None else None
+    summary['mean_ms'] = round(sum(ordered) / len(ordered) * 1000, 3) if ordered else None
+    summary['throughput_rps'] = round(len(ordered) / elapsed, 1) if elapsed > 0 else None
+    return summary
+
+
+def login(client, national_id='admin'):
+    """تسجيل الدخول عبر الواجهة الحقيقية"""
+    response = client.post('/api/login', json={'national_id': national_id})
+    if response.status_code != 200:
+        raise RuntimeError(f'login failed for {national_id}: {response.status_code}')
+    return client
+
+
+def peak_rss_kb():
+    """أقصى استهلاك للذاكرة المقيمة للعملية الحالية بالكيلوبايت"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class QueryCounter:
+    """عدّاد استعلامات SQL المنفذة على محرك قاعدة البيانات أثناء كتلة with"""
+
+    def __init__(self, app):
+        self.app = app
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        from sqlalchemy import event
+        from src.models import db
+        with self.app.app_context():
+            self.engine = db.engine
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        from sqlalchemy import event
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+اختبار حمل مختلط لأنواع عمليات gunicorn: تحميلات PDF بطيئة مع طلبات API سريعة في نفس الوقت
+- عملاء بطيئون يحملون ملف PDF كبيراً بمعدل قراءة محدود (--slow-rate) فيحجزون العملية التي تخدمهم
+- عملاء سريعون يستدعون مسارات API خفيفة طوال المدة ويُقاس زمن الاستجابة والإنتاجية
+- يُكرر القياس لكل نوع عمليات (sync و gthread و gevent إن كانت مثبتة) بنفس عدد العمليات ونفس البيانات،
+  ويطبع تقرير JSON للمقارنة؛ مع sync تتوقف طلبات API عندما يساوي عدد التحميلات البطيئة عدد العمليات
+
+الاستخدام:
+    python benchmarks/load_mixed.py
+    python benchmarks/load_mixed.py --modes sync,gthread,gevent --workers 2 --slow-clients 2 --seconds 15
+"""
+
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_api import start_gunicorn
+from benchmarks.common import create_bench_app, latency_summary, seed_requests, seed_users, seeded_national_id
+
+FAST_PATHS = ['/api/check-session', '/api/requests?limit=20', '/api/profile']
+
+
+def create_large_pdf(app, size_mb):
+    """ملف PDF كبير مرتبط بطلب للمستخدم الاصطناعي الأول؛ يُرجع معرفه"""
+    from src.models import db, PDFFile, Request, User
+    path = os.path.join(app.config['UPLOAD_FOLDER'], 'large.pdf')
+    with open(path, 'wb') as f:
+        f.write(b'%PDF-1.4\n')
+        chunk = os.urandom(1024 * 1024)
+        for _ in range(size_mb):
+            f.write(chunk)
+        f.write(b'\n%%EOF\n')
+    with app.app_context():
+        user = User.query.filter_by(national_id=seeded_national_id(0)).one()
+        request_id = db.session.query(Request.id).filter(Request.user_id == user.id).limit(1).scalar()
+        pdf_file = PDFFile(request_id=request_id, filename='large.pdf', original_filename='large.pdf',
+                           file_path=path, file_size=os.path.getsize(path), content_hash=PDFFile.compute_hash(path))
+        db.session.add(pdf_file)
+        db.session.commit()
+        return pdf_file.id
+
+
+def login_cookie(host, port, national_id):
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    connection.request('POST', '/api/login', body=json.dumps({'national_id': national_id}),
+                       headers={'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    response.read()
+    connection.close()
+    if response.status != 200:
+        raise RuntimeError(f'login failed for {national_id}: {response.status}')
+    return response.getheader('Set-Cookie').split(';', 1)[0]
+
+
+def slow_download(host, port, cookie, path, rate, stop, results):
+    """تحميل متكرر بمعدل قراءة محدود (بايت/ثانية) حتى إشارة التوقف"""
+    received, completed, chunk = 0, 0, 16 * 1024
+    while not stop.is_set():
+        sock = socket.create_connection((host, port), timeout=60)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 64 * 1024)
+        try:
+            sock.sendall(f'GET {path} HTTP/1.1\r\nHost: {host}\r\nCookie: {cookie}\r\n'
+                         f'Connection: close\r\n\r\n'.encode())
+            while not stop.is_set():
+                data = sock.recv(chunk)
+                if not data:
+                    completed += 1
+                    break
+                received += len(data)
+                time.sleep(len(data) / rate)
+        except OSError:
+            pass
+        finally:
+            sock.close()
+    results.append((received, completed))
+
+
+def fast_client(host, port, cookie, deadline, results, index):
+    durations, errors = [], 0
+    i = index
+    while time.perf_counter() < deadline:
+        path = FAST_PATHS[i % len(FAST_PATHS)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=max(deadline - started, 0.1) + 5)
+            connection.request('GET', path, headers={'Cookie': cookie})
+            response = connection.getresponse()
+            response.read()
+            connection.close()
+            if response.status >= 500:
+                errors += 1
+                continue
+        except OSError:
+            errors += 1
+            continue
+        durations.append(time.perf_counter() - started)
+    results.append((durations, errors))
+
+
+def run_mode(mode, db_path, upload_folder, args, file_id):
+    # threads > 1 يحول sync إلى gthread في gunicorn
+    threads = args.threads if mode == 'gthread' else 1
+    extra = ['-c', 'gunicorn.conf.py', '--worker-class', mode, '--threads', str(threads),
+             '--worker-connections', str(args.worker_connections), '--timeout', '120']
+    server, base_url = start_gunicorn(db_path, upload_folder, args.workers, extra)
+    host, port = base_url.rsplit('//', 1)[1].split(':')
+    port = int(port)
+    try:
+        cookie = login_cookie(host, port, seeded_national_id(0))
+        stop = threading.Event()
+        slow_results, fast_results = [], []
+        slow_threads = [threading.Thread(target=slow_download, args=(
+            host, port, cookie, f'/api/pdf/download/{file_id}', args.slow_rate * 1024, stop, slow_results
+        )) for _ in range(args.slow_clients)]
+        for thread in slow_threads:
+            thread.start()
+        time.sleep(1)  # حتى تبدأ التحميلات البطيئة وتحجز العمليات قبل بدء القياس
+
+        started = time.perf_counter()
+        deadline = started + args.seconds
+        fast_threads = [threading.Thread(target=fast_client, args=(host, port, cookie, deadline, fast_results, i))
+                        for i in range(args.fast_clients)]
+        for thread in fast_threads:
+            thread.start()
+        for thread in fast_threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for thread in slow_threads:
+            thread.join()
+
+        durations = [d for thread_durations, _ in fast_results for d in thread_durations]
+        summary = {'mode': mode}
+        summary.update(latency_summary(durations, elapsed))
+        summary['errors'] = sum(errors for _, errors in fast_results)
+        summary['slow_download_kb'] = sum(received for received, _ in slow_results) // 1024
+        return summary
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default='sync,gthread,gevent')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8, help='لكل عملية gthread')
+    parser.add_argument('--worker-connections', type=int, default=100, help='لكل عملية gevent')
+    parser.add_argument('--slow-clients', type=int, default=2)
+    parser.add_argument('--slow-rate', type=int, default=256, help='معدل قراءة العميل البطيء (KB/s)')
+    parser.add_argument('--file-mb', type=int, default=64)
+    parser.add_argument('--fast-clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='sehhaty-load-'), 'load.db')
+    app = create_bench_app(db_path)
+    seed_users(app, args.users)
+    seed_requests(app, args.requests)
+    file_id = create_large_pdf(app, args.file_mb)
+
+    report = {'workers': args.workers, 'slow_clients': args.slow_clients, 'slow_rate_kbps': args.slow_rate,
+              'fast_clients': args.fast_clients, 'seconds': args.seconds, 'modes': []}
+    for mode in args.modes.split(','):
+        if mode == 'gevent' and importlib.util.find_spec('gevent') is None:
+            report['modes'].append({'mode': mode, 'skipped': 'gevent غير مثبتة'})
+            continue
+        report['modes'].append(run_mode(mode, db_path, app.config['UPLOAD_FOLDER'], args, file_id))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
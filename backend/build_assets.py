@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+بناء ملفات الواجهة الثابتة: بصمات المحتوى في أسماء الأصول ونسخ gzip/brotli مضغوطة مسبقاً
+يُشغل عند النشر بعد تثبيت المتطلبات؛ الخادم يقدم src/static_dist تلقائياً إذا وُجد فيه manifest.json
+
+الاستخدام:
+    python build_assets.py
+    python build_assets.py --source src/static --output src/static_dist
+"""
+
+import argparse
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils.assets import build_assets
+
+BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', default=os.path.join(BASE_DIR, 'static'))
+    parser.add_argument('--output', default=os.environ.get('STATIC_DIST_FOLDER', os.path.join(BASE_DIR, 'static_dist')))
+    parser.add_argument('--quiet', action='store_true')
+    args = parser.parse_args()
+    build_assets(args.source, args.output, log=(lambda message: None) if args.quiet else print)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+سكربت فحص خطط تنفيذ الاستعلامات الساخنة
+يشغّل EXPLAIN لكل استعلام ويتأكد من أنه يستخدم فهرساً بدلاً من فحص الجدول كاملاً
+
+الاستخدام:
+    python check_indexes.py                                     # قاعدة SQLite مؤقتة منشأة من النماذج
+    python check_indexes.py --database-url postgresql://...     # قاعدة PostgreSQL (مثلاً حاوية محلية)
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+
+def hot_queries(db, User, Request, PDFFile):
+    """الاستعلامات الأكثر تكراراً في المسارات كما تبنيها"""
+    since = datetime.utcnow() - timedelta(days=7)
+    newest_first = (Request.created_date.desc(), Request.id.desc())
+    return {
+        'طلبات المستخدم': Request.query.filter_by(user_id=1).order_by(*newest_first).limit(21),
+        'قائمة الإدارة حسب الحالة': Request.query.filter_by(status='pending').order_by(*newest_first).limit(21),
+        'قائمة الإدارة حسب النوع والحالة': Request.query.filter_by(type='medical_excuse', status='pending'),
+        'قائمة الإدارة الكاملة': Request.query.order_by(*newest_first).limit(21),
+        'طلبات آخر 7 أيام': db.session.query(db.func.count(Request.id)).filter(Request.created_date >= since),
+        'ملفات الطلب المفعلة': PDFFile.query.filter_by(request_id=1, is_active=True),
+        'قائمة ملفات الإدارة': PDFFile.query.order_by(PDFFile.upload_date.desc()).limit(50),
+        'المستخدمون الجدد': db.session.query(db.func.count(User.id)).filter(User.registration_date >= since),
+    }
+
+
+def compile_sql(db, query):
+    statement = query.statement if hasattr(query, 'statement') else query
+    return str(statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+
+
+def explain(db, sql):
+    """إرجاع (سطور الخطة، هل تحتوي على فحص كامل لجدول)"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        rows = db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')).all()
+        lines = [row[-1] for row in rows]
+        full_scan = any(line.startswith('SCAN ') and 'USING' not in line for line in lines)
+    else:
+        # على الجداول الصغيرة يفضل المخطط الفحص التسلسلي، لذا نعطله لنثبت أن الفهرس قابل للاستخدام
+        db.session.execute(db.text('SET LOCAL enable_seqscan = off'))
+        rows = db.session.execute(db.text(f'EXPLAIN {sql}')).all()
+        lines = [row[0] for row in rows]
+        full_scan = any('Seq Scan' in line for line in lines)
+    return lines, full_scan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-url', help='قاعدة البيانات المراد فحصها (الافتراضي: SQLite مؤقتة)')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = args.database_url or \
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='sehhaty-explain-'), 'explain.db')}"
+
+    from src.main import create_app
+    from src.models import db, User, Request, PDFFile
+
+    app = create_app()
+
+    failures = 0
+    with app.app_context():
+        db.create_all()
+        print(f"🔍 فحص خطط التنفيذ على {db.engine.dialect.name}")
+        for name, query in hot_queries(db, User, Request, PDFFile).items():
+            lines, full_scan = explain(db, compile_sql(db, query))
+            db.session.rollback()
+            print(f"{'❌' if full_scan else '✅'} {name}")
+            for line in lines:
+                print(f"     {line}")
+            failures += full_scan
+
+    if failures:
+        print(f"❌ {failures} استعلام(ات) بدون فهرس مناسب")
+        sys.exit(1)
+    print("✅ جميع الاستعلامات الساخنة تستخدم فهارس")
+
+
+if __name__ == '__main__':
+    main()
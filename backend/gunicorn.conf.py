@@ -0,0 +1,36 @@
+"""
+إعدادات gunicorn: gunicorn -c gunicorn.conf.py 'src.main:create_app()'
+(بعد flask --app src.main bootstrap مرة واحدة لكل نشر: المخطط والمدير الافتراضي)
+- GUNICORN_WORKER_CLASS=gthread (الافتراضي): كل عملية تخدم GUNICORN_THREADS طلباً في وقت واحد،
+  فلا يحجز تحميل ملف بطيء أو تصدير طويل العملية كلها كما في sync
+- GUNICORN_WORKER_CLASS=gevent (يتطلب pip install gevent): حتى GUNICORN_WORKER_CONNECTIONS طلب لكل عملية،
+  مع جعل psycopg2 متعاوناً عبر wait callback؛ الطلبات تنتظر مجمع الاتصالات (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+  بحد أقصى DB_POOL_TIMEOUT
+- GUNICORN_WORKER_CLASS=sync: السلوك السابق (طلب واحد لكل عملية)
+جلسات SQLAlchemy مرتبطة بسياق التطبيق (Flask-SQLAlchemy)، وهو مستقل لكل خيط ولكل greenlet
+- GUNICORN_PRELOAD: إنشاء التطبيق مرة واحدة في العملية الرئيسية قبل التفرع فتبدأ العمليات فوراً وتتشارك
+  الذاكرة؛ آمن لأن create_app لا يفتح اتصالات بقاعدة البيانات، ومعطل افتراضياً مع gevent لأن الترقيع
+  (monkey patching) يحدث بعد التفرع
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS') or 'gthread'
+# مع sync يجب أن يبقى 1، وإلا يحولها gunicorn تلقائياً إلى gthread
+threads = int(os.environ.get('GUNICORN_THREADS', 8 if worker_class == 'gthread' else 1))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+preload_app = os.environ.get('GUNICORN_PRELOAD', '0' if worker_class == 'gevent' else '1').lower() in ('1', 'true', 'yes')
+
+
+def post_fork(server, worker):
+    # الإعداد الفعلي (قد يُغير من سطر الأوامر عبر --worker-class)
+    if server.cfg.worker_class_str == 'gevent':
+        from src.utils.database import use_gevent_wait_callback
+        if use_gevent_wait_callback():
+            server.log.info('psycopg2 gevent wait callback installed (pid %s)', worker.pid)
@@ -8,32 +8,27 @@ import os
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from src.main import app
+from src.main import create_app
 from src.models import db, User, Request, PDFFile
+from src.utils.bootstrap import ensure_admin_user
+from src.utils.schema import create_missing_indexes, upgrade_schema
 from datetime import datetime
 
+app = create_app()
+
 def init_database():
     """تهيئة قاعدة البيانات"""
     with app.app_context():
         print("🔄 بدء تهيئة قاعدة البيانات...")
         
-        # إنشاء الجداول
+        # إنشاء الجداول وإضافة الأعمدة الناقصة للجداول الموجودة
         print("📋 إنشاء الجداول...")
-        db.create_all()
+        for column in upgrade_schema(db)[0]:
+            print(f"➕ تمت إضافة العمود {column}")
         
         # إنشاء المدير الافتراضي
         print("👤 إنشاء حساب المدير...")
-        admin_user = User.query.filter_by(national_id='admin').first()
-        if not admin_user:
-            admin_user = User(
-                full_name='مدير النظام',
-                national_id='admin',
-                email='admin@sehhaty.com',
-                phone='0000000000',
-                status='active'
-            )
-            admin_user.set_password('SehhatyAdmin2025!')
-            db.session.add(admin_user)
+        if ensure_admin_user():
             print("✅ تم إنشاء حساب المدير بنجاح")
         else:
             print("ℹ️ حساب المدير موجود مسبقاً")
@@ -163,34 +158,19 @@ def create_sample_requests():
         print(f"❌ خطأ في حفظ الطلبات التجريبية: {e}")
 
 def create_indexes():
-    """إنشاء الفهارس لتحسين الأداء"""
+    """
+    إنشاء الفهارس المعرفة على النماذج للجداول الموجودة مسبقاً
+    (db.create_all لا يضيف فهارس إلى جدول موجود)
+    """
     with app.app_context():
         print("🔍 إنشاء الفهارس...")
         
-        indexes = [
-            "CREATE INDEX IF NOT EXISTS idx_users_national_id ON user(national_id);",
-            "CREATE INDEX IF NOT EXISTS idx_users_email ON user(email);",
-            "CREATE INDEX IF NOT EXISTS idx_users_status ON user(status);",
-            "CREATE INDEX IF NOT EXISTS idx_requests_user_id ON request(user_id);",
-            "CREATE INDEX IF NOT EXISTS idx_requests_type ON request(type);",
-            "CREATE INDEX IF NOT EXISTS idx_requests_status ON request(status);",
-            "CREATE INDEX IF NOT EXISTS idx_requests_created_date ON request(created_date);",
-            "CREATE INDEX IF NOT EXISTS idx_pdf_files_request_id ON pdf_file(request_id);"
-        ]
-        
-        for index_sql in indexes:
-            try:
-                db.session.execute(index_sql)
-                print(f"✅ تم إنشاء الفهرس: {index_sql.split()[5]}")
-            except Exception as e:
-                print(f"⚠️ تحذير في إنشاء الفهرس: {e}")
-        
         try:
-            db.session.commit()
-            print("💾 تم حفظ جميع الفهارس بنجاح")
+            for index_name in create_missing_indexes(db):
+                print(f"✅ تم إنشاء الفهرس: {index_name}")
+            print("💾 جميع الفهارس جاهزة")
         except Exception as e:
-            db.session.rollback()
-            print(f"❌ خطأ في حفظ الفهارس: {e}")
+            print(f"⚠️ تحذير في إنشاء الفهارس: {e}")
 
 def check_database_health():
     """فحص صحة قاعدة البيانات"""
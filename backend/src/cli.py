@@ -0,0 +1,162 @@
+"""
+أوامر سطر الأوامر للصيانة
+الاستخدام: flask --app src.main <command>
+عند النشر: flask --app src.main bootstrap قبل تشغيل gunicorn
+"""
+
+import click
+from src.models import db
+
+
+def register_commands(app):
+    """تسجيل أوامر الصيانة على التطبيق"""
+
+    @app.cli.command('rebuild-stats-counters')
+    def rebuild_stats_counters():
+        """إعادة بناء جدول عدادات الطلبات من جدول الطلبات"""
+        from src.utils.stats import rebuild_counters
+        values = rebuild_counters()
+        db.session.commit()
+        click.echo(f"تمت إعادة بناء {len(values)} عداداً (إجمالي الطلبات: {values['total']})")
+
+    @app.cli.command('bootstrap')
+    def bootstrap_command():
+        """تهيئة النشر: المخطط ومجلد الرفع والمدير الافتراضي (مرة واحدة قبل تشغيل gunicorn)"""
+        from flask import current_app
+        from src.utils.bootstrap import bootstrap
+        columns, indexes, admin_created = bootstrap(current_app._get_current_object())
+        for name in columns:
+            click.echo(f"✅ تمت إضافة العمود {name}")
+        for name in indexes:
+            click.echo(f"✅ تم إنشاء الفهرس {name}")
+        if admin_created:
+            click.echo("✅ تم إنشاء حساب المدير الافتراضي")
+        click.echo("✅ قاعدة البيانات جاهزة")
+
+    @app.cli.command('upgrade-db')
+    def upgrade_db():
+        """إنشاء الجداول وإضافة الأعمدة والفهارس الناقصة"""
+        from src.utils.schema import upgrade_schema
+        columns, indexes = upgrade_schema(db)
+        for name in columns:
+            click.echo(f"✅ تمت إضافة العمود {name}")
+        for name in indexes:
+            click.echo(f"✅ تم إنشاء الفهرس {name}")
+        click.echo("✅ المخطط محدث")
+
+    @app.cli.command('backfill-request-fields')
+    @click.option('--batch-size', default=1000, show_default=True, help='عدد الطلبات في كل دفعة')
+    @click.option('--start-after-id', default=0, help='استئناف من بعد هذا المعرف')
+    def backfill_request_fields_command(batch_size, start_after_id):
+        """ملء أعمدة التخصص والمدينة والمنطقة والتواريخ من بيانات الطلبات الموجودة"""
+        from src.utils.backfill import backfill_request_fields
+        total = backfill_request_fields(
+            batch_size=batch_size,
+            start_after_id=start_after_id,
+            progress=lambda processed, last_id: click.echo(f"… {processed} طلب (آخر معرف {last_id})")
+        )
+        click.echo(f"✅ تم تحديث {total} طلب")
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index():
+        """إعادة حساب الأسماء الموحدة وإعادة بناء فهرس البحث"""
+        from src.utils.search import fill_search_names, get_search_backend
+        updated = fill_search_names(db, only_missing=False)
+        backend = get_search_backend(db)
+        backend.setup(db)
+        backend.rebuild(db)
+        click.echo(f"✅ تم تحديث {updated} مستخدم وإعادة بناء فهرس البحث ({backend.name})")
+
+    @app.cli.command('migrate-pdf-storage')
+    @click.option('--batch-size', default=500, show_default=True, help='عدد السجلات في كل دفعة')
+    def migrate_pdf_storage(batch_size):
+        """نقل ملفات PDF القديمة إلى التخزين بعنوان المحتوى (ab/cd/<sha256>.pdf)"""
+        from src.utils.storage import migrate_legacy_files
+        migrated, missing = migrate_legacy_files(
+            batch_size=batch_size,
+            progress=lambda count, last_id: click.echo(f"… {count} ملف (آخر معرف {last_id})")
+        )
+        click.echo(f"✅ تم نقل {migrated} ملف")
+        if missing:
+            click.echo(f"⚠️ {missing} سجل يشير إلى ملف غير موجود (راجع pdf-storage-fsck)")
+
+    @app.cli.command('pdf-storage-fsck')
+    @click.option('--gc', 'collect', is_flag=True, help='حذف الملفات اليتيمة والملفات المؤقتة المتروكة')
+    @click.option('--verify-hashes', is_flag=True, help='إعادة حساب بصمة كل ملف ومقارنتها باسمه')
+    @click.option('--grace-seconds', default=3600, show_default=True, help='تجاهل الملفات الأحدث من هذه المدة')
+    def pdf_storage_fsck(collect, verify_hashes, grace_seconds):
+        """فحص تطابق مجلد الرفع مع سجلات الملفات وحذف الملفات اليتيمة عند الطلب"""
+        import os
+        import shutil
+        from src.utils.storage import check_storage, release_blob, verify_blob_hashes
+        report = check_storage(grace_seconds=grace_seconds)
+        click.echo(f"الملفات على القرص: {report['files_on_disk']}")
+        click.echo(f"ملفات يتيمة: {len(report['orphans'])}")
+        for path in report['orphans']:
+            click.echo(f"  {path}")
+        click.echo(f"سجلات بلا ملف: {len(report['missing'])}")
+        for item in report['missing']:
+            click.echo(f"  #{item['id']} {item['file_path']}")
+        click.echo(f"اختلاف الحجم: {len(report['size_mismatch'])}")
+        for item in report['size_mismatch']:
+            click.echo(f"  #{item['id']} {item['recorded_size']} != {item['actual_size']}")
+        click.echo(f"ملفات مؤقتة متروكة: {len(report['stale_temp'])}")
+
+        if verify_hashes:
+            corrupted = verify_blob_hashes()
+            click.echo(f"ملفات لا تطابق بصمتها: {len(corrupted)}")
+            for path in corrupted:
+                click.echo(f"  {path}")
+
+        if collect:
+            removed = 0
+            # الملفات اليتيمة عبر release_blob: يعيد التحقق من المراجع ووقت التعديل تحت قفل المخزن
+            for path in report['orphans']:
+                if release_blob(path, grace_seconds=grace_seconds):
+                    removed += 1
+            for path in report['stale_temp']:
+                try:
+                    if os.path.isdir(path):
+                        shutil.rmtree(path)
+                    else:
+                        os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+            click.echo(f"✅ تم حذف {removed} ملف")
+
+    @app.cli.command('scan-pdf-files')
+    @click.option('--every', default=0, show_default=True, help='تكرار الفحص كل عدد من الثواني (0 لمرة واحدة)')
+    @click.option('--grace-seconds', default=3600, show_default=True, help='تجاهل الملفات اليتيمة الأحدث من هذه المدة')
+    @click.option('--batch-size', default=1000, show_default=True, help='عدد السجلات في كل دفعة تحديث')
+    def scan_pdf_files(every, grace_seconds, batch_size):
+        """فحص دوري لوجود ملفات PDF وأحجامها وتحديث حالتها في السجلات (لـ cron أو كعملية دائمة)"""
+        import time
+        from src.utils.storage import reconcile_storage
+        while True:
+            started = time.perf_counter()
+            report = reconcile_storage(grace_seconds=grace_seconds, batch_size=batch_size)
+            click.echo(
+                f"✅ {report['files_checked']} سجل، {report['files_on_disk']} ملف على القرص: "
+                f"{len(report['missing'])} مفقود، {len(report['size_mismatch'])} باختلاف الحجم، "
+                f"{len(report['orphans'])} يتيم ({time.perf_counter() - started:.2f} ث)"
+            )
+            if not every:
+                break
+            time.sleep(every)
+
+    @app.cli.command('pdf-worker')
+    @click.option('--processes', default=2, show_default=True, help='عدد عمليات المعالجة المتوازية')
+    @click.option('--poll-interval', default=2.0, show_default=True, help='الانتظار بين فحوص الطابور بالثواني')
+    @click.option('--once', is_flag=True, help='الخروج عند خلو الطابور')
+    def pdf_worker(processes, poll_interval, once):
+        """تنفيذ مهام معالجة ملفات PDF في الخلفية (النص، المعاينة، الضغط)"""
+        from src.utils.jobs import run_worker
+        click.echo(f"بدء معالجة المهام بـ {processes} عملية")
+        run_worker(processes=processes, poll_interval=poll_interval, once=once, log=click.echo)
+
+    @app.cli.command('enqueue-pdf-jobs')
+    def enqueue_pdf_jobs_command():
+        """إضافة مهام المعالجة الناقصة للملفات الموجودة"""
+        from src.utils.jobs import enqueue_missing_jobs
+        click.echo(f"✅ تمت إضافة {enqueue_missing_jobs()} مهمة")
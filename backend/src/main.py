@@ -3,78 +3,129 @@ import sys
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory
-from flask_cors import CORS
-from src.models import db, User, Request, PDFFile, Appointment, Consultation
-from src.routes.user import user_bp
-from src.routes.request import request_bp
-from src.routes.pdf import pdf_bp
-from src.routes.admin import admin_bp
-
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'sehhaty_secret_key_2025_secure'
-
-# تمكين CORS للسماح بالطلبات من الواجهة الأمامية
-CORS(app)
-
-# تسجيل المسارات
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(request_bp, url_prefix='/api')
-app.register_blueprint(pdf_bp, url_prefix='/api/pdf')
-app.register_blueprint(admin_bp, url_prefix='/api/admin')
-
-# إعداد قاعدة البيانات لـ PostgreSQL
-database_url = os.environ.get('DATABASE_URL')
-if database_url and database_url.startswith('postgres://'):
-    database_url = database_url.replace('postgres://', 'postgresql://', 1)
-
-app.config['SQLALCHEMY_DATABASE_URI'] = database_url or \
-    f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-# إعداد مجلد رفع الملفات
-UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'uploads')
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
-
-db.init_app(app)
-
-# إنشاء الجداول
-with app.app_context():
-    db.create_all()
-    
-    # إنشاء مستخدم إداري افتراضي إذا لم يكن موجوداً
-    admin_user = User.query.filter_by(national_id='admin').first()
-    if not admin_user:
-        admin_user = User(
-            full_name='مدير النظام',
-            national_id='admin',
-            email='admin@sehhaty.com',
-            phone='0000000000',
-            status='active'
-        )
-        admin_user.set_password('SehhatyAdmin2025!') # كلمة مرور قوية جديدة
-        db.session.add(admin_user)
-        db.session.commit()
-        print("تم إنشاء حساب المدير الافتراضي")
-
-@app.route('/', defaults={'path': ''}) 
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+from flask import Flask
+
+# الاستيراد داخل create_app: استيراد هذه الوحدة لا يحمّل المسارات والنماذج، وإنشاء التطبيق لا يتصل
+# بقاعدة البيانات؛ إنشاء الجداول والمدير الافتراضي في أمر مستقل يُشغل مرة واحدة عند النشر:
+#     flask --app src.main bootstrap
+
+
+def create_app(config=None):
+    """إنشاء التطبيق وإعداده من متغيرات البيئة؛ config يتجاوز أي إعداد قبل تهيئة قاعدة البيانات"""
+    from flask_cors import CORS
+    from src.models import db
+    from src.routes.user import user_bp
+    from src.routes.request import request_bp
+    from src.routes.pdf import pdf_bp
+    from src.routes.admin import admin_bp
+    from src.cli import register_commands
+    from src.utils.jsonlib import FastJSONProvider
+    from src.utils.metrics import init_metrics
+    from src.utils.database import engine_options, init_database
+    from src.utils.assets import asset_index, init_static_assets, send_asset
+    from src.utils.replica import init_replica, init_replica_engine
+    from src.utils.versioning import init_data_versions
+    from src.utils.stats import init_stats
+
+    app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
+    app.config['SECRET_KEY'] = 'sehhaty_secret_key_2025_secure'
+
+    # ترميز استجابات JSON عبر orjson إن كانت مثبتة
+    app.json = FastJSONProvider(app)
+
+    # تمكين CORS للسماح بالطلبات من الواجهة الأمامية
+    CORS(app)
+
+    # تسجيل المسارات
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(request_bp, url_prefix='/api')
+    app.register_blueprint(pdf_bp, url_prefix='/api/pdf')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+
+    # إعداد قاعدة البيانات لـ PostgreSQL
+    database_url = os.environ.get('DATABASE_URL')
+    if database_url and database_url.startswith('postgres://'):
+        database_url = database_url.replace('postgres://', 'postgresql://', 1)
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url or \
+        f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # نسخة قراءة اختيارية لمسارات الإدارة، ومدة القراءة من الأساسية بعد كتابة الجلسة
+    replica_url = os.environ.get('DATABASE_REPLICA_URL')
+    if replica_url and replica_url.startswith('postgres://'):
+        replica_url = replica_url.replace('postgres://', 'postgresql://', 1)
+    app.config['DATABASE_REPLICA_URL'] = replica_url
+    app.config['REPLICA_STICKY_SECONDS'] = float(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
+    # إعداد مجلد رفع الملفات (يُنشأ عند الحاجة وفي أمر bootstrap)؛ UPLOAD_FOLDER لقرص دائم خارج مجلد الشيفرة
+    app.config['UPLOAD_FOLDER'] = os.environ.get('UPLOAD_FOLDER') or os.path.join(os.path.dirname(__file__), 'uploads')
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+    # الحد الأقصى لحجم ملف PDF عبر الرفع المجزأ (كل جزء لا يتجاوز MAX_CONTENT_LENGTH)
+    app.config['MAX_PDF_UPLOAD_SIZE'] = int(os.environ.get('MAX_PDF_UPLOAD_SIZE', 200 * 1024 * 1024))
+
+    # مهام المعالجة بعد الرفع: metadata (النص وعدد الصفحات)، preview (صورة مصغرة)، optimize (ضغط وتهيئة للعرض)
+    # معطلة افتراضياً: تحتاج عملية pdf-worker دائمة تشارك مجلد الرفع مع خادم الويب
+    app.config['PDF_JOB_KINDS'] = [kind.strip() for kind in os.environ.get('PDF_JOBS', '').split(',') if kind.strip()]
+
+    # طريقة تسليم ملفات PDF: python أو x-accel (nginx) أو x-sendfile (Apache)
+    app.config['PDF_DELIVERY_MODE'] = os.environ.get('PDF_DELIVERY_MODE', 'python')
+    app.config['PDF_ACCEL_PREFIX'] = os.environ.get('PDF_ACCEL_PREFIX', '/protected-uploads/')
+
+    # إعدادات الإحصائيات: مدة الذاكرة المؤقتة بالثواني واستخدام جدول العدادات المجمعة
+    app.config['STATS_CACHE_TTL'] = int(os.environ.get('STATS_CACHE_TTL', 10))
+    app.config['STATS_USE_COUNTERS'] = os.environ.get('STATS_USE_COUNTERS', '').lower() in ('1', 'true', 'yes')
+
+    # مدة تخزين بيانات المستخدم المصادق مؤقتاً بالثواني (0 لتعطيلها)
+    app.config['AUTH_CACHE_TTL'] = int(os.environ.get('AUTH_CACHE_TTL', 5))
+
+    # ملفات الواجهة المبنية عبر build_assets.py (بصمات وضغط مسبق)؛ بدونها تُقدم src/static كما هي
+    app.config['STATIC_DIST_FOLDER'] = os.environ.get('STATIC_DIST_FOLDER', os.path.join(os.path.dirname(__file__), 'static_dist'))
+
+    # قياس زمن الطلبات واستعلاماتها (معطل افتراضياً، بدون أي كلفة عند التعطيل)
+    app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '').lower() in ('1', 'true', 'yes')
+    # رمز اختياري يسمح لـ Prometheus بقراءة /api/admin/metrics دون جلسة إدارة
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+
+    if config:
+        app.config.update(config)
+    # مجمع الاتصالات: DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_STATEMENT_TIMEOUT_MS,
+    # DB_PGBOUNCER=transaction، و DB_MAX_CONNECTIONS لتقسيم حد اتصالات الخادم على عمليات gunicorn
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+
+    init_replica(app, db)
+    db.init_app(app)
+    init_database(app, db)
+    init_replica_engine(app, db)
+    register_commands(app)
+    init_metrics(app, db)
+    init_data_versions()
+    init_stats()
+    init_static_assets(app, app.config['STATIC_DIST_FOLDER'])
+
+    @app.route('/', defaults={'path': ''}) 
+    @app.route('/<path:path>')
+    def serve(path):
+        static_assets = asset_index()
+        if static_assets is None:
+                return "Static folder not configured", 404
+
+        asset = static_assets.get(path) if path != "" else None
+        if asset is None:
+            asset = static_assets.get('index.html')
+            if asset is None:
+                return "index.html not found", 404
+        return send_asset(asset)
+
+    return app
+
+
+def __getattr__(name):
+    """src.main.app يُنشأ عند أول استخدام (gunicorn src.main:app، flask --app src.main، from src.main import app)"""
+    global app
+    if name == 'app':
+        app = create_app()
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 # إزالة هذا الجزء لأن Gunicorn سيتولى تشغيل التطبيق
 # if __name__ == '__main__':
@@ -3,6 +3,8 @@ from .request import Request
 from .pdf_file import PDFFile
 from .appointment import Appointment
 from .consultation import Consultation
+from .request_counter import RequestCounter
+from .pdf_job import PDFJob
 
-__all__ = ['db', 'User', 'Request', 'PDFFile', 'Appointment', 'Consultation']
+__all__ = ['db', 'User', 'Request', 'PDFFile', 'Appointment', 'Consultation', 'RequestCounter', 'PDFJob']
 
@@ -1,8 +1,26 @@
 from src.models.user import db
 from datetime import datetime
+import hashlib
 import os
 
+HASH_CHUNK_SIZE = 1024 * 1024
+TEXT_EXCERPT_LENGTH = 300
+
+def format_file_size(size):
+    """حجم الملف بصيغة مقروءة"""
+    if size < 1024:
+        return f"{size} B"
+    elif size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    else:
+        return f"{size / (1024 * 1024):.1f} MB"
+
 class PDFFile(db.Model):
+    __table_args__ = (
+        db.Index('idx_pdf_file_request_active', 'request_id', 'is_active'),  # ملفات الطلب المفعلة
+        db.Index('idx_pdf_file_upload_date', 'upload_date'),                 # قائمة ملفات الإدارة
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     request_id = db.Column(db.Integer, db.ForeignKey('request.id'), nullable=False)
     filename = db.Column(db.String(255), nullable=False)
@@ -14,47 +32,95 @@ class PDFFile(db.Model):
     uploaded_by = db.Column(db.String(50), default='admin')  # admin, system, user
     notes = db.Column(db.Text, nullable=True)
     is_active = db.Column(db.Boolean, default=True)
+    content_hash = db.Column(db.String(64), nullable=True)  # SHA-256 لمحتوى الملف (يُستخدم كـ ETag)
+    # نتائج المعالجة في الخلفية (pdf-worker)
+    processing_status = db.Column(db.String(20), nullable=True)  # pending, processing, done, failed
+    page_count = db.Column(db.Integer, nullable=True)
+    first_page_text = db.Column(db.Text, nullable=True)
+    preview_path = db.Column(db.String(500), nullable=True)
+    # حالة الملف على القرص كما سجلها آخر فحص دوري (scan-pdf-files)، فلا يلمس التسلسل نظام الملفات
+    exists_on_disk = db.Column(db.Boolean, nullable=True)  # None: لم يُفحص بعد
+    size_mismatch = db.Column(db.Boolean, default=False)
+    verified_at = db.Column(db.DateTime, nullable=True)
+
+    jobs = db.relationship('PDFJob', backref='pdf_file', lazy=True, cascade='all, delete-orphan')
 
     def __repr__(self):
         return f'<PDFFile {self.filename}>'
 
     def get_file_size_formatted(self):
         """إرجاع حجم الملف بصيغة مقروءة"""
-        size = self.file_size
-        if size < 1024:
-            return f"{size} B"
-        elif size < 1024 * 1024:
-            return f"{size / 1024:.1f} KB"
-        else:
-            return f"{size / (1024 * 1024):.1f} MB"
+        return format_file_size(self.file_size)
 
     def file_exists(self):
-        """التحقق من وجود الملف على القرص"""
+        """التحقق من وجود الملف على القرص (للعمليات فقط؛ التسلسل يستخدم exists_on_disk)"""
         return os.path.exists(self.file_path)
 
-    def delete_file(self):
-        """حذف الملف من القرص"""
-        try:
-            if self.file_exists():
-                os.remove(self.file_path)
-                return True
-        except Exception as e:
-            print(f"Error deleting file {self.file_path}: {e}")
-        return False
+    def mark_verified(self, exists=True, size_mismatch=False):
+        """تسجيل حالة الملف على القرص بعد التحقق منها"""
+        self.exists_on_disk = exists
+        self.size_mismatch = size_mismatch
+        self.verified_at = datetime.utcnow()
+
+    @staticmethod
+    def compute_hash(file_path):
+        """حساب SHA-256 لملف على دفعات دون تحميله كاملاً في الذاكرة"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as handle:
+            for chunk in iter(lambda: handle.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def ensure_content_hash(self):
+        """حساب بصمة المحتوى للملفات القديمة المرفوعة قبل إضافة العمود (يرفع FileNotFoundError إذا فُقد الملف)"""
+        if not self.content_hash:
+            self.content_hash = self.compute_hash(self.file_path)
+        return self.content_hash
 
     def to_dict(self):
+        excerpt = self.first_page_text[:TEXT_EXCERPT_LENGTH] if self.first_page_text else None
+        return self.serialize(self, excerpt, bool(self.preview_path))
+
+    @staticmethod
+    def summary_columns():
+        """
+        الأعمدة اللازمة لتسلسل الملف دون تحميل الكائن: مقتطف النص يُقتطع في SQL
+        ووجود المعاينة يُحسب كقيمة منطقية (يُستخدم مع serialize_row)
+        """
+        return (
+            PDFFile.id, PDFFile.request_id, PDFFile.filename, PDFFile.original_filename,
+            PDFFile.file_size, PDFFile.mime_type, PDFFile.upload_date, PDFFile.uploaded_by,
+            PDFFile.notes, PDFFile.is_active, PDFFile.processing_status, PDFFile.page_count,
+            db.func.substr(PDFFile.first_page_text, 1, TEXT_EXCERPT_LENGTH).label('text_excerpt'),
+            PDFFile.preview_path.isnot(None).label('has_preview'),
+            PDFFile.exists_on_disk, PDFFile.size_mismatch, PDFFile.verified_at,
+        )
+
+    @classmethod
+    def serialize_row(cls, row):
+        """تسلسل صف من summary_columns بنفس شكل to_dict"""
+        return cls.serialize(row, row.text_excerpt or None, bool(row.has_preview))
+
+    @staticmethod
+    def serialize(source, text_excerpt, has_preview):
+        """بيانات الملف من كائن PDFFile أو صف بنفس أسماء الأعمدة"""
         return {
-            'id': self.id,
-            'request_id': self.request_id,
-            'filename': self.filename,
-            'original_filename': self.original_filename,
-            'file_size': self.file_size,
-            'file_size_formatted': self.get_file_size_formatted(),
-            'mime_type': self.mime_type,
-            'upload_date': self.upload_date.isoformat() if self.upload_date else None,
-            'uploaded_by': self.uploaded_by,
-            'notes': self.notes,
-            'is_active': self.is_active,
-            'file_exists': self.file_exists()
+            'id': source.id,
+            'request_id': source.request_id,
+            'filename': source.filename,
+            'original_filename': source.original_filename,
+            'file_size': source.file_size,
+            'file_size_formatted': format_file_size(source.file_size),
+            'mime_type': source.mime_type,
+            'upload_date': source.upload_date.isoformat() if source.upload_date else None,
+            'uploaded_by': source.uploaded_by,
+            'notes': source.notes,
+            'is_active': source.is_active,
+            'processing_status': source.processing_status,
+            'page_count': source.page_count,
+            'text_excerpt': text_excerpt,
+            'has_preview': has_preview,
+            'file_exists': source.exists_on_disk,
+            'size_mismatch': bool(source.size_mismatch),
+            'verified_at': source.verified_at.isoformat() if source.verified_at else None
         }
-
@@ -0,0 +1,43 @@
+from src.models.user import db
+from datetime import datetime
+import json
+
+JOB_KINDS = ('metadata', 'preview', 'optimize')
+JOB_STATUSES = ('queued', 'running', 'done', 'failed')
+
+class PDFJob(db.Model):
+    """مهمة معالجة لاحقة لملف PDF تنفذها عملية pdf-worker في الخلفية"""
+    __tablename__ = 'pdf_job'
+    __table_args__ = (
+        db.UniqueConstraint('pdf_file_id', 'kind', name='uq_pdf_job_file_kind'),  # مهمة واحدة لكل نوع لكل ملف
+        db.Index('idx_pdf_job_status_run_after', 'status', 'run_after'),         # اختيار المهام الجاهزة
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    pdf_file_id = db.Column(db.Integer, db.ForeignKey('pdf_file.id', ondelete='CASCADE'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # metadata, preview, optimize
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(100), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    result = db.Column(db.Text, nullable=True)  # JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<PDFJob {self.id} {self.kind} {self.status}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'pdf_file_id': self.pdf_file_id,
+            'kind': self.kind,
+            'status': self.status,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'result': json.loads(self.result) if self.result else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
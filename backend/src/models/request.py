@@ -1,8 +1,67 @@
 from src.models.user import db
+from sqlalchemy.orm import joinedload, selectinload
+from src.utils import jsonlib
 from datetime import datetime
-import json
+
+REQUEST_TYPES = [
+    'appointment', 'consultation', 'medical_request',
+    'medical_excuse', 'review_certificate', 'patient_companion_report'
+]
+REQUEST_STATUSES = ['pending', 'in_progress', 'completed', 'cancelled']
+# انتقالات الحالة المسموحة في كل مسارات الإدارة (المجمعة والفردية): الطلب المكتمل يُعاد فتحه للتنفيذ، والملغي يعود للمراجعة
+ALLOWED_STATUS_TRANSITIONS = {
+    'pending': {'in_progress', 'completed', 'cancelled'},
+    'in_progress': {'pending', 'completed', 'cancelled'},
+    'completed': {'in_progress'},
+    'cancelled': {'pending'},
+}
+
+def is_allowed_transition(old_status, new_status):
+    """هل يُسمح بتغيير الحالة؛ إبقاء الحالة كما هي مسموح دائماً"""
+    return old_status == new_status or new_status in ALLOWED_STATUS_TRANSITIONS.get(old_status, ())
+
+# حقول data التي تُنسخ إلى أعمدة مفهرسة للفلترة في SQL؛ أول مفتاح موجود هو المعتمد
+PROMOTED_TEXT_FIELDS = {
+    'specialty': ['specialty'],
+    'city': ['city'],
+    'region': ['region'],
+}
+PROMOTED_DATE_FIELDS = {
+    'start_date': ['preferredDate', 'startDate', 'reviewDate', 'hospitalEntryDate'],
+    'end_date': ['endDate', 'hospitalExitDate'],
+}
+
+def _parse_date(value):
+    """تحويل تاريخ بصيغة YYYY-MM-DD، أو None إذا كانت الصيغة غير صحيحة"""
+    try:
+        return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+def extract_promoted_fields(data_dict):
+    """استخراج قيم الأعمدة المفهرسة من بيانات الطلب"""
+    values = {}
+    for column, keys in PROMOTED_TEXT_FIELDS.items():
+        value = next((data_dict.get(key) for key in keys if data_dict.get(key)), None)
+        values[column] = str(value)[:100] if value else None
+    for column, keys in PROMOTED_DATE_FIELDS.items():
+        value = next((data_dict.get(key) for key in keys if data_dict.get(key)), None)
+        values[column] = _parse_date(value) if value else None
+    return values
 
 class Request(db.Model):
+    # فهارس مركبة تطابق أنماط الوصول الفعلية (btree يُقرأ عكسياً لذا تخدم الترتيب التنازلي أيضاً)
+    __table_args__ = (
+        db.Index('idx_request_user_created', 'user_id', 'created_date', 'id'),    # طلبات المستخدم الأحدث أولاً
+        db.Index('idx_request_status_created', 'status', 'created_date', 'id'),  # قائمة الإدارة مفلترة بالحالة
+        db.Index('idx_request_type_status', 'type', 'status'),                   # الفلترة بالنوع والحالة والإحصائيات
+        db.Index('idx_request_created', 'created_date', 'id'),                   # القائمة العامة والتصفح بالمؤشر والفترات الزمنية
+        db.Index('idx_request_specialty', 'specialty'),
+        db.Index('idx_request_city', 'city'),
+        db.Index('idx_request_region', 'region'),
+        db.Index('idx_request_start_date', 'start_date'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     type = db.Column(db.String(50), nullable=False)  # appointment, consultation, medical_request
@@ -13,33 +72,57 @@ class Request(db.Model):
     updated_date = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     notes = db.Column(db.Text, nullable=True)
     
+    # حقول مستخرجة من data لتسهيل الفلترة (تُملأ عبر set_data)
+    specialty = db.Column(db.String(100), nullable=True)
+    city = db.Column(db.String(100), nullable=True)
+    region = db.Column(db.String(100), nullable=True)
+    start_date = db.Column(db.Date, nullable=True)  # preferredDate / startDate / reviewDate / hospitalEntryDate
+    end_date = db.Column(db.Date, nullable=True)  # endDate / hospitalExitDate
+    
     # العلاقات
     pdf_files = db.relationship('PDFFile', backref='request', lazy=True, cascade='all, delete-orphan')
 
     def __repr__(self):
         return f'<Request {self.id} - {self.type}>'
 
+    def _decode_cached(self, field):
+        """
+        فك JSON المخزن في الحقل مرة واحدة لكل قيمة نصية
+        النتيجة محفوظة على الكائن ومربوطة بالنص نفسه، فأي تعيين جديد للحقل (بما فيه set_data
+        أو إعادة التحميل من قاعدة البيانات) يُبطلها تلقائياً؛ لا تعدّل القاموس المُعاد مباشرة
+        """
+        raw = getattr(self, field)
+        cache_name = f'_{field}_decoded'
+        cached = self.__dict__.get(cache_name)
+        if cached is not None and cached[0] is raw:
+            return cached[1]
+        
+        try:
+            value = jsonlib.loads(raw) if raw else {}
+        except jsonlib.JSONDecodeError:
+            value = {}
+        self.__dict__[cache_name] = (raw, value)
+        return value
+
     def set_data(self, data_dict):
         """تحويل البيانات إلى JSON وحفظها"""
-        self.data = json.dumps(data_dict, ensure_ascii=False)
+        self.data = jsonlib.dumps(data_dict)
+        self.__dict__.pop('_data_decoded', None)
+        for column, value in extract_promoted_fields(data_dict).items():
+            setattr(self, column, value)
 
     def get_data(self):
         """استرجاع البيانات من JSON"""
-        try:
-            return json.loads(self.data) if self.data else {}
-        except json.JSONDecodeError:
-            return {}
+        return self._decode_cached('data')
 
     def set_processed_data(self, data_dict):
         """تحويل البيانات المعالجة إلى JSON وحفظها"""
-        self.processed_data = json.dumps(data_dict, ensure_ascii=False)
+        self.processed_data = jsonlib.dumps(data_dict)
+        self.__dict__.pop('_processed_data_decoded', None)
 
     def get_processed_data(self):
         """استرجاع البيانات المعالجة من JSON"""
-        try:
-            return json.loads(self.processed_data) if self.processed_data else {}
-        except json.JSONDecodeError:
-            return {}
+        return self._decode_cached('processed_data')
 
     def to_dict(self):
         return {
@@ -55,6 +138,14 @@ class Request(db.Model):
             'pdf_files': [pdf.to_dict() for pdf in self.pdf_files] if self.pdf_files else []
         }
 
+    @staticmethod
+    def eager_load_options():
+        """خيارات التحميل المسبق للمستخدم والملفات لتجنب استعلامات N+1 عند تسلسل القوائم"""
+        return (
+            joinedload(Request.user),
+            selectinload(Request.pdf_files),
+        )
+
     def to_dict_with_user(self):
         """إرجاع البيانات مع معلومات المستخدم"""
         result = self.to_dict()
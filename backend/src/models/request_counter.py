@@ -0,0 +1,11 @@
+from src.models.user import db
+
+class RequestCounter(db.Model):
+    """عدادات مجمعة للطلبات تُحدّث مع كل إنشاء أو تغيير حالة لتكون قراءة لوحة التحكم فورية"""
+    __tablename__ = 'request_counter'
+
+    name = db.Column(db.String(64), primary_key=True)  # total, status:<status>, type:<type>
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<RequestCounter {self.name}={self.value}>'
@@ -1,10 +1,18 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy.orm import validates
 from werkzeug.security import generate_password_hash, check_password_hash
+from src.utils.replica import RoutingSession
+from src.utils.search import build_search_name
 
-db = SQLAlchemy()
+# الجلسة توجه قراءات المسارات المعلَّمة بـ read_replica إلى نسخة القراءة عند ضبطها
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
+    __table_args__ = (
+        db.Index('idx_user_registration_date', 'registration_date'),  # المستخدمون الجدد وترتيب البحث
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     full_name = db.Column(db.String(100), nullable=False)
     national_id = db.Column(db.String(20), unique=True, nullable=False)
@@ -14,6 +22,9 @@ class User(db.Model):
     status = db.Column(db.String(20), default='active')  # active, blocked
     registration_date = db.Column(db.DateTime, default=datetime.utcnow)
     last_login = db.Column(db.DateTime, nullable=True)
+    search_name = db.Column(db.String(200), nullable=True)  # الاسم بكتابة موحدة للبحث
+    # يزيد مع كل تعديل على المستخدم أو طلباته أو ملفاتها (ETag لمسارات الواجهة، انظر utils/versioning)
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default=db.text('0'))
     
     # العلاقات
     requests = db.relationship('Request', backref='user', lazy=True, cascade='all, delete-orphan')
@@ -21,6 +32,12 @@ class User(db.Model):
     def __repr__(self):
         return f'<User {self.full_name}>'
 
+    @validates('full_name')
+    def _update_search_name(self, key, full_name):
+        """تحديث الاسم الموحد للبحث مع كل تعديل للاسم"""
+        self.search_name = build_search_name(full_name)
+        return full_name
+
     def set_password(self, password):
         """تشفير كلمة المرور"""
         self.password_hash = generate_password_hash(password)
@@ -1,22 +1,21 @@
-from flask import Blueprint, jsonify, request, session
+import hmac
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 from src.models import db, User, Request, PDFFile, Appointment, Consultation
-from datetime import datetime, timedelta
-from sqlalchemy import func, desc
+from src.models.request import is_allowed_transition
+from datetime import datetime
+from sqlalchemy.orm import contains_eager
+from src.utils.auth import require_admin
+from src.utils.export import EXPORT_FORMATS, generate_export
+from src.utils.database import pool_status
+from src.utils.metrics import registry as metrics_registry, render_pool_metrics
+from src.utils.replica import read_replica
+from src.utils.search import get_search_backend
+from src.utils.stats import get_request_stats, record_status_change
 
 admin_bp = Blueprint('admin', __name__)
 
-def require_admin():
-    """التحقق من صلاحيات الإدارة"""
-    if 'user_id' not in session:
-        return jsonify({'error': 'يجب تسجيل الدخول أولاً'}), 401
-    
-    user = User.query.get(session['user_id'])
-    if not user or user.national_id != 'admin':
-        return jsonify({'error': 'غير مصرح لك بالوصول'}), 403
-    
-    return user
-
 @admin_bp.route('/dashboard/stats', methods=['GET'])
+@read_replica
 def get_dashboard_stats():
     """الحصول على إحصائيات لوحة التحكم"""
     admin_user = require_admin()
@@ -24,137 +23,56 @@ def get_dashboard_stats():
         return admin_user
     
     try:
-        # إحصائيات عامة
-        total_users = User.query.filter(User.national_id != 'admin').count()
-        total_requests = Request.query.count()
-        pending_requests = Request.query.filter_by(status='pending').count()
-        completed_requests = Request.query.filter_by(status='completed').count()
-        
-        # إحصائيات الطلبات حسب النوع
-        request_types = db.session.query(
-            Request.type,
-            func.count(Request.id).label('count')
-        ).group_by(Request.type).all()
-        
-        # إحصائيات الطلبات الأخيرة (آخر 7 أيام)
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        recent_requests = Request.query.filter(
-            Request.created_date >= week_ago
-        ).count()
-        
-        # المستخدمين الجدد (آخر 30 يوم)
-        month_ago = datetime.utcnow() - timedelta(days=30)
-        new_users = User.query.filter(
-            User.registration_date >= month_ago,
-            User.national_id != 'admin'
-        ).count()
-        
-        # إحصائيات الحالة
-        status_stats = db.session.query(
-            Request.status,
-            func.count(Request.id).label('count')
-        ).group_by(Request.status).all()
+        # جميع الأرقام من استعلام تجميعي واحد (أو من جدول العدادات) مع ذاكرة مؤقتة قصيرة
+        stats = get_request_stats()
         
         return jsonify({
             'general_stats': {
-                'total_users': total_users,
-                'total_requests': total_requests,
-                'pending_requests': pending_requests,
-                'completed_requests': completed_requests,
-                'recent_requests': recent_requests,
-                'new_users': new_users
+                'total_users': stats['total_users'],
+                'total_requests': stats['total'],
+                'pending_requests': stats['by_status']['pending'],
+                'completed_requests': stats['by_status']['completed'],
+                'recent_requests': stats['last_7_days'],
+                'new_users': stats['new_users']
             },
             'request_types': [
                 {
-                    'type': rt.type,
-                    'type_text': Request.get_type_text(rt.type),
-                    'count': rt.count
-                } for rt in request_types
+                    'type': request_type,
+                    'type_text': Request.get_type_text(request_type),
+                    'count': count
+                } for request_type, count in sorted(stats['by_type'].items()) if count
             ],
             'status_stats': [
                 {
-                    'status': ss.status,
-                    'status_text': Request.get_status_text(ss.status),
-                    'count': ss.count
-                } for ss in status_stats
+                    'status': status,
+                    'status_text': Request.get_status_text(status),
+                    'count': count
+                } for status, count in sorted(stats['by_status'].items()) if count
             ]
         }), 200
         
     except Exception as e:
         return jsonify({'error': 'حدث خطأ في جلب الإحصائيات'}), 500
 
-@admin_bp.route('/requests', methods=['GET'])
-def get_all_requests():
-    """الحصول على جميع الطلبات للإدارة"""
-    admin_user = require_admin()
-    if isinstance(admin_user, tuple):
-        return admin_user
-    
-    try:
-        # معاملات البحث والفلترة
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        status_filter = request.args.get('status')
-        type_filter = request.args.get('type')
-        search_query = request.args.get('search')
-        
-        # بناء الاستعلام
-        query = Request.query
-        
-        if status_filter:
-            query = query.filter(Request.status == status_filter)
-        
-        if type_filter:
-            query = query.filter(Request.type == type_filter)
-        
-        if search_query:
-            # البحث في بيانات المستخدم
-            query = query.join(User).filter(
-                User.full_name.contains(search_query) |
-                User.national_id.contains(search_query) |
-                User.email.contains(search_query)
-            )
-        
-        # ترتيب حسب التاريخ (الأحدث أولاً)
-        query = query.order_by(desc(Request.created_date))
-        
-        # تطبيق التصفح
-        requests = query.paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
-        
-        return jsonify({
-            'requests': [req.to_dict_with_user() for req in requests.items],
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': requests.total,
-                'pages': requests.pages,
-                'has_next': requests.has_next,
-                'has_prev': requests.has_prev
-            }
-        }), 200
-        
-    except Exception as e:
-        return jsonify({'error': 'حدث خطأ في جلب الطلبات'}), 500
-
 @admin_bp.route('/requests/<int:request_id>', methods=['PUT'])
-def update_request_status():
+def update_request_status(request_id):
     """تحديث حالة الطلب"""
     admin_user = require_admin()
     if isinstance(admin_user, tuple):
         return admin_user
     
     try:
-        req = Request.query.get_or_404(request_id)
+        # قفل الصف حتى الحفظ: التحقق من الانتقال لا يسبقه تعديل متزامن
+        req = Request.query.filter_by(id=request_id).with_for_update().first_or_404()
         data = request.json
         
         # تحديث الحالة
         if 'status' in data:
             if data['status'] not in ['pending', 'in_progress', 'completed', 'cancelled']:
                 return jsonify({'error': 'حالة غير صحيحة'}), 400
+            if not is_allowed_transition(req.status, data['status']):
+                return jsonify({'error': 'لا يمكن تغيير حالة الطلب من حالته الحالية إلى هذه الحالة'}), 400
+            record_status_change(req.status, data['status'])
             req.status = data['status']
         
         # تحديث الملاحظات
@@ -178,6 +96,7 @@ def update_request_status():
         return jsonify({'error': 'حدث خطأ في تحديث الطلب'}), 500
 
 @admin_bp.route('/users/search', methods=['GET'])
+@read_replica
 def search_users():
     """البحث عن المستخدمين"""
     admin_user = require_admin()
@@ -192,14 +111,11 @@ def search_users():
         if not search_query:
             return jsonify({'users': [], 'pagination': {}}), 200
         
-        # البحث في الاسم ورقم الهوية والبريد الإلكتروني
+        # البحث في الاسم (بكتابة موحدة) وبادئة رقم الهوية والجوال والبريد الإلكتروني
         query = User.query.filter(
             User.national_id != 'admin'
         ).filter(
-            User.full_name.contains(search_query) |
-            User.national_id.contains(search_query) |
-            User.email.contains(search_query) |
-            User.phone.contains(search_query)
+            get_search_backend(db).user_filter(User, search_query)
         ).order_by(User.registration_date.desc())
         
         users = query.paginate(
@@ -224,15 +140,28 @@ def search_users():
         return jsonify({'error': 'حدث خطأ في البحث'}), 500
 
 @admin_bp.route('/export/requests', methods=['GET'])
+@read_replica
 def export_requests():
     """تصدير جميع الطلبات"""
     admin_user = require_admin()
     if isinstance(admin_user, tuple):
         return admin_user
     
+    # التصدير المتدفق (format=ndjson أو format=csv) بذاكرة ثابتة بدلاً من بناء الاستجابة كاملة
+    export_format = request.args.get('format', 'json')
+    if export_format in EXPORT_FORMATS:
+        filename = f"requests-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+        return Response(
+            stream_with_context(generate_export(export_format)),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+    
     try:
         # جلب جميع الطلبات مع بيانات المستخدمين
-        requests = Request.query.join(User).order_by(
+        requests = Request.query.join(User).options(
+            contains_eager(Request.user)
+        ).order_by(
             Request.created_date.desc()
         ).all()
         
@@ -264,3 +193,42 @@ def export_requests():
     except Exception as e:
         return jsonify({'error': 'حدث خطأ في تصدير البيانات'}), 500
 
+def _require_metrics_access():
+    """السماح برمز METRICS_TOKEN (لـ Prometheus) أو بجلسة إدارة؛ يُرجع استجابة الخطأ أو None"""
+    token = current_app.config.get('METRICS_TOKEN')
+    authorization = request.headers.get('Authorization', '')
+    if not (token and hmac.compare_digest(authorization, f'Bearer {token}')):
+        admin_user = require_admin()
+        if isinstance(admin_user, tuple):
+            return admin_user
+    return None
+
+@admin_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """أرقام زمن الطلبات والاستعلامات ومجمع الاتصالات بصيغة Prometheus"""
+    if not current_app.config.get('METRICS_ENABLED'):
+        return jsonify({'error': 'القياس غير مفعل'}), 404
+    
+    error = _require_metrics_access()
+    if error:
+        return error
+    
+    text = metrics_registry.render() + render_pool_metrics(pool_status(db.engine))
+    return Response(text, mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@admin_bp.route('/db-pool', methods=['GET'])
+def get_db_pool():
+    """حالة مجمع اتصالات قاعدة البيانات في العملية التي استقبلت الطلب وإعداداته"""
+    error = _require_metrics_access()
+    if error:
+        return error
+    
+    options = current_app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+    return jsonify({
+        'config': {
+            name: options[name] for name in
+            ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle', 'pool_pre_ping') if name in options
+        },
+        'dialect': db.engine.dialect.name,
+        'pool': pool_status(db.engine),
+    }), 200
@@ -1,8 +1,18 @@
-from flask import Blueprint, jsonify, request, session, send_file, current_app
-from src.models import db, User, Request, PDFFile
+from flask import Blueprint, jsonify, request, send_file, current_app
+from src.models import db, Request, PDFFile, PDFJob
+from src.models.request import is_allowed_transition
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
+from sqlalchemy.orm import joinedload
+from src.utils import jsonlib
+from src.utils.auth import require_admin, require_login
+from src.utils.delivery import not_modified, not_modified_response, send_pdf
+from src.utils.jobs import enqueue_pdf_jobs
+from src.utils.stats import record_status_change
+from src.utils.storage import get_storage, last_scan_report, reconcile_storage, release_blob
+from src.utils.uploads import InvalidPDF, OffsetMismatch, UploadSession
+from src.utils.versioning import is_unchanged, private_cache, unchanged_response, user_etag
 import os
-import uuid
 from datetime import datetime
 
 pdf_bp = Blueprint('pdf', __name__)
@@ -13,28 +23,69 @@ def allowed_file(filename):
     """التحقق من امتداد الملف"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def require_login():
-    """التحقق من تسجيل الدخول"""
-    if 'user_id' not in session:
-        return jsonify({'error': 'يجب تسجيل الدخول أولاً'}), 401
+def _load_upload_target(request_id, lock=False):
+    """
+    التحقق من أن الطلب موجود ويقبل ملفات PDF ويُسمح بانتقاله إلى completed؛ يُرجع (الطلب، None) أو (None، استجابة خطأ)
+    lock يقفل الصف حتى الحفظ (عند إرفاق الملف) فلا يسبق التحقق تعديل متزامن على الحالة
+    """
+    query = Request.query.filter_by(id=request_id)
+    if lock:
+        query = query.with_for_update()
+    req = query.first()
+    if not req:
+        return None, (jsonify({'error': 'الطلب غير موجود'}), 404)
     
-    user = User.query.get(session['user_id'])
-    if not user or user.status != 'active':
-        session.clear()
-        return jsonify({'error': 'الحساب غير نشط'}), 401
+    if req.type != 'medical_request':
+        return None, (jsonify({'error': 'يمكن رفع ملفات PDF للتقارير الطبية فقط'}), 400)
     
-    return user
+    if not is_allowed_transition(req.status, 'completed'):
+        return None, (jsonify({'error': 'لا يمكن تغيير حالة الطلب من حالته الحالية إلى هذه الحالة'}), 400)
+    
+    return req, None
 
-def require_admin():
-    """التحقق من صلاحيات الإدارة"""
-    user = require_login()
-    if isinstance(user, tuple):  # إذا كان هناك خطأ
-        return user
+def _attach_pdf(request_id, file_path, content_hash, file_size, original_filename, notes):
+    """
+    إنشاء سجل الملف وتحديث حالة الطلب وإرجاع استجابة الرفع
+    يُعاد تحميل الطلب مقفلاً بعد حفظ الملف: التحقق الأول سبق الرفع، وقد تتغير الحالة أثناءه
+    (الملف المحفوظ عند الرفض يحذفه pdf-storage-fsck --gc إذا بقي يتيماً)
+    """
+    req, error = _load_upload_target(request_id, lock=True)
+    if error:
+        db.session.rollback()
+        return error
+    
+    pdf_file = PDFFile(
+        request_id=req.id,
+        filename=os.path.basename(file_path),
+        original_filename=original_filename,
+        file_path=file_path,
+        file_size=file_size,
+        content_hash=content_hash,
+        uploaded_by='admin',
+        notes=notes
+    )
+    pdf_file.mark_verified()
+    
+    db.session.add(pdf_file)
+    
+    # استخراج النص وصورة المعاينة في الخلفية عبر pdf-worker
+    enqueue_pdf_jobs(pdf_file)
+    
+    # تحديث حالة الطلب
+    record_status_change(req.status, 'completed')
+    req.status = 'completed'
+    req.updated_date = datetime.utcnow()
     
-    if user.national_id != 'admin':
-        return jsonify({'error': 'غير مصرح لك بالوصول'}), 403
+    db.session.commit()
     
-    return user
+    return jsonify({
+        'message': 'تم رفع الملف بنجاح',
+        'file': pdf_file.to_dict(),
+        'request': req.to_dict_with_user()
+    }), 201
+
+def _max_upload_size():
+    return current_app.config.get('MAX_PDF_UPLOAD_SIZE') or current_app.config['MAX_CONTENT_LENGTH']
 
 @pdf_bp.route('/upload/<int:request_id>', methods=['POST'])
 def upload_pdf(request_id):
@@ -45,10 +96,9 @@ def upload_pdf(request_id):
     
     try:
         # التحقق من وجود الطلب
-        req = Request.query.get_or_404(request_id)
-        
-        if req.type != 'medical_request':
-            return jsonify({'error': 'يمكن رفع ملفات PDF للتقارير الطبية فقط'}), 400
+        req, error = _load_upload_target(request_id)
+        if error:
+            return error
         
         # التحقق من وجود الملف
         if 'file' not in request.files:
@@ -61,137 +111,301 @@ def upload_pdf(request_id):
         if not allowed_file(file.filename):
             return jsonify({'error': 'نوع الملف غير مدعوم. يجب أن يكون PDF'}), 400
         
-        # إنشاء اسم ملف فريد
         original_filename = secure_filename(file.filename)
-        file_extension = original_filename.rsplit('.', 1)[1].lower()
-        unique_filename = f"{uuid.uuid4().hex}.{file_extension}"
-        
-        # حفظ الملف
-        upload_folder = current_app.config['UPLOAD_FOLDER']
-        file_path = os.path.join(upload_folder, unique_filename)
-        file.save(file_path)
-        
-        # الحصول على حجم الملف
-        file_size = os.path.getsize(file_path)
-        
-        # إنشاء سجل في قاعدة البيانات
-        pdf_file = PDFFile(
-            request_id=request_id,
-            filename=unique_filename,
-            original_filename=original_filename,
-            file_path=file_path,
-            file_size=file_size,
-            uploaded_by='admin',
-            notes=request.form.get('notes', '')
-        )
-        
-        db.session.add(pdf_file)
-        
-        # تحديث حالة الطلب
-        req.status = 'completed'
-        req.updated_date = datetime.utcnow()
         
-        db.session.commit()
+        # حفظ الملف باسم بصمة محتواه (الملف المكرر يُخزن مرة واحدة) بعد التحقق من أنه PDF
+        file_path, content_hash, file_size = get_storage().save_upload(file)
+        
+        return _attach_pdf(req.id, file_path, content_hash, file_size,
+                           original_filename, request.form.get('notes', ''))
+        
+    except RequestEntityTooLarge:
+        return jsonify({'error': 'حجم الملف يتجاوز الحد المسموح'}), 413
+    except InvalidPDF as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        # الملف المحفوظ قبل الفشل لا يُحذف هنا: قد يكون رفع متزامن أعاد استخدامه ولم يُحفظ سجله بعد،
+        # ويحذفه pdf-storage-fsck --gc بعد مهلة السماح إذا بقي يتيماً
+        return jsonify({'error': 'حدث خطأ في رفع الملف'}), 500
+
+@pdf_bp.route('/upload/<int:request_id>/stream', methods=['POST'])
+def upload_pdf_stream(request_id):
+    """
+    رفع ملف PDF كجسم الطلب مباشرة (Content-Type: application/pdf) دون تخزين مؤقت في الذاكرة
+    اسم الملف في المعامل filename والملاحظات في notes
+    """
+    admin = require_admin()
+    if isinstance(admin, tuple):
+        return admin
+    
+    try:
+        req, error = _load_upload_target(request_id)
+        if error:
+            return error
+        
+        original_filename = secure_filename(request.args.get('filename', '')) or 'report.pdf'
+        if not allowed_file(original_filename):
+            return jsonify({'error': 'نوع الملف غير مدعوم. يجب أن يكون PDF'}), 400
+        
+        # الجسم يُقرأ تدفقاً فلا يُقيد بـ MAX_CONTENT_LENGTH بل بحد ملفات PDF (والطلبات المجزأة بلا Content-Length كذلك)
+        max_size = _max_upload_size()
+        request.max_content_length = max_size
+        if request.content_length and request.content_length > max_size:
+            return jsonify({'error': 'حجم الملف يتجاوز الحد المسموح'}), 413
+        
+        file_path, content_hash, file_size = get_storage().save_stream(request.stream, max_size=max_size)
+        
+        return _attach_pdf(req.id, file_path, content_hash, file_size,
+                           original_filename, request.args.get('notes', ''))
+        
+    except RequestEntityTooLarge:
+        return jsonify({'error': 'حجم الملف يتجاوز الحد المسموح'}), 413
+    except InvalidPDF as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'حدث خطأ في رفع الملف'}), 500
+
+# الرفع المجزأ القابل للاستئناف للملفات الكبيرة
+@pdf_bp.route('/uploads', methods=['POST'])
+def create_upload_session():
+    """بدء جلسة رفع مجزأ: {request_id, filename, size, notes}"""
+    admin = require_admin()
+    if isinstance(admin, tuple):
+        return admin
+    
+    try:
+        data = request.get_json() or {}
+        if not isinstance(data.get('request_id'), int):
+            return jsonify({'error': 'رقم الطلب مطلوب'}), 400
+        
+        req, error = _load_upload_target(data['request_id'])
+        if error:
+            return error
+        
+        original_filename = secure_filename(data.get('filename') or '') or 'report.pdf'
+        if not allowed_file(original_filename):
+            return jsonify({'error': 'نوع الملف غير مدعوم. يجب أن يكون PDF'}), 400
+        
+        size = data.get('size')
+        if not isinstance(size, int) or size <= 0:
+            return jsonify({'error': 'حجم الملف مطلوب'}), 400
+        if size > _max_upload_size():
+            return jsonify({'error': 'حجم الملف يتجاوز الحد المسموح'}), 413
+        
+        upload = UploadSession.create(get_storage(), req.id, original_filename, size, data.get('notes', ''))
         
         return jsonify({
-            'message': 'تم رفع الملف بنجاح',
-            'file': pdf_file.to_dict(),
-            'request': req.to_dict_with_user()
+            'upload_id': upload.upload_id,
+            'offset': 0,
+            'size': size,
+            'chunk_size': current_app.config['MAX_CONTENT_LENGTH']
         }), 201
         
+    except Exception as e:
+        return jsonify({'error': 'حدث خطأ في بدء الرفع'}), 500
+
+@pdf_bp.route('/uploads/<upload_id>', methods=['GET'])
+def get_upload_session(upload_id):
+    """الإزاحة الحالية لجلسة الرفع (لاستئناف الرفع بعد الانقطاع)"""
+    admin = require_admin()
+    if isinstance(admin, tuple):
+        return admin
+    
+    try:
+        upload = UploadSession.load(get_storage(), upload_id)
+        response = jsonify({'upload_id': upload_id, 'offset': upload.offset, 'size': upload.meta['size']})
+        response.headers['Upload-Offset'] = str(upload.offset)
+        return response, 200
+    except KeyError:
+        return jsonify({'error': 'جلسة الرفع غير موجودة'}), 404
+
+@pdf_bp.route('/uploads/<upload_id>', methods=['PATCH'])
+def append_upload_chunk(upload_id):
+    """إرسال جزء من الملف ابتداءً من ترويسة Upload-Offset؛ يكتمل الرفع عند وصول آخر بايت"""
+    admin = require_admin()
+    if isinstance(admin, tuple):
+        return admin
+    
+    try:
+        upload = UploadSession.load(get_storage(), upload_id)
+    except KeyError:
+        return jsonify({'error': 'جلسة الرفع غير موجودة'}), 404
+    
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({'error': 'ترويسة Upload-Offset مطلوبة'}), 400
+    
+    try:
+        meta = upload.meta
+        try:
+            new_offset = upload.append(request.stream, offset, meta['size'])
+        except OffsetMismatch as e:
+            return jsonify({'error': 'الإزاحة لا تطابق الجزء المحفوظ', 'offset': e.offset}), 409
+        
+        if new_offset < meta['size']:
+            response = jsonify({'upload_id': upload_id, 'offset': new_offset, 'size': meta['size']})
+            response.headers['Upload-Offset'] = str(new_offset)
+            return response, 200
+        
+        req, error = _load_upload_target(meta['request_id'])
+        if error:
+            upload.discard()
+            return error
+        
+        file_path, content_hash, file_size = upload.finalize()
+        return _attach_pdf(req.id, file_path, content_hash, file_size, meta['filename'], meta['notes'])
+        
+    except RequestEntityTooLarge:
+        return jsonify({'error': 'حجم الجزء يتجاوز الحد المسموح'}), 413
+    except InvalidPDF as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         db.session.rollback()
-        # حذف الملف إذا تم رفعه ولكن فشل في حفظ البيانات
-        if 'file_path' in locals() and os.path.exists(file_path):
-            os.remove(file_path)
         return jsonify({'error': 'حدث خطأ في رفع الملف'}), 500
 
-@pdf_bp.route('/download/<int:file_id>', methods=['GET'])
-def download_pdf(file_id):
-    """تحميل ملف PDF"""
+@pdf_bp.route('/uploads/<upload_id>', methods=['DELETE'])
+def cancel_upload_session(upload_id):
+    """إلغاء جلسة رفع وحذف الجزء المحفوظ"""
+    admin = require_admin()
+    if isinstance(admin, tuple):
+        return admin
+    
+    try:
+        UploadSession.load(get_storage(), upload_id).discard()
+        return jsonify({'message': 'تم إلغاء الرفع'}), 200
+    except KeyError:
+        return jsonify({'error': 'جلسة الرفع غير موجودة'}), 404
+
+def _load_deliverable_file(user, file_id, forbidden_message):
+    """
+    جلب الملف مع مالك الطلب في استعلام واحد والتحقق من الصلاحيات
+    يُرجع (pdf_file, None) أو (None, استجابة خطأ)
+    """
+    row = db.session.query(PDFFile, Request.user_id).join(
+        Request, PDFFile.request_id == Request.id
+    ).filter(PDFFile.id == file_id).first()
+    if not row:
+        return None, (jsonify({'error': 'الملف غير موجود'}), 404)
+    
+    pdf_file, owner_id = row
+    # المستخدم العادي يمكنه الوصول إلى ملفاته فقط
+    if user.national_id != 'admin' and owner_id != user.id:
+        return None, (jsonify({'error': forbidden_message}), 403)
+    
+    if not pdf_file.is_active:
+        return None, (jsonify({'error': 'الملف غير متاح'}), 404)
+    
+    return pdf_file, None
+
+def _deliver(file_id, as_attachment, forbidden_message, error_message):
+    """تسليم الملف: 304 عند تطابق ETag دون لمس القرص، وإلا الإرسال حسب وضع التسليم"""
     user = require_login()
     if isinstance(user, tuple):
         return user
     
     try:
-        pdf_file = PDFFile.query.get_or_404(file_id)
-        
-        # التحقق من الصلاحيات
-        if user.national_id != 'admin':
-            # المستخدم العادي يمكنه تحميل ملفاته فقط
-            if pdf_file.request.user_id != user.id:
-                return jsonify({'error': 'غير مصرح لك بتحميل هذا الملف'}), 403
-        
-        # التحقق من وجود الملف
-        if not pdf_file.file_exists():
+        pdf_file, error = _load_deliverable_file(user, file_id, forbidden_message)
+        if error:
+            return error
+        
+        if not_modified(pdf_file.content_hash):
+            return not_modified_response(pdf_file.content_hash)
+        
+        try:
+            if not pdf_file.content_hash:
+                pdf_file.ensure_content_hash()
+                db.session.commit()
+                if not_modified(pdf_file.content_hash):
+                    return not_modified_response(pdf_file.content_hash)
+            return send_pdf(pdf_file, as_attachment)
+        except FileNotFoundError:
+            # تسجيل الفقد فوراً بدل انتظار الفحص الدوري التالي
+            pdf_file.mark_verified(exists=False)
+            db.session.commit()
             return jsonify({'error': 'الملف غير موجود على الخادم'}), 404
         
-        if not pdf_file.is_active:
-            return jsonify({'error': 'الملف غير متاح'}), 404
-        
-        return send_file(
-            pdf_file.file_path,
-            as_attachment=True,
-            download_name=pdf_file.original_filename,
-            mimetype='application/pdf'
-        )
-        
     except Exception as e:
-        return jsonify({'error': 'حدث خطأ في تحميل الملف'}), 500
+        db.session.rollback()
+        return jsonify({'error': error_message}), 500
+
+@pdf_bp.route('/download/<int:file_id>', methods=['GET'])
+def download_pdf(file_id):
+    """تحميل ملف PDF"""
+    return _deliver(file_id, True, 'غير مصرح لك بتحميل هذا الملف', 'حدث خطأ في تحميل الملف')
 
 @pdf_bp.route('/view/<int:file_id>', methods=['GET'])
 def view_pdf(file_id):
     """عرض ملف PDF في المتصفح"""
+    return _deliver(file_id, False, 'غير مصرح لك بعرض هذا الملف', 'حدث خطأ في عرض الملف')
+
+@pdf_bp.route('/preview/<int:file_id>', methods=['GET'])
+def preview_pdf(file_id):
+    """صورة مصغرة للصفحة الأولى من الملف (بعد معالجتها في الخلفية)"""
     user = require_login()
     if isinstance(user, tuple):
         return user
     
     try:
-        pdf_file = PDFFile.query.get_or_404(file_id)
-        
-        # التحقق من الصلاحيات
-        if user.national_id != 'admin':
-            # المستخدم العادي يمكنه عرض ملفاته فقط
-            if pdf_file.request.user_id != user.id:
-                return jsonify({'error': 'غير مصرح لك بعرض هذا الملف'}), 403
-        
-        # التحقق من وجود الملف
-        if not pdf_file.file_exists():
-            return jsonify({'error': 'الملف غير موجود على الخادم'}), 404
+        pdf_file, error = _load_deliverable_file(user, file_id, 'غير مصرح لك بعرض هذا الملف')
+        if error:
+            return error
         
-        if not pdf_file.is_active:
-            return jsonify({'error': 'الملف غير متاح'}), 404
+        if not pdf_file.preview_path:
+            return jsonify({'error': 'المعاينة غير متوفرة', 'processing_status': pdf_file.processing_status}), 404
         
-        return send_file(
-            pdf_file.file_path,
-            as_attachment=False,
-            mimetype='application/pdf'
-        )
+        try:
+            response = send_file(pdf_file.preview_path, mimetype='image/png', conditional=True,
+                                 etag=f'{pdf_file.content_hash}-preview' if pdf_file.content_hash else True)
+        except FileNotFoundError:
+            return jsonify({'error': 'المعاينة غير متوفرة'}), 404
+        response.cache_control.private = True
+        return response
         
     except Exception as e:
-        return jsonify({'error': 'حدث خطأ في عرض الملف'}), 500
+        return jsonify({'error': 'حدث خطأ في عرض المعاينة'}), 500
+
+def _user_files_query(user_id, *columns):
+    """استعلام ملفات المستخدم المفعلة بربط واحد مع الطلبات"""
+    return db.session.query(*columns).select_from(PDFFile).join(
+        Request, PDFFile.request_id == Request.id
+    ).filter(Request.user_id == user_id, PDFFile.is_active == db.true())
 
 @pdf_bp.route('/user-files', methods=['GET'])
 def get_user_files():
-    """الحصول على ملفات المستخدم"""
+    """الحصول على ملفات المستخدم (304 إذا لم تتغير القائمة منذ آخر طلب)"""
     user = require_login()
     if isinstance(user, tuple):
         return user
     
     try:
-        # الحصول على جميع الطلبات التي تحتوي على ملفات PDF
-        user_requests = Request.query.filter_by(user_id=user.id).all()
+        # مفتاح التحقق: رقم إصدار بيانات المستخدم، يزيد مع أي تعديل على ملفاته أو طلباتها
+        # (رفع، حذف، إعادة تسمية، تقدم المعالجة في الخلفية، تغيير بيانات الطلب)
+        etag = user_etag(user.id)
+        if is_unchanged(etag):
+            return unchanged_response(etag)
+        
+        rows = _user_files_query(
+            user.id, *PDFFile.summary_columns(), Request.type.label('request_type'), Request.data.label('request_data')
+        ).order_by(PDFFile.upload_date.desc(), PDFFile.id.desc()).all()
+        
+        # بيانات الطلب تُفك مرة واحدة لكل طلب حتى لو احتوى عدة ملفات
+        decoded = {}
         files = []
-        
-        for req in user_requests:
-            for pdf_file in req.pdf_files:
-                if pdf_file.is_active:
-                    file_data = pdf_file.to_dict()
-                    file_data['request_type'] = req.type
-                    file_data['request_data'] = req.get_data()
-                    files.append(file_data)
-        
-        return jsonify(files), 200
+        for row in rows:
+            if row.request_id not in decoded:
+                try:
+                    decoded[row.request_id] = jsonlib.loads(row.request_data) if row.request_data else {}
+                except jsonlib.JSONDecodeError:
+                    decoded[row.request_id] = {}
+            file_data = PDFFile.serialize_row(row)
+            file_data['request_type'] = row.request_type
+            file_data['request_data'] = decoded[row.request_id]
+            files.append(file_data)
+        
+        return private_cache(jsonify(files), etag), 200
         
     except Exception as e:
         return jsonify({'error': 'حدث خطأ في جلب الملفات'}), 500
@@ -205,7 +419,9 @@ def admin_get_files():
         return admin
     
     try:
-        files = PDFFile.query.order_by(PDFFile.upload_date.desc()).all()
+        files = PDFFile.query.options(
+            joinedload(PDFFile.request).options(*Request.eager_load_options())
+        ).order_by(PDFFile.upload_date.desc()).all()
         result = []
         
         for pdf_file in files:
@@ -227,20 +443,18 @@ def admin_delete_file(file_id):
     
     try:
         pdf_file = PDFFile.query.get_or_404(file_id)
+        file_path = pdf_file.file_path
         
-        # حذف الملف من القرص
-        if pdf_file.delete_file():
-            # حذف السجل من قاعدة البيانات
-            db.session.delete(pdf_file)
-            db.session.commit()
-            
-            return jsonify({'message': 'تم حذف الملف بنجاح'}), 200
-        else:
-            # إذا فشل حذف الملف من القرص، قم بتعطيله فقط
-            pdf_file.is_active = False
-            db.session.commit()
-            
-            return jsonify({'message': 'تم تعطيل الملف (لم يتم حذفه من القرص)'}), 200
+        # حذف السجل أولاً ثم الملف من القرص بعد حفظ الحذف، ما لم يشر إليه سجل آخر أو رفع جارٍ
+        db.session.delete(pdf_file)
+        db.session.commit()
+        try:
+            release_blob(file_path)
+        except OSError as e:
+            # يبقى الملف يتيماً ويحذفه pdf-storage-fsck --gc لاحقاً
+            print(f"Error deleting file {file_path}: {e}")
+        
+        return jsonify({'message': 'تم حذف الملف بنجاح'}), 200
         
     except Exception as e:
         db.session.rollback()
@@ -265,3 +479,92 @@ def admin_toggle_file(file_id):
         db.session.rollback()
         return jsonify({'error': 'حدث خطأ في تحديث حالة الملف'}), 500
 
+@pdf_bp.route('/admin/integrity', methods=['GET'])
+def admin_integrity_report():
+    """
+    تقرير سلامة الملفات (للإدارة): السجلات المفقودة أو مختلفة الحجم من آخر فحص دوري،
+    والملفات اليتيمة من التقرير المحفوظ؛ المعامل scan=1 يشغل فحصاً جديداً قبل الإرجاع
+    """
+    admin = require_admin()
+    if isinstance(admin, tuple):
+        return admin
+    
+    try:
+        if request.args.get('scan') in ('1', 'true'):
+            reconcile_storage()
+        
+        limit = min(request.args.get('limit', 100, type=int), 1000)
+        missing = PDFFile.query.filter(PDFFile.exists_on_disk.is_(False)).order_by(PDFFile.id).limit(limit).all()
+        mismatched = PDFFile.query.filter(PDFFile.size_mismatch.is_(True)).order_by(PDFFile.id).limit(limit).all()
+        counts = db.session.query(
+            db.func.count(PDFFile.id),
+            db.func.count(PDFFile.id).filter(PDFFile.exists_on_disk.is_(False)),
+            db.func.count(PDFFile.id).filter(PDFFile.size_mismatch.is_(True)),
+            db.func.count(PDFFile.id).filter(PDFFile.verified_at.is_(None)),
+        ).one()
+        
+        report = last_scan_report() or {}
+        return jsonify({
+            'scanned_at': report.get('scanned_at'),
+            'total_files': counts[0],
+            'missing_count': counts[1],
+            'size_mismatch_count': counts[2],
+            'unverified_count': counts[3],
+            'missing': [pdf_file.to_dict() for pdf_file in missing],
+            'size_mismatch': [pdf_file.to_dict() for pdf_file in mismatched],
+            'orphans_count': report.get('orphans_count', 0),
+            'orphans': report.get('orphans', [])[:limit],
+            'stale_temp_count': report.get('stale_temp_count', 0),
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'حدث خطأ في جلب تقرير سلامة الملفات'}), 500
+
+@pdf_bp.route('/admin/jobs', methods=['GET'])
+def admin_get_jobs():
+    """ملخص مهام المعالجة في الخلفية وآخر المهام الفاشلة (للإدارة)"""
+    admin = require_admin()
+    if isinstance(admin, tuple):
+        return admin
+    
+    try:
+        counts = {}
+        for kind, status, count in db.session.query(
+            PDFJob.kind, PDFJob.status, db.func.count(PDFJob.id)
+        ).group_by(PDFJob.kind, PDFJob.status):
+            counts.setdefault(kind, {})[status] = count
+        
+        failed = PDFJob.query.filter_by(status='failed').order_by(PDFJob.updated_at.desc()).limit(20).all()
+        
+        return jsonify({
+            'counts': counts,
+            'failed': [job.to_dict() for job in failed]
+        }), 200
+        
+    except Exception as e:
+        return jsonify({'error': 'حدث خطأ في جلب المهام'}), 500
+
+@pdf_bp.route('/admin/jobs/<int:job_id>/retry', methods=['POST'])
+def admin_retry_job(job_id):
+    """إعادة مهمة فاشلة إلى الطابور (للإدارة)"""
+    admin = require_admin()
+    if isinstance(admin, tuple):
+        return admin
+    
+    try:
+        job = db.session.get(PDFJob, job_id)
+        if not job:
+            return jsonify({'error': 'المهمة غير موجودة'}), 404
+        
+        job.status = 'queued'
+        job.attempts = 0
+        job.run_after = datetime.utcnow()
+        job.pdf_file.processing_status = 'pending'
+        db.session.commit()
+        
+        return jsonify({'message': 'تمت إعادة المهمة إلى الطابور', 'job': job.to_dict()}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'حدث خطأ في إعادة المهمة'}), 500
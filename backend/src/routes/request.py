@@ -1,32 +1,22 @@
-from flask import Blueprint, jsonify, request, session
+from flask import Blueprint, jsonify, request
 from src.models import db, User, Request, Appointment, Consultation
+from src.models.request import REQUEST_STATUSES, is_allowed_transition
+from src.utils.auth import require_admin, require_login
+from src.utils.bulk import BULK_CHUNK_SIZE, MAX_BULK_IDS, bulk_update_status
+from src.utils.filters import InvalidFilter, apply_request_filters
+from src.utils.pagination import (
+    InvalidCursor, clamp_per_page, encode_cursor, keyset_page, order_newest_first, set_page_headers, wants_count
+)
+from src.utils.replica import read_replica
+from src.utils.request_schemas import describe_schemas, get_schema
+from src.utils.search import get_search_backend
+from src.utils.stats import get_request_stats, record_request_created, record_status_change
+from src.utils.versioning import is_unchanged, private_cache, unchanged_response, user_etag
+from sqlalchemy.orm import selectinload
 from datetime import datetime
 
 request_bp = Blueprint('request', __name__)
 
-def require_login():
-    """التحقق من تسجيل الدخول"""
-    if 'user_id' not in session:
-        return jsonify({'error': 'يجب تسجيل الدخول أولاً'}), 401
-    
-    user = User.query.get(session['user_id'])
-    if not user or user.status != 'active':
-        session.clear()
-        return jsonify({'error': 'الحساب غير نشط'}), 401
-    
-    return user
-
-def require_admin():
-    """التحقق من صلاحيات الإدارة"""
-    user = require_login()
-    if isinstance(user, tuple):  # إذا كان هناك خطأ
-        return user
-    
-    if user.national_id != 'admin':
-        return jsonify({'error': 'غير مصرح لك بالوصول'}), 403
-    
-    return user
-
 @request_bp.route('/requests', methods=['POST'])
 def create_request():
     """إنشاء طلب جديد"""
@@ -37,49 +27,16 @@ def create_request():
     try:
         data = request.json
         
-        # التحقق من نوع الطلب
+        # التحقق من نوع الطلب وبياناته عبر مخطط النوع
         request_type = data.get('type')
-        if request_type not in ['appointment', 'consultation', 'medical_request', 'medical_excuse', 'review_certificate', 'patient_companion_report']:
+        schema = get_schema(request_type)
+        if not schema:
             return jsonify({'error': 'نوع الطلب غير صحيح'}), 400
         
-        # التحقق من البيانات المطلوبة حسب نوع الطلب
         request_data = data.get('data', {})
-        
-        if request_type == 'appointment':
-            required_fields = ['specialty', 'city', 'preferredDate', 'preferredTime']
-            for field in required_fields:
-                if not request_data.get(field):
-                    return jsonify({'error': f'الحقل {field} مطلوب للمواعيد'}), 400
-        
-        elif request_type == 'consultation':
-            required_fields = ['consultationType', 'description']
-            for field in required_fields:
-                if not request_data.get(field):
-                    return jsonify({'error': f'الحقل {field} مطلوب للاستشارات'}), 400
-        
-        elif request_type == 'medical_request':
-            required_fields = ['reportType', 'purpose']
-            for field in required_fields:
-                if not request_data.get(field):
-                    return jsonify({'error': f'الحقل {field} مطلوب للتقارير الطبية'}), 400
-        
-        elif request_type == 'medical_excuse':
-            required_fields = ['startDate', 'endDate', 'region', 'workplace']
-            for field in required_fields:
-                if not request_data.get(field):
-                    return jsonify({'error': f'الحقل {field} مطلوب للعذر الطبي'}), 400
-        
-        elif request_type == 'review_certificate':
-            required_fields = ['reviewDate', 'region', 'workplace']
-            for field in required_fields:
-                if not request_data.get(field):
-                    return jsonify({'error': f'الحقل {field} مطلوب لمشهد المراجعة'}), 400
-        
-        elif request_type == 'patient_companion_report':
-            required_fields = ['patientName', 'patientNationalId', 'hospitalEntryDate', 'hospitalExitDate', 'medicalCondition', 'region', 'companionName', 'companionNationalId', 'relationship']
-            for field in required_fields:
-                if not request_data.get(field):
-                    return jsonify({'error': f'الحقل {field} مطلوب لتقرير مرافق المريض'}), 400
+        error = schema.create.validate(request_data)
+        if error:
+            return jsonify({'error': error}), 400
         
         # إنشاء الطلب
         new_request = Request(
@@ -90,6 +47,7 @@ def create_request():
         new_request.set_data(request_data)
         
         db.session.add(new_request)
+        record_request_created(request_type)
         db.session.commit()
         
         return jsonify({
@@ -101,6 +59,15 @@ def create_request():
         db.session.rollback()
         return jsonify({'error': 'حدث خطأ في إنشاء الطلب'}), 500
 
+@request_bp.route('/request-types', methods=['GET'])
+def get_request_types():
+    """مخططات أنواع الطلبات (الحقول وأنواعها وقواعدها) لبناء النماذج والتحقق في الواجهة الأمامية"""
+    response = jsonify(describe_schemas())
+    response.cache_control.public = True
+    response.cache_control.max_age = 3600
+    response.add_etag()
+    return response.make_conditional(request)
+
 @request_bp.route('/requests', methods=['GET'])
 def get_user_requests():
     """الحصول على طلبات المستخدم"""
@@ -109,9 +76,30 @@ def get_user_requests():
         return user
     
     try:
-        user_requests = Request.query.filter_by(user_id=user.id).order_by(Request.created_date.desc()).all()
-        return jsonify([req.to_dict() for req in user_requests]), 200
+        # الواجهة تستطلع القائمة دورياً: 304 بدون تحميل الطلبات إذا لم تتغير بيانات المستخدم
+        etag = user_etag(user.id)
+        if is_unchanged(etag):
+            return unchanged_response(etag)
+        
+        query = Request.query.options(
+            selectinload(Request.pdf_files)
+        ).filter_by(user_id=user.id)
+        
+        # التصفح بالمؤشر اختياري: بدون cursor/limit تُعاد القائمة كاملة كما في السابق
+        if 'cursor' not in request.args and 'limit' not in request.args:
+            user_requests = order_newest_first(query, Request).all()
+            return private_cache(jsonify([req.to_dict() for req in user_requests]), etag), 200
+        
+        total = query.count() if wants_count(request.args, default=False) else None
+        user_requests, next_cursor = keyset_page(
+            query, Request, request.args.get('cursor'),
+            clamp_per_page(request.args.get('limit', type=int))
+        )
+        response = jsonify([req.to_dict() for req in user_requests])
+        return private_cache(set_page_headers(response, next_cursor, total), etag), 200
         
+    except InvalidCursor:
+        return jsonify({'error': 'مؤشر التصفح غير صالح'}), 400
     except Exception as e:
         return jsonify({'error': 'حدث خطأ في جلب الطلبات'}), 500
 
@@ -123,11 +111,15 @@ def get_request(request_id):
         return user
     
     try:
+        etag = user_etag(user.id)
+        if is_unchanged(etag):
+            return unchanged_response(etag)
+        
         req = Request.query.filter_by(id=request_id, user_id=user.id).first()
         if not req:
             return jsonify({'error': 'الطلب غير موجود'}), 404
         
-        return jsonify(req.to_dict()), 200
+        return private_cache(jsonify(req.to_dict()), etag), 200
         
     except Exception as e:
         return jsonify({'error': 'حدث خطأ في جلب الطلب'}), 500
@@ -147,6 +139,7 @@ def cancel_request(request_id):
         if req.status in ['completed', 'cancelled']:
             return jsonify({'error': 'لا يمكن إلغاء هذا الطلب'}), 400
         
+        record_status_change(req.status, 'cancelled')
         req.status = 'cancelled'
         req.updated_date = datetime.utcnow()
         db.session.commit()
@@ -158,33 +151,100 @@ def cancel_request(request_id):
         return jsonify({'error': 'حدث خطأ في إلغاء الطلب'}), 500
 
 # مسارات الإدارة
+def _admin_requests_page(query):
+    """
+    قائمة الإدارة المقسمة إلى صفحات بالشكل {requests, pagination}: بالإزاحة عبر page (مع إمكانية
+    تعطيل COUNT عبر count=none)، أو بالمؤشر عبر cursor (فارغ للصفحة الأولى) لتجنب كلفة OFFSET
+    """
+    page = request.args.get('page', 1, type=int)
+    per_page = clamp_per_page(request.args.get('per_page', type=int))
+    
+    if 'cursor' in request.args:
+        total = query.count() if wants_count(request.args, default=False) else None
+        requests, next_cursor = keyset_page(query, Request, request.args.get('cursor'), per_page)
+        
+        return jsonify({
+            'requests': [req.to_dict_with_user() for req in requests],
+            'pagination': {
+                'per_page': per_page,
+                'total': total,
+                'has_next': next_cursor is not None,
+                'next_cursor': next_cursor
+            }
+        }), 200
+    
+    count = wants_count(request.args, default=True)
+    requests = order_newest_first(query, Request).paginate(
+        page=page,
+        per_page=per_page,
+        error_out=False,
+        count=count
+    )
+    has_next = requests.has_next if count else len(requests.items) == per_page
+    
+    return jsonify({
+        'requests': [req.to_dict_with_user() for req in requests.items],
+        'pagination': {
+            'page': page,
+            'per_page': per_page,
+            'total': requests.total,
+            'pages': requests.pages if count else None,
+            'has_next': has_next,
+            'has_prev': requests.has_prev,
+            'next_cursor': encode_cursor(requests.items[-1]) if has_next else None
+        }
+    }), 200
+
 @request_bp.route('/admin/requests', methods=['GET'])
+@read_replica
 def admin_get_requests():
-    """الحصول على جميع الطلبات (للإدارة)"""
+    """
+    الحصول على جميع الطلبات (للإدارة)، مع البحث في بيانات مقدم الطلب عبر search
+    بدون معاملات تصفح تُعاد القائمة كاملة؛ limit و/أو cursor لصفحة واحدة مع المؤشر التالي في الترويسات؛
+    page و/أو per_page لصفحة داخل {requests, pagination}
+    """
     admin = require_admin()
     if isinstance(admin, tuple):
         return admin
     
     try:
-        # فلترة حسب النوع أو الحالة إذا تم تمريرها
-        request_type = request.args.get('type')
-        status = request.args.get('status')
-        
-        query = Request.query
-        
-        if request_type:
-            query = query.filter_by(type=request_type)
-        
-        if status:
-            query = query.filter_by(status=status)
+        # فلترة حسب النوع والحالة والتخصص والمدينة والمنطقة والتاريخ إذا تم تمريرها
+        query = apply_request_filters(
+            Request.query.options(*Request.eager_load_options()), request.args
+        )
         
-        requests = query.order_by(Request.created_date.desc()).all()
-        return jsonify([req.to_dict_with_user() for req in requests]), 200
+        search_query = request.args.get('search', '').strip()
+        if search_query:
+            # البحث في بيانات المستخدم عبر فهرس البحث
+            query = query.join(User, Request.user_id == User.id).filter(
+                get_search_backend(db).user_filter(User, search_query)
+            )
+        
+        if 'page' in request.args or 'per_page' in request.args:
+            return _admin_requests_page(query)
+        
+        # التصفح بالمؤشر اختياري: بدون cursor/limit تُعاد القائمة كاملة كما في السابق
+        if 'cursor' not in request.args and 'limit' not in request.args:
+            requests = order_newest_first(query, Request).all()
+            return jsonify([req.to_dict_with_user() for req in requests]), 200
+        
+        total = query.count() if wants_count(request.args, default=False) else None
+        requests, next_cursor = keyset_page(
+            query, Request, request.args.get('cursor'),
+            clamp_per_page(request.args.get('limit', type=int))
+        )
+        response = jsonify([req.to_dict_with_user() for req in requests])
+        return set_page_headers(response, next_cursor, total), 200
         
+    except InvalidCursor:
+        return jsonify({'error': 'مؤشر التصفح غير صالح'}), 400
+    except InvalidFilter as e:
+        return jsonify({'error': f'قيمة الفلتر {e} غير صحيحة'}), 400
     except Exception as e:
         return jsonify({'error': 'حدث خطأ في جلب الطلبات'}), 500
 
 @request_bp.route('/admin/requests/<int:request_id>', methods=['GET'])
+@read_replica
 def admin_get_request(request_id):
     """الحصول على تفاصيل طلب محدد (للإدارة)"""
     admin = require_admin()
@@ -206,13 +266,17 @@ def admin_update_request_status(request_id):
         return admin
     
     try:
-        req = Request.query.get_or_404(request_id)
+        # قفل الصف حتى الحفظ: التحقق من الانتقال لا يسبقه تعديل متزامن
+        req = Request.query.filter_by(id=request_id).with_for_update().first_or_404()
         data = request.json
         
         new_status = data.get('status')
         if new_status not in ['pending', 'in_progress', 'completed', 'cancelled']:
             return jsonify({'error': 'حالة غير صحيحة'}), 400
+        if not is_allowed_transition(req.status, new_status):
+            return jsonify({'error': 'لا يمكن تغيير حالة الطلب من حالته الحالية إلى هذه الحالة'}), 400
         
+        record_status_change(req.status, new_status)
         req.status = new_status
         req.updated_date = datetime.utcnow()
         
@@ -235,6 +299,55 @@ def admin_update_request_status(request_id):
         db.session.rollback()
         return jsonify({'error': 'حدث خطأ في تحديث الطلب'}), 500
 
+@request_bp.route('/admin/requests/bulk-status', methods=['POST'])
+def admin_bulk_update_status():
+    """
+    تحديث حالة مجموعة طلبات (للإدارة): ids قائمة معرفات أو filter بنفس فلاتر قائمة الطلبات،
+    مع status و notes و processed_data اختيارياً؛ يُعاد ملخص مختصر (verbose لإرجاع المعرفات)
+    """
+    admin = require_admin()
+    if isinstance(admin, tuple):
+        return admin
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        new_status = data.get('status')
+        if new_status not in REQUEST_STATUSES:
+            return jsonify({'error': 'حالة غير صحيحة'}), 400
+        
+        ids = data.get('ids')
+        filters = data.get('filter')
+        if (ids is None) == (filters is None):
+            return jsonify({'error': 'يجب تحديد الطلبات بقائمة ids أو بفلتر filter'}), 400
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+                return jsonify({'error': 'قائمة المعرفات غير صحيحة'}), 400
+            if len(ids) > MAX_BULK_IDS:
+                return jsonify({'error': f'الحد الأقصى {MAX_BULK_IDS} طلب في العملية الواحدة'}), 400
+        elif not isinstance(filters, dict) or not any(filters.values()):
+            return jsonify({'error': 'الفلتر لا يمكن أن يكون فارغاً'}), 400
+        
+        chunk_size = data.get('chunk_size', BULK_CHUNK_SIZE)
+        if not isinstance(chunk_size, int) or not 1 <= chunk_size <= 1000:
+            return jsonify({'error': 'حجم الدفعة يجب أن يكون بين 1 و 1000'}), 400
+        
+        summary = bulk_update_status(
+            new_status, ids=ids, filters=filters,
+            notes=data.get('notes'),
+            processed_data=data.get('processed_data'),
+            chunk_size=chunk_size,
+            verbose=bool(data.get('verbose'))
+        )
+        
+        return jsonify({'message': f'تم تحديث {summary["updated"]} طلب', **summary}), 200
+        
+    except InvalidFilter as e:
+        return jsonify({'error': f'قيمة الفلتر {e} غير صحيحة'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'حدث خطأ في تحديث الطلبات'}), 500
+
 @request_bp.route('/admin/requests/<int:request_id>/process', methods=['POST'])
 def admin_process_request(request_id):
     """معالجة طلب (للإدارة)"""
@@ -243,48 +356,23 @@ def admin_process_request(request_id):
         return admin
     
     try:
-        req = Request.query.get_or_404(request_id)
+        req = Request.query.filter_by(id=request_id).with_for_update().first_or_404()
         data = request.json
         
-        if req.type == 'appointment':
-            # معالجة طلب الموعد
-            processed_data = {
-                'hospitalName': data.get('hospitalName'),
-                'doctorName': data.get('doctorName'),
-                'doctorSpecialty': data.get('doctorSpecialty'),
-                'doctorPhone': data.get('doctorPhone'),
-                'appointmentDate': data.get('appointmentDate'),
-                'appointmentTime': data.get('appointmentTime')
-            }
-            
-            # التحقق من البيانات المطلوبة
-            required_fields = ['hospitalName', 'doctorName', 'doctorSpecialty', 'doctorPhone', 'appointmentDate', 'appointmentTime']
-            for field in required_fields:
-                if not processed_data.get(field):
-                    return jsonify({'error': f'الحقل {field} مطلوب'}), 400
-            
-            req.set_processed_data(processed_data)
-            req.status = 'completed'
-            
-        elif req.type == 'consultation':
-            # معالجة طلب الاستشارة
-            processed_data = {
-                'doctorName': data.get('doctorName'),
-                'doctorSpecialty': data.get('doctorSpecialty'),
-                'doctorPhone': data.get('doctorPhone')
-            }
-            
-            # التحقق من البيانات المطلوبة
-            required_fields = ['doctorName', 'doctorSpecialty', 'doctorPhone']
-            for field in required_fields:
-                if not processed_data.get(field):
-                    return jsonify({'error': f'الحقل {field} مطلوب'}), 400
-            
-            req.set_processed_data(processed_data)
-            req.status = 'completed'
-        
-        else:
+        # الأنواع التي تدعم المعالجة هي التي لها مخطط معالجة في السجل
+        schema = get_schema(req.type)
+        if not schema or not schema.process:
             return jsonify({'error': 'نوع الطلب لا يدعم هذه العملية'}), 400
+        if not is_allowed_transition(req.status, 'completed'):
+            return jsonify({'error': 'لا يمكن معالجة طلب ملغي'}), 400
+        
+        error = schema.process.validate(data)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        req.set_processed_data(schema.process.extract(data))
+        record_status_change(req.status, 'completed')
+        req.status = 'completed'
         
         req.updated_date = datetime.utcnow()
         if 'notes' in data:
@@ -302,6 +390,7 @@ def admin_process_request(request_id):
         return jsonify({'error': 'حدث خطأ في معالجة الطلب'}), 500
 
 @request_bp.route('/admin/statistics', methods=['GET'])
+@read_replica
 def admin_get_statistics():
     """الحصول على إحصائيات الطلبات (للإدارة)"""
     admin = require_admin()
@@ -309,31 +398,18 @@ def admin_get_statistics():
         return admin
     
     try:
-        total_requests = Request.query.count()
-        pending_requests = Request.query.filter_by(status='pending').count()
-        completed_requests = Request.query.filter_by(status='completed').count()
-        cancelled_requests = Request.query.filter_by(status='cancelled').count()
-        
-        # طلبات اليوم
-        today = datetime.utcnow().date()
-        today_requests = Request.query.filter(
-            db.func.date(Request.created_date) == today
-        ).count()
-        
-        # إحصائيات حسب النوع
-        appointment_requests = Request.query.filter_by(type='appointment').count()
-        consultation_requests = Request.query.filter_by(type='consultation').count()
-        medical_requests = Request.query.filter_by(type='medical_request').count()
+        # جميع الأرقام من استعلام تجميعي واحد (أو من جدول العدادات) مع ذاكرة مؤقتة قصيرة
+        stats = get_request_stats()
         
         return jsonify({
-            'total_requests': total_requests,
-            'pending_requests': pending_requests,
-            'completed_requests': completed_requests,
-            'cancelled_requests': cancelled_requests,
-            'today_requests': today_requests,
-            'appointment_requests': appointment_requests,
-            'consultation_requests': consultation_requests,
-            'medical_requests': medical_requests
+            'total_requests': stats['total'],
+            'pending_requests': stats['by_status']['pending'],
+            'completed_requests': stats['by_status']['completed'],
+            'cancelled_requests': stats['by_status']['cancelled'],
+            'today_requests': stats['today'],
+            'appointment_requests': stats['by_type']['appointment'],
+            'consultation_requests': stats['by_type']['consultation'],
+            'medical_requests': stats['by_type']['medical_request']
         }), 200
         
     except Exception as e:
@@ -1,5 +1,8 @@
 from flask import Blueprint, jsonify, request, session
-from src.models import db, User
+from src.models import db, User, Request
+from src.utils.auth import invalidate_user, require_admin
+from src.utils.stats import invalidate_stats, record_requests_deleted
+from src.utils.versioning import is_unchanged, private_cache, unchanged_response, user_etag
 from datetime import datetime
 import re
 
@@ -63,6 +66,7 @@ def register():
         
         db.session.add(user)
         db.session.commit()
+        invalidate_stats()
         
         return jsonify({
             'message': 'تم إنشاء الحساب بنجاح',
@@ -119,11 +123,16 @@ def get_profile():
     if 'user_id' not in session:
         return jsonify({'error': 'يجب تسجيل الدخول أولاً'}), 401
     
-    user = User.query.get(session['user_id'])
-    if not user:
+    version = db.session.query(User.data_version).filter(User.id == session['user_id']).scalar()
+    if version is None:
         return jsonify({'error': 'المستخدم غير موجود'}), 404
     
-    return jsonify(user.to_dict()), 200
+    etag = user_etag(session['user_id'], version)
+    if is_unchanged(etag):
+        return unchanged_response(etag)
+    
+    user = User.query.get(session['user_id'])
+    return private_cache(jsonify(user.to_dict()), etag), 200
 
 @user_bp.route('/profile', methods=['PUT'])
 def update_profile():
@@ -162,6 +171,7 @@ def update_profile():
             user.phone = data['phone']
         
         db.session.commit()
+        invalidate_user(user.id)
         
         return jsonify({
             'message': 'تم تحديث الملف الشخصي بنجاح',
@@ -176,27 +186,28 @@ def update_profile():
 def check_session():
     """التحقق من حالة الجلسة"""
     if 'user_id' in session:
-        user = User.query.get(session['user_id'])
-        if user and user.status == 'active':
-            return jsonify({
+        row = db.session.query(User.status, User.data_version).filter(User.id == session['user_id']).first()
+        if row and row.status == 'active':
+            etag = user_etag(session['user_id'], row.data_version)
+            if is_unchanged(etag):
+                return unchanged_response(etag)
+            user = User.query.get(session['user_id'])
+            return private_cache(jsonify({
                 'logged_in': True,
                 'user': user.to_dict()
-            }), 200
+            }), etag), 200
         else:
             session.clear()
     
-    return jsonify({'logged_in': False}), 200
+    return private_cache(jsonify({'logged_in': False})), 200
 
 # مسارات الإدارة (محمية)
 @user_bp.route('/admin/users', methods=['GET'])
 def admin_get_users():
     """الحصول على جميع المستخدمين (للإدارة فقط)"""
-    if 'user_id' not in session:
-        return jsonify({'error': 'يجب تسجيل الدخول أولاً'}), 401
-    
-    admin_user = User.query.get(session['user_id'])
-    if not admin_user or admin_user.national_id != 'admin':
-        return jsonify({'error': 'غير مصرح لك بالوصول'}), 403
+    admin_user = require_admin()
+    if isinstance(admin_user, tuple):
+        return admin_user
     
     users = User.query.all()
     return jsonify([user.to_dict() for user in users]), 200
@@ -204,12 +215,9 @@ def admin_get_users():
 @user_bp.route('/admin/users/<int:user_id>/block', methods=['POST'])
 def admin_block_user(user_id):
     """حظر مستخدم (للإدارة فقط)"""
-    if 'user_id' not in session:
-        return jsonify({'error': 'يجب تسجيل الدخول أولاً'}), 401
-    
-    admin_user = User.query.get(session['user_id'])
-    if not admin_user or admin_user.national_id != 'admin':
-        return jsonify({'error': 'غير مصرح لك بالوصول'}), 403
+    admin_user = require_admin()
+    if isinstance(admin_user, tuple):
+        return admin_user
     
     try:
         user = User.query.get_or_404(user_id)
@@ -218,6 +226,7 @@ def admin_block_user(user_id):
         
         user.status = 'blocked'
         db.session.commit()
+        invalidate_user(user.id)
         
         return jsonify({'message': f'تم حظر المستخدم {user.full_name}'}), 200
         
@@ -228,17 +237,15 @@ def admin_block_user(user_id):
 @user_bp.route('/admin/users/<int:user_id>/unblock', methods=['POST'])
 def admin_unblock_user(user_id):
     """إلغاء حظر مستخدم (للإدارة فقط)"""
-    if 'user_id' not in session:
-        return jsonify({'error': 'يجب تسجيل الدخول أولاً'}), 401
-    
-    admin_user = User.query.get(session['user_id'])
-    if not admin_user or admin_user.national_id != 'admin':
-        return jsonify({'error': 'غير مصرح لك بالوصول'}), 403
+    admin_user = require_admin()
+    if isinstance(admin_user, tuple):
+        return admin_user
     
     try:
         user = User.query.get_or_404(user_id)
         user.status = 'active'
         db.session.commit()
+        invalidate_user(user.id)
         
         return jsonify({'message': f'تم إلغاء حظر المستخدم {user.full_name}'}), 200
         
@@ -249,12 +256,9 @@ def admin_unblock_user(user_id):
 @user_bp.route('/admin/users/<int:user_id>', methods=['DELETE'])
 def admin_delete_user(user_id):
     """حذف مستخدم (للإدارة فقط)"""
-    if 'user_id' not in session:
-        return jsonify({'error': 'يجب تسجيل الدخول أولاً'}), 401
-    
-    admin_user = User.query.get(session['user_id'])
-    if not admin_user or admin_user.national_id != 'admin':
-        return jsonify({'error': 'غير مصرح لك بالوصول'}), 403
+    admin_user = require_admin()
+    if isinstance(admin_user, tuple):
+        return admin_user
     
     try:
         user = User.query.get_or_404(user_id)
@@ -262,8 +266,15 @@ def admin_delete_user(user_id):
             return jsonify({'error': 'لا يمكن حذف حساب المدير'}), 400
         
         user_name = user.full_name
+        deleted_user_id = user.id
+        
+        # تحديث عدادات الطلبات التي ستُحذف مع المستخدم
+        record_requests_deleted(db.session.query(
+            Request.type, Request.status, db.func.count(Request.id)
+        ).filter(Request.user_id == user.id).group_by(Request.type, Request.status).all())
         db.session.delete(user)
         db.session.commit()
+        invalidate_user(deleted_user_id)
         
         return jsonify({'message': f'تم حذف المستخدم {user_name}'}), 200
         
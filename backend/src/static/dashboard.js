@@ -273,9 +273,9 @@ function showNotification(message, type = 'success') {
     }, 3000);
 }
 
-// Auto-refresh data every 30 seconds
+// Auto-refresh data every 30 seconds (skipped while the tab is hidden)
 setInterval(() => {
-    if (currentUser) {
+    if (currentUser && !document.hidden) {
         loadUserRequests();
         updateStatistics();
     }
@@ -0,0 +1,263 @@
+"""
+بناء ملفات الواجهة الثابتة وتقديمها
+- البناء (build_assets.py): نسخ src/static إلى src/static_dist مع إضافة بصمة المحتوى لأسماء الأصول
+  (styles.<hash>.css) وتحديث الإشارات إليها في HTML و CSS، وتوليد نسخ .gz و .br مضغوطة مسبقاً،
+  وكتابة manifest.json بالأسماء الأصلية ومقابلها
+- التقديم: فهرس في الذاكرة لمجلد الأصول يُبنى مرة واحدة عند التشغيل (المسار، النوع، ETag، النسخ المضغوطة
+  ومحتوى الملفات الصغيرة)، فلا يُفحص القرص في كل طلب؛ تُختار النسخة حسب Accept-Encoding
+- الأصول ذات البصمة تُخزن في المتصفح سنة كاملة (immutable)، وصفحات HTML والأسماء بدون بصمة يُعاد
+  التحقق منها مع كل طلب عبر ETag
+- ضغط brotli اختياري: يُستخدم إذا كانت مكتبة brotli مثبتة وإلا تُولد نسخ gzip فقط
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+from datetime import datetime, timezone
+from flask import current_app, request, send_file
+
+try:
+    import brotli
+except ImportError:  # brotli اختيارية
+    brotli = None
+
+MANIFEST_FILENAME = 'manifest.json'
+# امتدادات تُضاف البصمة لأسمائها؛ صفحات HTML تبقى بأسمائها لأنها عناوين يفتحها المستخدم
+FINGERPRINT_EXTENSIONS = {'.css', '.js', '.png', '.ico', '.svg', '.jpg', '.jpeg', '.gif', '.webp', '.woff', '.woff2'}
+COMPRESS_EXTENSIONS = {'.html', '.css', '.js', '.json', '.svg', '.ico', '.md', '.txt'}
+COMPRESS_MIN_SIZE = 256
+# تُحفظ النسخة المضغوطة فقط إذا وفرت 10% على الأقل
+COMPRESS_MAX_RATIO = 0.9
+# (الترميز، الامتداد) بترتيب الأفضلية
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# الملفات الأكبر تُرسل من القرص بدل إبقائها في الذاكرة
+MEMORY_LIMIT = 1024 * 1024
+
+_REFERENCE = re.compile(r'''(\b(?:src|href)=["']|url\(\s*["']?)(?:\./)?([^"'()?#:\s]+)''')
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _fingerprinted_name(name, data):
+    base, ext = os.path.splitext(name)
+    return f'{base}.{_digest(data)[:10]}{ext}'
+
+
+def _rewrite_references(text, manifest, directory):
+    """استبدال الإشارات إلى الأصول (src و href و url() في CSS) بأسمائها ذات البصمة"""
+    def replace(match):
+        prefix, target = match.groups()
+        if target.startswith('/'):
+            hashed = manifest.get(target[1:])
+            return prefix + '/' + hashed if hashed else match.group(0)
+        hashed = manifest.get(posixpath.normpath(posixpath.join(directory, target)))
+        if not hashed:
+            return match.group(0)
+        return prefix + posixpath.relpath(hashed, directory or '.')
+    return _REFERENCE.sub(replace, text)
+
+
+def _write_compressed(path, data):
+    """كتابة نسخ .gz و .br إذا كانت أصغر بما يكفي؛ يُرجع الترميزات المكتوبة"""
+    written = []
+    if len(data) < COMPRESS_MIN_SIZE:
+        return written
+    variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli:
+        variants['br'] = brotli.compress(data, quality=11)
+    for encoding, suffix in ENCODINGS:
+        compressed = variants.get(encoding)
+        if compressed is not None and len(compressed) <= len(data) * COMPRESS_MAX_RATIO:
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+            written.append(encoding)
+    return written
+
+
+def build_assets(source_dir, output_dir, log=print):
+    """
+    بناء مجلد الأصول من جديد؛ يُرجع manifest: {الاسم الأصلي: الاسم ذو البصمة}
+    الأصول تُعالج قبل CSS وقبل HTML حتى تُكتب الإشارات بأسمائها النهائية
+    """
+    files = []
+    for root, dirs, names in os.walk(source_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        for name in sorted(names):
+            if not name.startswith('.'):
+                files.append(os.path.relpath(os.path.join(root, name), source_dir).replace(os.sep, '/'))
+
+    def order(name):
+        ext = os.path.splitext(name)[1]
+        return (ext == '.html', ext == '.css', ext == '.js', name)
+
+    staging = output_dir.rstrip('/') + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    manifest = {}
+    totals = {'files': 0, 'bytes': 0, 'gzip': 0, 'br': 0}
+    for name in sorted(files, key=order):
+        with open(os.path.join(source_dir, name), 'rb') as f:
+            data = f.read()
+        ext = os.path.splitext(name)[1].lower()
+        if ext in ('.html', '.css'):
+            data = _rewrite_references(data.decode('utf-8'), manifest, os.path.dirname(name)).encode('utf-8')
+
+        targets = [name]
+        if ext in FINGERPRINT_EXTENSIONS:
+            manifest[name] = _fingerprinted_name(name, data)
+            targets.append(manifest[name])
+        for target in targets:
+            path = os.path.join(staging, target)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+            encodings = _write_compressed(path, data) if ext in COMPRESS_EXTENSIONS else []
+            totals['files'] += 1
+            totals['bytes'] += len(data)
+            for encoding in encodings:
+                totals[encoding] += 1
+        log(f'{name} -> {targets[-1]} ({len(data)} bytes)')
+
+    with open(os.path.join(staging, MANIFEST_FILENAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    # الاستبدال في النهاية حتى لا تقدم العمليات العاملة مجلداً نصف مكتمل
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(staging, output_dir)
+    log(f"{totals['files']} files, {totals['bytes']} bytes, {totals['gzip']} gzip, {totals['br']} brotli"
+        + ('' if brotli else ' (brotli غير مثبتة)'))
+    return manifest
+
+
+class Asset:
+    """ملف في الفهرس مع نسخه المضغوطة؛ variants: {الترميز: (المسار، الحجم، المحتوى أو None)}"""
+
+    __slots__ = ('mimetype', 'etag', 'last_modified', 'immutable', 'variants')
+
+    def __init__(self, mimetype, etag, last_modified, immutable, variants):
+        self.mimetype = mimetype
+        self.etag = etag
+        self.last_modified = last_modified
+        self.immutable = immutable
+        self.variants = variants
+
+
+def _load_variant(path):
+    size = os.path.getsize(path)
+    if size > MEMORY_LIMIT:
+        return path, size, None
+    with open(path, 'rb') as f:
+        return path, size, f.read()
+
+
+class AssetIndex:
+    """فهرس مجلد الأصول في الذاكرة: {المسار النسبي: Asset}"""
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.assets = {}
+        manifest_path = os.path.join(folder, MANIFEST_FILENAME)
+        self.built = os.path.exists(manifest_path)
+        hashed = set()
+        if self.built:
+            with open(manifest_path) as f:
+                hashed = set(json.load(f).values())
+
+        suffixes = tuple(suffix for _, suffix in ENCODINGS)
+        for root, dirs, names in os.walk(folder):
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+            for name in names:
+                if name.startswith('.') or name.endswith(suffixes):
+                    continue
+                path = os.path.join(root, name)
+                key = os.path.relpath(path, folder).replace(os.sep, '/')
+                if self.built and key == MANIFEST_FILENAME:
+                    continue
+                variants = {None: _load_variant(path)}
+                for encoding, suffix in ENCODINGS:
+                    if os.path.exists(path + suffix):
+                        variants[encoding] = _load_variant(path + suffix)
+                content = variants[None][2]
+                if content is not None:
+                    etag = _digest(content)[:16]
+                else:
+                    stat = os.stat(path)
+                    etag = f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+                mtime = datetime.fromtimestamp(int(os.path.getmtime(path)), timezone.utc)
+                self.assets[key] = Asset(
+                    mimetypes.guess_type(name)[0] or 'application/octet-stream',
+                    etag, mtime, key in hashed, variants
+                )
+
+    def get(self, path):
+        return self.assets.get(path)
+
+    def stats(self):
+        return {
+            'folder': self.folder,
+            'built': self.built,
+            'files': len(self.assets),
+            'memory_bytes': sum(size for asset in self.assets.values()
+                                for _, size, content in asset.variants.values() if content is not None),
+        }
+
+
+def _negotiate(asset):
+    accepted = request.accept_encodings
+    for encoding, _ in ENCODINGS:
+        if encoding in asset.variants and accepted.quality(encoding) > 0:
+            return encoding
+    return None
+
+
+def send_asset(asset):
+    """إرسال الأصل بالترميز الأنسب مع ترويسات التخزين؛ يدعم If-None-Match و Range"""
+    encoding = _negotiate(asset)
+    path, size, content = asset.variants[encoding]
+    # لكل ترميز ETag مختلف لأن المحتوى المرسل مختلف
+    etag = f'{asset.etag}-{encoding}' if encoding else asset.etag
+    max_age = IMMUTABLE_MAX_AGE if asset.immutable else None
+
+    if content is None:
+        response = send_file(path, mimetype=asset.mimetype, conditional=True, etag=etag,
+                             last_modified=asset.last_modified, max_age=max_age)
+    else:
+        response = current_app.response_class(content, mimetype=asset.mimetype)
+        response.set_etag(etag)
+        response.last_modified = asset.last_modified
+        response = response.make_conditional(request, accept_ranges=True, complete_length=size)
+
+    if asset.immutable:
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if len(asset.variants) > 1:
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_static_assets(app, dist_folder):
+    """
+    تحميل فهرس الأصول: من مجلد البناء إذا وُجد فيه manifest.json، وإلا من app.static_folder كما هو
+    (بدون بصمات أو ضغط مسبق)؛ في وضع debug يُعاد بناء الفهرس مع كل طلب لتظهر التعديلات مباشرة
+    """
+    folder = dist_folder if os.path.exists(os.path.join(dist_folder, MANIFEST_FILENAME)) else app.static_folder
+    app.extensions['static_assets'] = AssetIndex(folder) if folder and os.path.isdir(folder) else None
+    return app.extensions['static_assets']
+
+
+def asset_index():
+    index = current_app.extensions.get('static_assets')
+    if index is not None and current_app.debug:
+        index = AssetIndex(index.folder)
+    return index
@@ -0,0 +1,85 @@
+"""
+التحقق من تسجيل الدخول وصلاحيات الإدارة لجميع المسارات
+يُخزن موجز المستخدم المصادق (المعرف، رقم الهوية، الحالة) في ذاكرة مؤقتة محدودة قصيرة العمر
+لتجنب استعلام قاعدة البيانات في كل طلب قراءة؛ الحظر والحذف وتعديل الحالة تُبطل العنصر في العملية التي نفذتها،
+وطلب قرأ المستخدم قبل الإبطال لا يعيد تخزين الموجز القديم بعده (رقم جيل الذاكرة المؤقتة)
+- طلبات الكتابة (غير GET/HEAD/OPTIONS) تقرأ الموجز من قاعدة البيانات دائماً، فالحساب المحظور أو المحذوف
+  لا يعدّل شيئاً في أي عملية (worker) فور حفظ الحظر
+- طلبات القراءة في العمليات الأخرى تتأخر عن الحظر بحد أقصى AUTH_CACHE_TTL (5 ثوانٍ افتراضياً)
+"""
+
+from dataclasses import dataclass
+from flask import current_app, jsonify, request, session
+from src.models import db, User
+from src.utils.cache import TTLCache
+
+DEFAULT_AUTH_CACHE_TTL = 5  # بالثواني، 0 لتعطيل الذاكرة المؤقتة
+CACHED_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+AUTH_CACHE_MAX_ENTRIES = 10000
+
+
+@dataclass(frozen=True)
+class Principal:
+    """موجز غير قابل للتعديل للمستخدم المصادق (ليس tuple حتى لا يُخلط مع استجابات الخطأ في المسارات)"""
+    id: int
+    national_id: str
+    status: str
+    is_admin: bool
+
+
+_principal_cache = TTLCache(maxsize=AUTH_CACHE_MAX_ENTRIES, ttl=DEFAULT_AUTH_CACHE_TTL)
+_NOT_FOUND = Principal(None, None, None, False)
+
+
+def _fetch_principal(user_id):
+    row = db.session.query(User.id, User.national_id, User.status).filter(User.id == user_id).first()
+    if not row:
+        return _NOT_FOUND
+    return Principal(row.id, row.national_id, row.status, row.national_id == 'admin')
+
+
+def load_principal(user_id):
+    """إرجاع موجز المستخدم من الذاكرة المؤقتة أو من قاعدة البيانات، أو None إذا لم يوجد"""
+    ttl = current_app.config.get('AUTH_CACHE_TTL', DEFAULT_AUTH_CACHE_TTL)
+    if ttl <= 0:
+        principal = _fetch_principal(user_id)
+    elif request.method not in CACHED_METHODS:
+        # الكتابة تعتمد على قاعدة البيانات لا على ذاكرة هذه العملية، وتُحدّث العنصر المخزن
+        _principal_cache.ttl = ttl
+        generation = _principal_cache.generation
+        principal = _fetch_principal(user_id)
+        _principal_cache.set(user_id, principal, generation=generation)
+    else:
+        _principal_cache.ttl = ttl
+        principal = _principal_cache.get_or_set(user_id, lambda: _fetch_principal(user_id))
+    return principal if principal.id is not None else None
+
+
+def invalidate_user(user_id):
+    """إبطال موجز المستخدم بعد أي تعديل على حالته أو بياناته"""
+    _principal_cache.pop(user_id)
+
+
+def require_login():
+    """التحقق من تسجيل الدخول"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'يجب تسجيل الدخول أولاً'}), 401
+    
+    user = load_principal(session['user_id'])
+    if not user or user.status != 'active':
+        session.clear()
+        return jsonify({'error': 'الحساب غير نشط'}), 401
+    
+    return user
+
+
+def require_admin():
+    """التحقق من صلاحيات الإدارة"""
+    user = require_login()
+    if isinstance(user, tuple):  # إذا كان هناك خطأ
+        return user
+    
+    if not user.is_admin:
+        return jsonify({'error': 'غير مصرح لك بالوصول'}), 403
+    
+    return user
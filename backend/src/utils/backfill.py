@@ -0,0 +1,40 @@
+"""
+ملء الأعمدة المستخرجة من Request.data للطلبات الموجودة على دفعات
+يتقدم بالمعرف (keyset) ويحفظ كل دفعة في معاملة مستقلة حتى يمكن إيقافه واستئنافه
+"""
+
+from src.models import db, Request
+from src.utils import jsonlib
+from src.models.request import extract_promoted_fields
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def backfill_request_fields(batch_size=DEFAULT_BATCH_SIZE, start_after_id=0, progress=None):
+    """تحديث الحقول المستخرجة لجميع الطلبات ذات المعرف الأكبر من start_after_id، وإرجاع عدد الطلبات"""
+    last_id = start_after_id
+    processed = 0
+    while True:
+        rows = db.session.query(Request.id, Request.data).filter(
+            Request.id > last_id
+        ).order_by(Request.id).limit(batch_size).all()
+        if not rows:
+            break
+        
+        updates = []
+        for request_id, raw in rows:
+            try:
+                data = jsonlib.loads(raw) if raw else {}
+            except jsonlib.JSONDecodeError:
+                data = {}
+            updates.append({'id': request_id, **extract_promoted_fields(data if isinstance(data, dict) else {})})
+        
+        # تحديث مجمع بالمفتاح الأساسي (executemany) لكل الدفعة
+        db.session.execute(db.update(Request), updates)
+        db.session.commit()
+        
+        last_id = rows[-1][0]
+        processed += len(rows)
+        if progress:
+            progress(processed, last_id)
+    return processed
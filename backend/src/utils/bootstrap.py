@@ -0,0 +1,56 @@
+"""
+تهيئة قاعدة البيانات عند النشر: إنشاء الجداول والأعمدة والفهارس الناقصة، ومجلد الرفع، والمدير الافتراضي،
+وبناء جدول عدادات الإحصائيات إذا لم يُبنَ بعد
+تُشغل مرة واحدة قبل بدء عمليات gunicorn (flask --app src.main bootstrap) بدلاً من كل عملية عند الاستيراد،
+وهي آمنة للتكرار وللتشغيل المتزامن
+"""
+
+import os
+from flask import current_app
+from sqlalchemy.exc import DatabaseError, IntegrityError
+from src.models import db, User
+from src.utils.schema import upgrade_schema
+from src.utils.stats import ensure_counters
+
+ADMIN_NATIONAL_ID = 'admin'
+SCHEMA_ATTEMPTS = 5
+
+
+def ensure_admin_user():
+    """إنشاء حساب المدير الافتراضي إذا لم يكن موجوداً؛ يُرجع True إذا أُنشئ الآن"""
+    if db.session.query(User.id).filter_by(national_id=ADMIN_NATIONAL_ID).first():
+        return False
+    admin_user = User(
+        full_name='مدير النظام',
+        national_id=ADMIN_NATIONAL_ID,
+        email='admin@sehhaty.com',
+        phone='0000000000',
+        status='active'
+    )
+    admin_user.set_password('SehhatyAdmin2025!') # كلمة مرور قوية جديدة
+    db.session.add(admin_user)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # أنشأته عملية أخرى بين الفحص والإدراج
+        db.session.rollback()
+        return False
+    return True
+
+
+def bootstrap(app):
+    """تهيئة كاملة داخل سياق التطبيق؛ يُرجع (الأعمدة المضافة، الفهارس المنشأة، هل أُنشئ المدير)"""
+    with app.app_context():
+        os.makedirs(current_app.config['UPLOAD_FOLDER'], exist_ok=True)
+        for attempt in range(SCHEMA_ATTEMPTS):
+            try:
+                columns, indexes = upgrade_schema(db)
+                break
+            except DatabaseError:
+                # عملية متزامنة أنشأت جدولاً أو عموداً بين الفحص والإنشاء؛ المحاولة التالية تراه موجوداً
+                db.session.rollback()
+                if attempt == SCHEMA_ATTEMPTS - 1:
+                    raise
+        admin_created = ensure_admin_user()
+        ensure_counters()
+        return columns, indexes, admin_created
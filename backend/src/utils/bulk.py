@@ -0,0 +1,96 @@
+"""
+تحديث حالة عدد كبير من الطلبات دفعة واحدة (للإدارة)
+- تُحدد الطلبات بقائمة معرفات أو بفلتر، وتُعالج على دفعات بمعاملة مستقلة لكل دفعة
+- لكل دفعة: قراءة (id, status) ثم UPDATE ... RETURNING id واحد لكل حالة مصدر مسموح انتقالها إلى الحالة المطلوبة،
+  فيبقى التحقق من الانتقال داخل شرط WHERE ولا يُحمل أي كائن Request، ويُبنى الملخص مما حُدّث فعلاً
+- الطلبات التي لا يُسمح بانتقالها أو التي في الحالة المطلوبة أصلاً أو التي عدلها طلب متزامن تُتخطى وتُحصى في الملخص
+"""
+
+from datetime import datetime
+from src.models import db, Request
+from src.models.request import ALLOWED_STATUS_TRANSITIONS
+from src.utils import jsonlib
+from src.utils.filters import apply_request_filters
+from src.utils.stats import record_status_change
+from src.utils.versioning import bump_request_owners
+
+BULK_CHUNK_SIZE = 500
+MAX_BULK_IDS = 50000
+
+
+def _id_chunks_from_list(ids, chunk_size):
+    ids = sorted(set(ids))
+    for start in range(0, len(ids), chunk_size):
+        yield ids[start:start + chunk_size]
+
+
+def _id_chunks_from_filter(filters, chunk_size):
+    """معرفات الطلبات المطابقة للفلتر على دفعات بالتصفح بالمفتاح (لا يتأثر بتغير الحالة أثناء التحديث)"""
+    query = apply_request_filters(db.session.query(Request.id), filters)
+    last_id = 0
+    while True:
+        chunk = [row.id for row in query.filter(Request.id > last_id).order_by(Request.id).limit(chunk_size)]
+        if not chunk:
+            return
+        last_id = chunk[-1]
+        yield chunk
+
+
+def bulk_update_status(new_status, ids=None, filters=None, notes=None, processed_data=None,
+                       chunk_size=BULK_CHUNK_SIZE, verbose=False):
+    """
+    تطبيق حالة جديدة على الطلبات المحددة؛ notes و processed_data تُحدث فقط إذا لم تكن None
+    يُرجع ملخصاً: matched, updated, not_found, transitions {from: count},
+    skipped {status: count} (والمعرفات عند verbose)
+    """
+    allowed_sources = [status for status, targets in ALLOWED_STATUS_TRANSITIONS.items() if new_status in targets]
+    values = {'status': new_status}
+    if notes is not None:
+        values['notes'] = notes
+    if processed_data is not None:
+        values['processed_data'] = jsonlib.dumps(processed_data)
+
+    chunks = _id_chunks_from_list(ids, chunk_size) if ids is not None else _id_chunks_from_filter(filters, chunk_size)
+    summary = {'matched': 0, 'updated': 0, 'not_found': 0, 'transitions': {}, 'skipped': {}}
+    if verbose:
+        summary.update({'updated_ids': [], 'skipped_ids': [], 'not_found_ids': []})
+
+    for chunk in chunks:
+        current = dict(db.session.query(Request.id, Request.status).filter(Request.id.in_(chunk)))
+        summary['matched'] += len(current)
+        summary['not_found'] += len(chunk) - len(current)
+        values['updated_date'] = datetime.utcnow()
+
+        changed = []
+        for source in allowed_sources:
+            candidates = [request_id for request_id, status in current.items() if status == source]
+            if not candidates:
+                continue
+            # إعادة التحقق من الحالة في شرط WHERE تحمي من تعديل متزامن بين القراءة والتحديث،
+            # و RETURNING يُرجع ما حُدّث فعلاً لا كل المرشحين
+            updated_ids = db.session.execute(
+                db.update(Request)
+                .where(Request.id.in_(candidates), Request.status == source)
+                .values(**values)
+                .returning(Request.id)
+                .execution_options(synchronize_session=False)
+            ).scalars().all()
+            record_status_change(source, new_status, len(updated_ids))
+            summary['transitions'][source] = summary['transitions'].get(source, 0) + len(updated_ids)
+            changed += updated_ids
+        if changed:
+            bump_request_owners(Request.id.in_(changed))
+        db.session.commit()
+        summary['updated'] += len(changed)
+
+        # المتخطاة: غير المسموح انتقالها، والتي غيّرها تعديل متزامن قبل التحديث (بحالتها عند القراءة)
+        changed = set(changed)
+        skipped = [(request_id, status) for request_id, status in current.items() if request_id not in changed]
+        for request_id, status in skipped:
+            summary['skipped'][status] = summary['skipped'].get(status, 0) + 1
+        if verbose:
+            summary['updated_ids'] += sorted(changed)
+            summary['skipped_ids'] += [request_id for request_id, status in skipped]
+            summary['not_found_ids'] += [request_id for request_id in chunk if request_id not in current]
+
+    return summary
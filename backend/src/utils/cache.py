@@ -0,0 +1,76 @@
+"""
+ذاكرة مؤقتة داخل العملية محدودة الحجم مع مدة صلاحية لكل عنصر
+مناسبة للقيم الصغيرة التي تُقرأ كثيراً وتتغير نادراً (الإحصائيات، بيانات المستخدم المصادق)
+- رقم جيل يزيد مع كل إبطال (pop/clear)؛ get_or_set لا يخزن قيمة حُسبت قبل إبطال وقع أثناء حسابها،
+  فلا يعيد طلب قرأ البيانات القديمة تخزينها بعد الإبطال
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """ذاكرة مؤقتة LRU آمنة للخيوط تنتهي صلاحية عناصرها بعد ttl ثانية"""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def get(self, key, default=None):
+        """إرجاع القيمة إذا كانت موجودة وصالحة"""
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    @property
+    def generation(self):
+        """رقم الجيل الحالي؛ يُمرر إلى set لتجاهل القيمة إذا وقع إبطال بعد قراءته"""
+        return self._generation
+
+    def set(self, key, value, generation=None):
+        """تخزين قيمة مع إزالة الأقدم استخداماً عند امتلاء الذاكرة؛ يُرجع False إذا تُجوهلت القيمة"""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return True
+
+    def get_or_set(self, key, factory):
+        """إرجاع القيمة المخزنة أو حسابها عبر factory وتخزينها (ما لم يقع إبطال أثناء الحساب)"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            generation = self._generation
+            value = factory()
+            self.set(key, value, generation=generation)
+        return value
+
+    def pop(self, key):
+        """إبطال عنصر محدد"""
+        with self._lock:
+            self._generation += 1
+            self._data.pop(key, None)
+
+    def clear(self):
+        """إبطال جميع العناصر"""
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
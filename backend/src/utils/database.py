@@ -0,0 +1,217 @@
+"""
+إعدادات محرك قاعدة البيانات ومجمع الاتصالات من متغيرات البيئة
+- حجم المجمع والفائض مقيدان بحد اتصالات الخادم مقسوماً على عدد العمليات (DB_MAX_CONNECTIONS / WEB_CONCURRENCY)
+- pool_pre_ping يفحص الاتصال قبل استخدامه فلا تظهر أخطاء 500 بعد فترات الخمول أو إعادة تشغيل الخادم،
+  و pool_recycle يستبدل الاتصالات الأقدم من المدة المحددة قبل أن يغلقها الخادم أو الجدار الناري
+- DB_PGBOUNCER=transaction: لا تُرسل معاملات بدء الاتصال (يرفضها PgBouncer) ويُطبق statement_timeout
+  داخل كل معاملة عبر SET LOCAL
+- تُجمع أرقام المجمع (السحب والإرجاع والانتظار والاتصالات الجديدة والمبطلة) لكل عملية وتُعرض على
+  /api/admin/db-pool
+"""
+
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# عدد عمليات gunicorn الافتراضي في gunicorn.conf.py (WEB_CONCURRENCY)
+DEFAULT_WORKERS = 4
+# اتصالات تُترك خارج مجمعات التطبيق (أوامر الصيانة، pdf-worker، psql)
+DEFAULT_RESERVED_CONNECTIONS = 3
+
+
+def _env_int(environ, name, default):
+    value = environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _env_bool(environ, name, default):
+    value = environ.get(name)
+    if value in (None, ''):
+        return default
+    return value.lower() in ('1', 'true', 'yes')
+
+
+class PoolStats:
+    """أرقام مجمع الاتصالات في العملية الحالية"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def increment(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+                'timeouts': self.timeouts,
+                'wait_total_ms': round(self.wait_total * 1000, 3),
+                'wait_mean_ms': round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+            }
+
+    def reset(self):
+        with self._lock:
+            self.__init__()
+
+
+pool_stats = PoolStats()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool يقيس زمن انتظار السحب من المجمع (بما فيه فتح اتصال جديد) وحالات انتهاء المهلة"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.increment('timeouts')
+            raise
+        finally:
+            pool_stats.record_wait(time.perf_counter() - started)
+
+
+def _is_memory_sqlite(database_url):
+    return database_url in ('sqlite://', 'sqlite:///') or ':memory:' in database_url
+
+
+def pool_budget(environ=os.environ):
+    """الحد الأقصى للاتصالات لكل عملية حسب DB_MAX_CONNECTIONS، أو None إذا لم يُحدد"""
+    max_connections = _env_int(environ, 'DB_MAX_CONNECTIONS', 0)
+    if not max_connections:
+        return None
+    workers = _env_int(environ, 'WEB_CONCURRENCY', DEFAULT_WORKERS)
+    reserved = _env_int(environ, 'DB_RESERVED_CONNECTIONS', DEFAULT_RESERVED_CONNECTIONS)
+    return max((max_connections - reserved) // max(workers, 1), 1)
+
+
+def engine_options(database_url, environ=os.environ):
+    """
+    خيارات SQLALCHEMY_ENGINE_OPTIONS من متغيرات البيئة:
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+    DB_STATEMENT_TIMEOUT_MS, DB_CONNECT_TIMEOUT, DB_PGBOUNCER, DB_MAX_CONNECTIONS
+    """
+    if _is_memory_sqlite(database_url):
+        return {}
+    is_postgres = database_url.startswith('postgresql')
+
+    pool_size = _env_int(environ, 'DB_POOL_SIZE', 5)
+    max_overflow = _env_int(environ, 'DB_MAX_OVERFLOW', 5)
+    budget = pool_budget(environ)
+    if budget is not None:
+        pool_size = min(pool_size, budget)
+        max_overflow = min(max_overflow, budget - pool_size)
+
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': _env_int(environ, 'DB_POOL_TIMEOUT', 10),
+        # SQLite ملف محلي لا يُغلق اتصالاته أحد، فلا حاجة لإعادة التدوير أو الفحص المسبق
+        'pool_recycle': _env_int(environ, 'DB_POOL_RECYCLE', 1800 if is_postgres else -1),
+        'pool_pre_ping': _env_bool(environ, 'DB_POOL_PRE_PING', is_postgres),
+    }
+
+    if is_postgres:
+        connect_args = {}
+        connect_timeout = _env_int(environ, 'DB_CONNECT_TIMEOUT', 10)
+        if connect_timeout:
+            connect_args['connect_timeout'] = connect_timeout
+        statement_timeout = _env_int(environ, 'DB_STATEMENT_TIMEOUT_MS', 0)
+        if statement_timeout and not pgbouncer_transaction_mode(environ):
+            connect_args['options'] = f'-c statement_timeout={statement_timeout}'
+        if connect_args:
+            options['connect_args'] = connect_args
+    return options
+
+
+def pgbouncer_transaction_mode(environ=os.environ):
+    return environ.get('DB_PGBOUNCER', '').lower() == 'transaction'
+
+
+def _count(name):
+    def listener(*args):
+        pool_stats.increment(name)
+    return listener
+
+
+def init_database(app, db, environ=os.environ):
+    """تسجيل مستمعات أرقام المجمع، و SET LOCAL statement_timeout في وضع PgBouncer"""
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'connect', _count('connects'))
+    event.listen(engine, 'checkout', _count('checkouts'))
+    event.listen(engine, 'checkin', _count('checkins'))
+    event.listen(engine, 'invalidate', _count('invalidations'))
+
+    statement_timeout = _env_int(environ, 'DB_STATEMENT_TIMEOUT_MS', 0)
+    if engine.dialect.name == 'postgresql' and statement_timeout and pgbouncer_transaction_mode(environ):
+        # إعدادات الجلسة لا تبقى بين المعاملات في وضع transaction، فتُعاد في بداية كل معاملة
+        @event.listens_for(engine, 'begin')
+        def set_statement_timeout(connection):
+            connection.exec_driver_sql(f'SET LOCAL statement_timeout = {statement_timeout}')
+
+
+def pool_status(engine):
+    """حالة المجمع الحالية مع الأرقام المجمعة منذ بدء العملية"""
+    pool = engine.pool
+    status = {'pool_class': type(pool).__name__, 'pid': os.getpid()}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'timeout': pool.timeout(),
+        })
+    status.update(pool_stats.snapshot())
+    return status
+
+
+def use_gevent_wait_callback():
+    """
+    جعل psycopg2 متعاوناً مع gevent: الانتظار على مقبس قاعدة البيانات يُسلم التنفيذ لبقية الطلبات
+    بدل حجب العملية (يُستدعى في كل عملية gunicorn من نوع gevent قبل فتح أي اتصال)؛ يُرجع False
+    إذا لم تكن psycopg2 مثبتة (SQLite)
+    """
+    try:
+        import psycopg2
+        from psycopg2 import extensions
+    except ImportError:
+        return False
+    from gevent.socket import wait_read, wait_write
+
+    def wait_callback(connection, timeout=None):
+        while True:
+            state = connection.poll()
+            if state == extensions.POLL_OK:
+                return
+            if state == extensions.POLL_READ:
+                wait_read(connection.fileno(), timeout=timeout)
+            elif state == extensions.POLL_WRITE:
+                wait_write(connection.fileno(), timeout=timeout)
+            else:
+                raise psycopg2.OperationalError(f'Bad result from poll: {state!r}')
+
+    extensions.set_wait_callback(wait_callback)
+    return True
@@ -0,0 +1,88 @@
+"""
+تسليم ملفات PDF للمتصفح
+- ETag قوي من بصمة المحتوى المخزنة: الطلب المتكرر بنفس If-None-Match يُجاب بـ 304 قبل لمس القرص
+- PDF_DELIVERY_MODE يحدد طريقة إرسال المحتوى:
+  python     : send_file مع دعم Range؛ gunicorn يرسل الملف عبر os.sendfile من خلال wsgi.file_wrapper
+  x-accel    : ترويسة X-Accel-Redirect ليرسل nginx الملف (PDF_ACCEL_PREFIX يقابل مجلد الرفع)
+  x-sendfile : ترويسة X-Sendfile لـ Apache أو lighttpd
+  في وضعي الوكيل يتولى الخادم الأمامي طلبات Range ولا يبقى عامل Python مشغولاً طوال النقل
+"""
+
+import os
+from flask import current_app, request, send_file
+from werkzeug.utils import send_file as werkzeug_send_file
+
+DELIVERY_MODES = ('python', 'x-accel', 'x-sendfile')
+DEFAULT_ACCEL_PREFIX = '/protected-uploads/'
+
+
+def delivery_mode():
+    mode = current_app.config.get('PDF_DELIVERY_MODE', 'python')
+    return mode if mode in DELIVERY_MODES else 'python'
+
+
+def _accel_uri(file_path):
+    """المسار الداخلي لـ nginx المقابل لملف داخل مجلد الرفع، أو None إذا كان الملف خارجه"""
+    upload_folder = os.path.abspath(current_app.config['UPLOAD_FOLDER'])
+    relative = os.path.relpath(os.path.abspath(file_path), upload_folder)
+    if relative.startswith('..'):
+        return None
+    prefix = current_app.config.get('PDF_ACCEL_PREFIX', DEFAULT_ACCEL_PREFIX)
+    return prefix.rstrip('/') + '/' + relative.replace(os.sep, '/')
+
+
+def not_modified(etag):
+    """هل يطابق If-None-Match البصمة الحالية"""
+    return bool(etag) and request.if_none_match.contains(etag)
+
+
+def _finalize(response, etag):
+    response.cache_control.no_cache = True
+    response.cache_control.private = True
+    if etag:
+        response.set_etag(etag)
+    return response
+
+
+def not_modified_response(etag):
+    response = current_app.response_class(status=304)
+    return _finalize(response, etag)
+
+
+def send_pdf(pdf_file, as_attachment):
+    """
+    إرسال الملف حسب وضع التسليم؛ يرفع FileNotFoundError إذا لم يوجد الملف
+    يجب التحقق من الصلاحيات ومن not_modified قبل الاستدعاء
+    """
+    etag = pdf_file.content_hash
+    download_name = pdf_file.original_filename if as_attachment else None
+    mode = delivery_mode()
+    accel_uri = _accel_uri(pdf_file.file_path) if mode == 'x-accel' else None
+
+    if mode == 'python' or (mode == 'x-accel' and accel_uri is None):
+        response = send_file(
+            pdf_file.file_path,
+            as_attachment=as_attachment,
+            download_name=download_name,
+            mimetype='application/pdf',
+            conditional=True,
+            etag=etag or True,
+            max_age=None
+        )
+        return _finalize(response, None)
+
+    # الخادم الأمامي يقرأ الملف ويتولى Range؛ هنا نبني الترويسات فقط
+    response = werkzeug_send_file(
+        pdf_file.file_path,
+        request.environ,
+        mimetype='application/pdf',
+        as_attachment=as_attachment,
+        download_name=download_name,
+        use_x_sendfile=True,
+        response_class=current_app.response_class,
+        conditional=False
+    )
+    if mode == 'x-accel':
+        del response.headers['X-Sendfile']
+        response.headers['X-Accel-Redirect'] = accel_uri
+    return _finalize(response, etag)
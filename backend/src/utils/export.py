@@ -0,0 +1,97 @@
+"""
+تصدير الطلبات على شكل تدفق (NDJSON أو CSV) بذاكرة ثابتة
+تُقرأ الصفوف من مؤشر على الخادم عبر yield_per وتُكتب إلى الاستجابة دفعة بعد دفعة
+"""
+
+import csv
+import io
+from src.models import db, User, Request
+from src.utils import jsonlib
+
+# عدد الصفوف المجلوبة من قاعدة البيانات في كل دفعة
+EXPORT_BATCH_SIZE = 1000
+# عدد الصفوف المكتوبة في كل جزء من الاستجابة
+EXPORT_FLUSH_ROWS = 200
+
+EXPORT_COLUMNS = [
+    'request_id', 'user_name', 'user_national_id', 'user_email', 'user_phone',
+    'request_type', 'request_type_text', 'status', 'status_text',
+    'created_date', 'updated_date', 'data', 'processed_data', 'notes'
+]
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def _export_query():
+    """استعلام الأعمدة المطلوبة فقط دون إنشاء كائنات ORM"""
+    return db.session.query(
+        Request.id, User.full_name, User.national_id, User.email, User.phone,
+        Request.type, Request.status, Request.created_date, Request.updated_date,
+        Request.data, Request.processed_data, Request.notes
+    ).join(User, Request.user_id == User.id).order_by(
+        Request.created_date.desc(), Request.id.desc()
+    ).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+
+def _load_json(raw):
+    """فك JSON المخزن مع التسامح مع القيم التالفة كما في Request.get_data"""
+    try:
+        return jsonlib.loads(raw) if raw else {}
+    except jsonlib.JSONDecodeError:
+        return {}
+
+
+def _row_values(row):
+    """تحويل صف الاستعلام إلى قيم التصدير بنفس ترتيب EXPORT_COLUMNS"""
+    return [
+        row[0], row[1], row[2], row[3], row[4],
+        row[5], Request.get_type_text(row[5]),
+        row[6], Request.get_status_text(row[6]),
+        row[7].isoformat() if row[7] else None,
+        row[8].isoformat() if row[8] else None,
+        row[9], row[10], row[11]
+    ]
+
+
+def generate_ndjson():
+    """توليد سطر JSON لكل طلب"""
+    lines = []
+    for row in _export_query():
+        values = _row_values(row)
+        values[11] = _load_json(values[11])
+        values[12] = _load_json(values[12])
+        lines.append(jsonlib.dumps(dict(zip(EXPORT_COLUMNS, values))))
+        if len(lines) >= EXPORT_FLUSH_ROWS:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def generate_csv():
+    """توليد ملف CSV؛ حقول data و processed_data تُكتب كنص JSON المخزن كما هو دون فكّه"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # علامة BOM ليتعرف Excel على الترميز العربي
+    buffer.write('\ufeff')
+    writer.writerow(EXPORT_COLUMNS)
+
+    rows = 0
+    for row in _export_query():
+        writer.writerow(_row_values(row))
+        rows += 1
+        if rows % EXPORT_FLUSH_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def generate_export(export_format):
+    """اختيار مولّد التصدير حسب الصيغة المطلوبة"""
+    if export_format == 'csv':
+        return generate_csv()
+    return generate_ndjson()
@@ -0,0 +1,41 @@
+"""
+فلاتر قوائم الطلبات المشتركة بين مسارات الإدارة
+"""
+
+from datetime import datetime
+from src.models import Request
+
+
+class InvalidFilter(ValueError):
+    """قيمة فلتر غير صالحة"""
+
+
+def _parse_date_arg(args, name):
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise InvalidFilter(name)
+
+
+def apply_request_filters(query, args):
+    """
+    تطبيق الفلاتر من معاملات الطلب:
+    type, status, specialty, city, region, date_from, date_to (على start_date بصيغة YYYY-MM-DD)
+    """
+    for name in ('type', 'status', 'specialty', 'city', 'region'):
+        value = args.get(name)
+        if value:
+            query = query.filter(getattr(Request, name) == value)
+    
+    date_from = _parse_date_arg(args, 'date_from')
+    if date_from:
+        query = query.filter(Request.start_date >= date_from)
+    
+    date_to = _parse_date_arg(args, 'date_to')
+    if date_to:
+        query = query.filter(Request.start_date <= date_to)
+    
+    return query
@@ -0,0 +1,340 @@
+"""
+طابور مهام معالجة ملفات PDF في الخلفية بدون وسيط خارجي
+- المهام صفوف في جدول pdf_job (نفس قاعدة البيانات)، مهمة واحدة لكل (ملف، نوع) فإعادة الإضافة لا تكررها
+- عملية pdf-worker تحجز المهام الجاهزة بتحديث شرطي واحد (status='queued') فلا تُنفذ المهمة مرتين
+  وتنفذها في مجموعة عمليات (ProcessPoolExecutor)، بينما تبقى قاعدة البيانات في العملية الرئيسية فقط
+- الفشل يُعاد بمهلة متزايدة حتى max_attempts، والمهام العالقة (توقف العامل) تُعاد للطابور بعد JOB_LOCK_TIMEOUT
+- الأدوات اختيارية: pypdf أو poppler-utils (pdfinfo/pdftotext/pdftoppm) و qpdf؛ عند غيابها تُتخطى المهمة
+"""
+
+import json
+import os
+import shutil
+import socket
+import subprocess
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from flask import current_app
+from src.models import db, PDFFile, PDFJob
+from src.models.pdf_job import JOB_KINDS
+from src.utils.storage import get_storage, release_blob
+from src.utils.versioning import bump_file_owners
+
+try:
+    import pypdf
+except ImportError:  # pypdf اختيارية
+    pypdf = None
+
+DEFAULT_JOB_KINDS = ()
+JOB_LOCK_TIMEOUT = timedelta(minutes=10)
+RETRY_BASE_SECONDS = 30
+TOOL_TIMEOUT = 120  # بالثواني لكل أداة خارجية
+FIRST_PAGE_TEXT_LIMIT = 4000
+PREVIEW_WIDTH = 400
+# لا يُستبدل الملف بنسخته المضغوطة إلا إذا وفرت 5% على الأقل
+OPTIMIZE_MIN_SAVING = 0.05
+
+
+# ---- المعالجات: دوال مستقلة تعمل داخل عمليات المجموعة، تأخذ مسارات وتُرجع قاموس نتيجة ----
+
+def _run(command):
+    return subprocess.run(command, capture_output=True, timeout=TOOL_TIMEOUT, check=True)
+
+
+def extract_metadata(file_path, options):
+    """عدد الصفحات ونص الصفحة الأولى"""
+    if pypdf is not None:
+        reader = pypdf.PdfReader(file_path)
+        text = reader.pages[0].extract_text() if reader.pages else ''
+        return {'page_count': len(reader.pages), 'first_page_text': (text or '')[:FIRST_PAGE_TEXT_LIMIT]}
+    if shutil.which('pdfinfo') and shutil.which('pdftotext'):
+        info = _run(['pdfinfo', file_path]).stdout.decode('utf-8', 'replace')
+        pages = next((int(line.split(':', 1)[1]) for line in info.splitlines() if line.startswith('Pages:')), None)
+        text = _run(['pdftotext', '-f', '1', '-l', '1', '-enc', 'UTF-8', file_path, '-']).stdout
+        return {'page_count': pages, 'first_page_text': text.decode('utf-8', 'replace')[:FIRST_PAGE_TEXT_LIMIT]}
+    return {'skipped': 'pypdf/poppler-utils not installed'}
+
+
+def render_preview(file_path, options):
+    """صورة PNG مصغرة للصفحة الأولى"""
+    target = options['preview_path']
+    if os.path.exists(target):
+        return {'preview_path': target}
+    if not shutil.which('pdftoppm'):
+        return {'skipped': 'pdftoppm not installed'}
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    prefix = f'{target}.{uuid.uuid4().hex}'
+    _run(['pdftoppm', '-f', '1', '-l', '1', '-png', '-singlefile',
+          '-scale-to', str(PREVIEW_WIDTH), file_path, prefix])
+    os.replace(prefix + '.png', target)
+    return {'preview_path': target}
+
+
+def optimize_pdf(file_path, options):
+    """إعادة كتابة الملف مضغوطاً ومهيأً للعرض السريع (linearized) في ملف مؤقت"""
+    if not shutil.which('qpdf'):
+        return {'skipped': 'qpdf not installed'}
+    output = options['temp_path']
+    try:
+        _run(['qpdf', '--linearize', '--object-streams=generate', '--compress-streams=y', file_path, output])
+    except subprocess.CalledProcessError as e:
+        # رمز الخروج 3 يعني نجاحاً مع تحذيرات
+        if e.returncode != 3:
+            raise
+    return {'output_path': output, 'size': os.path.getsize(output)}
+
+
+HANDLERS = {
+    'metadata': extract_metadata,
+    'preview': render_preview,
+    'optimize': optimize_pdf,
+}
+
+
+# ---- إضافة المهام ----
+
+def enabled_job_kinds():
+    kinds = current_app.config.get('PDF_JOB_KINDS', DEFAULT_JOB_KINDS)
+    return [kind for kind in kinds if kind in JOB_KINDS]
+
+
+def enqueue_pdf_jobs(pdf_file):
+    """
+    إضافة مهام المعالجة لملف جديد قبل حفظ المعاملة
+    إذا عولج ملف بنفس المحتوى سابقاً تُنسخ نتائجه بدلاً من إعادة المعالجة
+    """
+    kinds = enabled_job_kinds()
+    if not kinds:
+        return
+    sibling = None
+    if pdf_file.content_hash:
+        sibling = PDFFile.query.filter(
+            PDFFile.content_hash == pdf_file.content_hash,
+            PDFFile.processing_status == 'done'
+        ).first()
+    if sibling:
+        pdf_file.page_count = sibling.page_count
+        pdf_file.first_page_text = sibling.first_page_text
+        pdf_file.preview_path = sibling.preview_path
+        pdf_file.processing_status = 'done'
+        return
+    for kind in kinds:
+        pdf_file.jobs.append(PDFJob(kind=kind))
+    pdf_file.processing_status = 'pending'
+
+
+def enqueue_missing_jobs():
+    """إضافة المهام الناقصة للملفات الموجودة (بعد الترقية أو تفعيل نوع جديد)؛ يُرجع عدد المهام المضافة"""
+    added = 0
+    for kind in enabled_job_kinds():
+        missing = db.session.query(PDFFile.id).filter(~db.exists().where(
+            PDFJob.pdf_file_id == PDFFile.id, PDFJob.kind == kind
+        )).all()
+        if missing:
+            db.session.execute(db.insert(PDFJob), [
+                {'pdf_file_id': file_id, 'kind': kind, 'status': 'queued', 'attempts': 0,
+                 'max_attempts': 3, 'run_after': datetime.utcnow()} for (file_id,) in missing
+            ])
+            db.session.execute(db.update(PDFFile).where(
+                PDFFile.id.in_([file_id for (file_id,) in missing]),
+                PDFFile.processing_status.is_(None) | (PDFFile.processing_status == 'done')
+            ).values(processing_status='pending'))
+            bump_file_owners(PDFFile.id.in_([file_id for (file_id,) in missing]))
+            added += len(missing)
+    db.session.commit()
+    return added
+
+
+# ---- حجز المهام وتسجيل نتائجها (العملية الرئيسية فقط) ----
+
+def requeue_stale_jobs():
+    """إعادة المهام المحجوزة لعامل توقف إلى الطابور"""
+    cutoff = datetime.utcnow() - JOB_LOCK_TIMEOUT
+    result = db.session.execute(db.update(PDFJob).where(
+        PDFJob.status == 'running', PDFJob.locked_at < cutoff
+    ).values(status='queued', locked_by=None, locked_at=None))
+    db.session.commit()
+    return result.rowcount
+
+
+def claim_jobs(worker_id, limit):
+    """حجز حتى limit مهمة جاهزة بتحديث شرطي واحد وإرجاعها"""
+    now = datetime.utcnow()
+    token = f'{worker_id}:{uuid.uuid4().hex[:8]}'
+    ready = db.select(PDFJob.id).where(
+        PDFJob.status == 'queued', PDFJob.run_after <= now
+    ).order_by(PDFJob.id).limit(limit)
+    db.session.execute(db.update(PDFJob).where(
+        PDFJob.id.in_(ready), PDFJob.status == 'queued'
+    ).values(
+        status='running', locked_by=token, locked_at=now, attempts=PDFJob.attempts + 1
+    ).execution_options(synchronize_session=False))
+    db.session.commit()
+    return PDFJob.query.filter_by(status='running', locked_by=token).order_by(PDFJob.id).all()
+
+
+def job_options(job):
+    """مدخلات المعالج: قيم بسيطة فقط لأنها تُرسل إلى عملية أخرى"""
+    storage = get_storage()
+    pdf_file = job.pdf_file
+    options = {'preview_path': storage.preview_path(pdf_file.ensure_content_hash())}
+    if job.kind == 'optimize':
+        options['temp_path'] = storage.temp_path()
+    return options
+
+
+def _apply_optimized(pdf_file, result):
+    """
+    استبدال الملف بنسخته المضغوطة لجميع السجلات التي تشير إليه
+    يُرجع مسار الملف القديم ليُحذف بعد حفظ المعاملة، أو None إذا لم يُستبدل
+    """
+    output = result.pop('output_path')
+    if result['size'] > pdf_file.file_size * (1 - OPTIMIZE_MIN_SAVING):
+        os.remove(output)
+        result['replaced'] = False
+        return None
+    storage = get_storage()
+    content_hash = PDFFile.compute_hash(output)
+    old_path, old_hash = pdf_file.file_path, pdf_file.content_hash
+    new_path = storage.commit_temp(output, content_hash)
+    values = {'file_path': new_path, 'filename': os.path.basename(new_path),
+              'content_hash': content_hash, 'file_size': result['size']}
+    if pdf_file.preview_path and old_hash:
+        new_preview = storage.preview_path(content_hash)
+        os.makedirs(os.path.dirname(new_preview), exist_ok=True)
+        if os.path.exists(pdf_file.preview_path):
+            os.replace(pdf_file.preview_path, new_preview)
+        values['preview_path'] = new_preview
+    db.session.execute(db.update(PDFFile).where(PDFFile.file_path == old_path).values(**values))
+    bump_file_owners(PDFFile.file_path == new_path)
+    result['replaced'] = True
+    return old_path
+
+
+def refresh_processing_status(pdf_file_id):
+    statuses = {status for (status,) in db.session.query(PDFJob.status).filter(PDFJob.pdf_file_id == pdf_file_id)}
+    if not statuses or statuses == {'done'}:
+        status = 'done'
+    elif statuses <= {'done', 'failed'}:
+        status = 'failed'
+    elif 'running' in statuses or 'done' in statuses:
+        status = 'processing'
+    else:
+        status = 'pending'
+    result = db.session.execute(db.update(PDFFile).where(
+        PDFFile.id == pdf_file_id, PDFFile.processing_status.is_distinct_from(status)
+    ).values(processing_status=status))
+    if result.rowcount:
+        bump_file_owners(PDFFile.id == pdf_file_id)
+
+
+def complete_job(job_id, result):
+    """تسجيل نجاح مهمة ونقل نتيجتها إلى سجل الملف"""
+    job = db.session.get(PDFJob, job_id)
+    if job is None:  # حُذف الملف أثناء المعالجة
+        return
+    pdf_file = job.pdf_file
+    replaced_path = None
+    if job.kind == 'metadata' and 'page_count' in result:
+        pdf_file.page_count = result['page_count']
+        pdf_file.first_page_text = result['first_page_text']
+    elif job.kind == 'preview' and 'preview_path' in result:
+        pdf_file.preview_path = result['preview_path']
+    elif job.kind == 'optimize' and 'output_path' in result:
+        replaced_path = _apply_optimized(pdf_file, result)
+    job.status = 'done'
+    job.result = json.dumps(result, ensure_ascii=False)
+    job.last_error = None
+    job.locked_by = job.locked_at = None
+    db.session.flush()
+    refresh_processing_status(job.pdf_file_id)
+    db.session.commit()
+    if replaced_path:
+        release_blob(replaced_path)
+
+
+def fail_job(job_id, error):
+    """تسجيل فشل مهمة وإعادة جدولتها بمهلة متزايدة أو إيقافها بعد آخر محاولة"""
+    job = db.session.get(PDFJob, job_id)
+    if job is None:
+        return
+    job.last_error = str(error)[:2000] or error.__class__.__name__
+    job.locked_by = job.locked_at = None
+    if job.attempts >= job.max_attempts:
+        job.status = 'failed'
+    else:
+        job.status = 'queued'
+        job.run_after = datetime.utcnow() + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (job.attempts - 1))
+    db.session.flush()
+    refresh_processing_status(job.pdf_file_id)
+    db.session.commit()
+
+
+def run_worker(processes=2, poll_interval=2.0, once=False, log=print):
+    """
+    حلقة العامل: حجز المهام حسب السعة المتاحة وتنفيذها في مجموعة العمليات وتسجيل النتائج
+    once=True يُنهي الحلقة عند خلو الطابور (للتشغيل من cron أو الاختبار)
+    """
+    worker_id = f'{socket.gethostname()}:{os.getpid()}'
+    inflight = {}
+    pool = ProcessPoolExecutor(max_workers=processes)
+    try:
+        while True:
+            requeue_stale_jobs()
+            claimed = []
+            if len(inflight) < processes:
+                claimed = claim_jobs(worker_id, processes - len(inflight))
+                for job in claimed:
+                    handler = HANDLERS.get(job.kind)
+                    try:
+                        if handler is None:
+                            raise ValueError(f'unknown job kind {job.kind}')
+                        options = job_options(job)
+                        db.session.commit()
+                    except Exception as e:
+                        db.session.rollback()
+                        fail_job(job.id, e)
+                        continue
+                    inflight[pool.submit(handler, job.pdf_file.file_path, options)] = job.id
+                db.session.remove()
+
+            if not inflight:
+                if once and not claimed:
+                    return
+                time.sleep(poll_interval)
+                continue
+
+            done, _ = wait(list(inflight), timeout=poll_interval, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                job_id = inflight.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool as e:
+                    broken = True
+                    fail_job(job_id, e)
+                    continue
+                except Exception as e:
+                    fail_job(job_id, e)
+                    log(f'job {job_id} failed: {e}')
+                    continue
+                try:
+                    complete_job(job_id, result)
+                except Exception as e:
+                    db.session.rollback()
+                    fail_job(job_id, e)
+                    log(f'job {job_id} failed while saving: {e}')
+            db.session.remove()
+
+            if broken:
+                # توقفت إحدى عمليات المجموعة (مثلاً نفاد الذاكرة)؛ تُعاد المهام الجارية وتُنشأ مجموعة جديدة
+                for job_id in inflight.values():
+                    fail_job(job_id, 'worker process crashed')
+                inflight.clear()
+                pool.shutdown(wait=False, cancel_futures=True)
+                pool = ProcessPoolExecutor(max_workers=processes)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,63 @@
+"""
+واجهة JSON موحدة تستخدم orjson عند تثبيتها وتعود إلى مكتبة json القياسية بخلاف ذلك
+تُستخدم لتخزين بيانات الطلبات وفكها ولترميز استجابات Flask
+"""
+
+import json
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson اختيارية
+    orjson = None
+
+# orjson.JSONDecodeError مشتق من json.JSONDecodeError لذا يكفي التقاط الأخير
+JSONDecodeError = json.JSONDecodeError
+
+BACKEND = 'orjson' if orjson else 'json'
+
+
+def loads(raw):
+    """فك نص أو بايتات JSON"""
+    if orjson:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def dumps(obj):
+    """ترميز كائن إلى نص JSON مع إبقاء الحروف العربية كما هي"""
+    if orjson:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    مزود JSON لـ Flask يرمز الاستجابات عبر orjson إن وُجدت
+    يحافظ على ترتيب المفاتيح وتحويلات Flask الافتراضية (مثل التواريخ)،
+    ويعود للتنفيذ القياسي لأي خيارات لا تدعمها orjson
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or not self._orjson_compatible(kwargs):
+            return super().dumps(obj, **kwargs)
+        
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    @staticmethod
+    def _orjson_compatible(kwargs):
+        if set(kwargs) - {'separators', 'indent', 'default', 'sort_keys', 'ensure_ascii'}:
+            return False
+        if kwargs.get('indent') not in (None, 2):
+            return False
+        return kwargs.get('separators') in (None, (',', ':'))
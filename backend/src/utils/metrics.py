@@ -0,0 +1,196 @@
+"""
+قياس زمن الطلبات وعدد استعلامات SQL لكل مسار (اختياري عبر METRICS_ENABLED)
+- يُسجل لكل طلب: الزمن الكلي، عدد الاستعلامات وزمنها، زمن ترميز JSON، وحجم الاستجابة
+- تُضاف الأرقام إلى الاستجابة في ترويسة Server-Timing وتُجمع في مدرجات تكرارية (histograms)
+  تُعرض بصيغة Prometheus على /api/admin/metrics
+- عند التعطيل لا تُسجل أي خطافات (hooks) أو مستمعات على المحرك، فلا كلفة إضافية على الطلبات
+كل عملية (worker) تحتفظ بأرقامها الخاصة؛ يجمعها Prometheus من كل عملية على حدة
+"""
+
+import threading
+import time
+from flask import g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from src.utils.jsonlib import FastJSONProvider
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+METRIC_PREFIX = 'sehhaty'
+
+
+class Histogram:
+    """مدرج تكراري تراكمي لكل قيمة من قيم التسمية (endpoint)"""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * len(self.buckets), 0, 0.0]
+        counts = series[0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+        series[1] += 1
+        series[2] += value
+
+    def render(self, label_names):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, (counts, count, total) in sorted(self.series.items()):
+            label_text = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(label_names, labels))
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_count{{{label_text}}} {count}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total:.6f}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """مخزن الأرقام المجمعة لجميع المسارات في العملية الحالية"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {
+            'duration': Histogram(f'{METRIC_PREFIX}_request_duration_seconds',
+                                  'Total request handling time', DURATION_BUCKETS),
+            'db': Histogram(f'{METRIC_PREFIX}_request_db_seconds',
+                            'Time spent executing SQL per request', DURATION_BUCKETS),
+            'queries': Histogram(f'{METRIC_PREFIX}_request_queries',
+                                 'SQL statements executed per request', QUERY_COUNT_BUCKETS),
+            'serialization': Histogram(f'{METRIC_PREFIX}_request_serialization_seconds',
+                                       'Time spent encoding JSON responses per request', DURATION_BUCKETS),
+            'size': Histogram(f'{METRIC_PREFIX}_response_size_bytes',
+                              'Response body size (streamed responses are not included)', SIZE_BUCKETS),
+        }
+        self.responses = {}
+
+    def record(self, endpoint, method, status, duration, db_time, queries, serialization, size):
+        labels = (endpoint, method)
+        with self._lock:
+            self.histograms['duration'].observe(labels, duration)
+            self.histograms['db'].observe(labels, db_time)
+            self.histograms['queries'].observe(labels, queries)
+            self.histograms['serialization'].observe(labels, serialization)
+            if size is not None:
+                self.histograms['size'].observe(labels, size)
+            key = (endpoint, method, str(status))
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+    def render(self):
+        """النص بصيغة Prometheus (text exposition format 0.0.4)"""
+        with self._lock:
+            lines = []
+            for histogram in self.histograms.values():
+                lines.extend(histogram.render(('endpoint', 'method')))
+            name = f'{METRIC_PREFIX}_responses_total'
+            lines += [f'# HELP {name} Responses by endpoint and status code', f'# TYPE {name} counter']
+            for (endpoint, method, status), count in sorted(self.responses.items()):
+                lines.append(f'{name}{{endpoint="{_escape(endpoint)}",method="{method}",status="{status}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self.__init__()
+
+
+registry = MetricsRegistry()
+
+
+# مقاييس مجمع الاتصالات: المفتاح في pool_status -> (النوع، الوصف)
+POOL_METRICS = {
+    'checked_out': ('gauge', 'Connections currently checked out of the pool'),
+    'checked_in': ('gauge', 'Idle connections in the pool'),
+    'overflow': ('gauge', 'Connections opened beyond pool_size'),
+    'checkouts': ('counter', 'Pool checkouts'),
+    'connects': ('counter', 'New DBAPI connections opened'),
+    'invalidations': ('counter', 'Connections invalidated (failed pre-ping or disconnect)'),
+    'timeouts': ('counter', 'Checkouts that timed out waiting for a connection'),
+}
+
+
+def render_pool_metrics(status):
+    """أرقام مجمع الاتصالات (من pool_status) بصيغة Prometheus"""
+    lines = []
+    for key, (kind, help_text) in POOL_METRICS.items():
+        if key not in status:
+            continue
+        name = f'{METRIC_PREFIX}_db_pool_{key}' + ('_total' if kind == 'counter' else '')
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {status[key]}']
+    name = f'{METRIC_PREFIX}_db_pool_wait_seconds_total'
+    lines += [f'# HELP {name} Total time spent waiting for a pool connection', f'# TYPE {name} counter',
+              f'{name} {status["wait_total_ms"] / 1000:.6f}']
+    return '\n'.join(lines) + '\n'
+
+
+class TimedJSONProvider(FastJSONProvider):
+    """مزود JSON يضيف زمن الترميز إلى أرقام الطلب الحالي"""
+
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            state = g.get('_metrics') if has_app_context() else None
+            if state is not None:
+                state['serialization'] += time.perf_counter() - started
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    state = g.get('_metrics') if has_request_context() else None
+    if state is not None:
+        state['queries'] += 1
+        started = getattr(context, '_metrics_started', None)
+        if started is not None:
+            state['db'] += time.perf_counter() - started
+
+
+def _start_request():
+    g._metrics = {'started': time.perf_counter(), 'queries': 0, 'db': 0.0, 'serialization': 0.0}
+
+
+def _finish_request(response):
+    state = g.pop('_metrics', None)
+    if state is None:
+        return response
+    duration = time.perf_counter() - state['started']
+    endpoint = request.endpoint or 'unmatched'
+    size = None if response.is_streamed else response.calculate_content_length()
+    registry.record(endpoint, request.method, response.status_code, duration,
+                    state['db'], state['queries'], state['serialization'], size)
+    response.headers['Server-Timing'] = ', '.join([
+        f'db;dur={state["db"] * 1000:.2f};desc="{state["queries"]} queries"',
+        f'ser;dur={state["serialization"] * 1000:.2f}',
+        f'total;dur={duration * 1000:.2f}',
+    ])
+    return response
+
+
+def init_metrics(app, db):
+    """تفعيل القياس على التطبيق إذا كان METRICS_ENABLED مفعلاً، وإرجاع حالة التفعيل"""
+    if not app.config.get('METRICS_ENABLED'):
+        return False
+    app.json = TimedJSONProvider(app)
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    return True
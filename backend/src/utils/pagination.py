@@ -0,0 +1,81 @@
+"""
+أدوات التصفح بالمؤشر (keyset) لقوائم الطلبات
+يعتمد المؤشر على الزوج (created_date, id) بدلاً من OFFSET حتى تبقى كلفة الصفحات العميقة ثابتة
+"""
+
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 200
+
+
+class InvalidCursor(ValueError):
+    """مؤشر تصفح غير صالح"""
+
+
+def clamp_per_page(value, default=DEFAULT_PER_PAGE):
+    """حصر عدد العناصر في الصفحة ضمن الحدود المسموحة"""
+    if value is None:
+        return default
+    return max(1, min(value, MAX_PER_PAGE))
+
+
+def encode_cursor(item):
+    """ترميز موضع العنصر الأخير في الصفحة كمؤشر نصي"""
+    raw = json.dumps([item.created_date.isoformat(), item.id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """فك ترميز المؤشر إلى (created_date, id)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_date, item_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_date), int(item_id)
+    except (ValueError, TypeError, UnicodeError):
+        raise InvalidCursor(cursor)
+
+
+def order_newest_first(query, model):
+    """ترتيب ثابت من الأحدث إلى الأقدم مع كسر التعادل بالمعرف"""
+    return query.order_by(model.created_date.desc(), model.id.desc())
+
+
+def keyset_page(query, model, cursor, per_page):
+    """
+    جلب صفحة واحدة بعد المؤشر المحدد
+    يعيد (العناصر، المؤشر التالي أو None إذا كانت هذه الصفحة الأخيرة)
+    """
+    if cursor:
+        created_date, item_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            model.created_date < created_date,
+            and_(model.created_date == created_date, model.id < item_id)
+        ))
+    
+    # جلب عنصر إضافي لمعرفة وجود صفحة تالية دون الحاجة إلى COUNT
+    items = order_newest_first(query, model).limit(per_page + 1).all()
+    has_next = len(items) > per_page
+    items = items[:per_page]
+    next_cursor = encode_cursor(items[-1]) if has_next else None
+    return items, next_cursor
+
+
+def wants_count(args, default):
+    """تحديد ما إذا كان العميل يطلب العدد الكلي (count=exact) أو لا (count=none)"""
+    mode = args.get('count')
+    if mode is None:
+        return default
+    return mode == 'exact'
+
+
+def set_page_headers(response, next_cursor, total=None):
+    """إرفاق بيانات التصفح بالترويسات مع إبقاء جسم الاستجابة قائمة كما هو"""
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    if total is not None:
+        response.headers['X-Total-Count'] = str(total)
+    return response
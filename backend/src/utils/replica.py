@@ -0,0 +1,100 @@
+"""
+توجيه قراءات مسارات الإدارة إلى نسخة القراءة (replica) عند ضبط DATABASE_REPLICA_URL
+- المسارات المعلَّمة بـ read_replica فقط تقرأ من النسخة؛ الكتابة (flush و UPDATE/INSERT/DELETE)
+  والاتصالات الصريحة تذهب دائماً إلى قاعدة البيانات الأساسية
+- قراءة ما كتبته (read-your-writes): بعد أي كتابة في طلب من جلسة مسجلة يُحفظ وقتها في الجلسة،
+  وتُقرأ طلبات نفس الجلسة من الأساسية لمدة REPLICA_STICKY_SECONDS حتى تلحق النسخة بالتعديل
+- عند فشل الاتصال بالنسخة تُعلَّم معطلة لمدة REPLICA_RETRY_SECONDS وتُوجه القراءات إلى الأساسية
+"""
+
+import time
+from functools import wraps
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+REPLICA_BIND = 'replica'
+DEFAULT_STICKY_SECONDS = 5
+REPLICA_RETRY_SECONDS = 30
+WRITE_SESSION_KEY = '_db_write_at'
+
+_replica_down_until = 0.0
+
+
+def replica_engine():
+    """محرك النسخة إذا كانت مضبوطة وسليمة، وإلا None"""
+    if time.monotonic() < _replica_down_until:
+        return None
+    return current_app.extensions['sqlalchemy'].engines.get(REPLICA_BIND)
+
+
+def _mark_replica_down(context):
+    global _replica_down_until
+    # انقطاع الاتصال، أو فشل فتحه أصلاً (الخادم متوقف أو غير متاح)
+    if context.is_disconnect or context.connection is None:
+        _replica_down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+
+
+class RoutingSession(Session):
+    """جلسة توجه استعلامات SELECT إلى النسخة داخل المسارات المعلَّمة بـ read_replica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and clause is not None and getattr(clause, 'is_select', False) \
+                and not self._flushing and has_request_context() and g.get('_read_replica'):
+            engine = replica_engine()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _mark_write(*args):
+    if has_request_context():
+        g._db_wrote = True
+
+
+def _on_orm_execute(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _mark_write()
+
+
+def _recent_write():
+    written_at = session.get(WRITE_SESSION_KEY)
+    sticky = current_app.config.get('REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+    return written_at is not None and time.time() - written_at < sticky
+
+
+def read_replica(view):
+    """تعليم مسار للقراءة فقط: استعلاماته تُقرأ من النسخة ما لم تكتب الجلسة مؤخراً"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g._read_replica = not _recent_write()
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def _remember_write(response):
+    if g.pop('_db_wrote', False) and 'user_id' in session:
+        session[WRITE_SESSION_KEY] = time.time()
+    return response
+
+
+def init_replica(app, db):
+    """تسجيل النسخة كـ bind إضافي عند ضبط DATABASE_REPLICA_URL (يُستدعى قبل db.init_app)"""
+    replica_url = app.config.get('DATABASE_REPLICA_URL')
+    if not replica_url:
+        return False
+    app.config.setdefault('SQLALCHEMY_BINDS', {})[REPLICA_BIND] = replica_url
+    # المستمعات على صنف الجلسة مشتركة بين كل التطبيقات المنشأة عبر create_app
+    if not event.contains(RoutingSession, 'after_flush', _mark_write):
+        event.listen(RoutingSession, 'after_flush', _mark_write)
+        event.listen(RoutingSession, 'do_orm_execute', _on_orm_execute)
+    app.after_request(_remember_write)
+    return True
+
+
+def init_replica_engine(app, db):
+    """مراقبة أخطاء الاتصال بالنسخة (يُستدعى بعد db.init_app)"""
+    with app.app_context():
+        engine = db.engines.get(REPLICA_BIND)
+    if engine is not None:
+        event.listen(engine, 'handle_error', _mark_replica_down)
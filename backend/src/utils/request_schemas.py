@@ -0,0 +1,240 @@
+"""
+سجل مخططات أنواع الطلبات: الحقول وأنواعها وقواعد المقارنة بين الحقول
+- create: بيانات الطلب عند إنشائه (data)، process: بيانات المعالجة التي يدخلها المشرف (processed_data)
+- تُترجم المخططات إلى دوال تحقق مرة واحدة عند الاستيراد (التعابير النمطية ورسائل الأخطاء جاهزة مسبقاً)
+  فيقتصر التحقق عند كل طلب على البحث في القاموس وتنفيذ الفحوص
+- تُعرض المخططات للواجهة الأمامية عبر GET /api/request-types بدلاً من تكرارها في data.js
+"""
+
+import re
+from datetime import date
+from src.models.request import REQUEST_TYPES, Request
+
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+TIME_PATTERN = re.compile(r'^([01]\d|2[0-3]):[0-5]\d(:[0-5]\d)?$')
+PHONE_STRIP = str.maketrans('', '', '+- ')
+TEXT_TYPES = (str, int, float)
+
+
+class Field:
+    """حقل في مخطط: النوع أحد FIELD_TYPES، والحقل المطلوب لا يقبل قيمة فارغة"""
+
+    def __init__(self, name, type='text', required=True, max_length=None):
+        self.name = name
+        self.type = type
+        self.required = required
+        self.max_length = max_length
+
+    def describe(self):
+        spec = {'name': self.name, 'type': self.type, 'required': self.required}
+        if self.max_length:
+            spec['max_length'] = self.max_length
+        return spec
+
+
+class DateOrder:
+    """قاعدة بين حقلين: تاريخ end لا يسبق تاريخ start (تُطبق فقط إذا وُجد الحقلان)"""
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+
+    def describe(self):
+        return {'rule': 'date_order', 'start': self.start, 'end': self.end}
+
+
+def _is_text(value):
+    # type() بدل isinstance حتى تُستبعد القيم المنطقية (bool فرع من int)
+    return type(value) in TEXT_TYPES
+
+
+def _is_date(value):
+    if not isinstance(value, str) or not DATE_PATTERN.match(value):
+        return False
+    try:
+        # أسرع بكثير من strptime؛ التعبير النمطي يقصره على الصيغة YYYY-MM-DD
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_time(value):
+    return isinstance(value, str) and TIME_PATTERN.match(value) is not None
+
+
+def _is_national_id(value):
+    """نفس قاعدة التسجيل: 10 أرقام على الأقل"""
+    value = str(value) if isinstance(value, int) and not isinstance(value, bool) else value
+    return isinstance(value, str) and len(value) >= 10 and value.isdigit()
+
+
+def _is_phone(value):
+    """نفس قاعدة التسجيل: 10 أرقام على الأقل مع السماح بـ + و - والمسافات"""
+    return isinstance(value, str) and len(value) >= 10 and value.translate(PHONE_STRIP).isdigit()
+
+
+# النوع: (دالة الفحص، رسالة الخطأ)
+FIELD_TYPES = {
+    'text': (_is_text, 'الحقل {field} يجب أن يكون نصاً'),
+    'date': (_is_date, 'الحقل {field} يجب أن يكون تاريخاً بصيغة YYYY-MM-DD'),
+    'time': (_is_time, 'الحقل {field} يجب أن يكون وقتاً بصيغة HH:MM'),
+    'national_id': (_is_national_id, 'الحقل {field} يجب أن يكون رقم هوية صحيحاً'),
+    'phone': (_is_phone, 'الحقل {field} يجب أن يكون رقم جوال صحيحاً'),
+}
+
+
+def _compile_field(field, required_message):
+    """دالة فحص لحقل واحد تُرجع رسالة الخطأ أو None؛ الفحوص غير المطلوبة لا تدخل الدالة أصلاً"""
+    name = field.name
+    check, type_message = FIELD_TYPES[field.type]
+    missing = required_message.format(field=name) if field.required else None
+    invalid = type_message.format(field=name)
+    max_length = field.max_length
+    too_long = f'الحقل {name} يتجاوز {max_length} حرف'
+
+    if max_length:
+        def validate_field(data):
+            value = data.get(name)
+            if not value:
+                return missing if value is None or value == '' or field.required else None
+            if not check(value):
+                return invalid
+            if len(str(value)) > max_length:
+                return too_long
+            return None
+    else:
+        def validate_field(data):
+            value = data.get(name)
+            if not value:
+                return missing if value is None or value == '' or field.required else None
+            if not check(value):
+                return invalid
+            return None
+    return validate_field
+
+
+def _compile(fields, rules, required_message):
+    """ترجمة الحقول والقواعد إلى دالة تُرجع رسالة أول خطأ أو None"""
+    field_checks = tuple(_compile_field(field, required_message) for field in fields)
+    date_rules = tuple(
+        (rule.start, rule.end, f'تاريخ {rule.end} يجب ألا يسبق تاريخ {rule.start}') for rule in rules
+    )
+
+    def validate(data):
+        if not isinstance(data, dict):
+            return 'بيانات الطلب غير صحيحة'
+        for validate_field in field_checks:
+            error = validate_field(data)
+            if error:
+                return error
+        for start, end, message in date_rules:
+            # التواريخ بصيغة YYYY-MM-DD تُقارن نصياً بنفس ترتيبها الزمني
+            if data.get(start) and data.get(end) and data[end] < data[start]:
+                return message
+        return None
+
+    return validate
+
+
+class Stage:
+    """مرحلة من مخطط النوع (الإنشاء أو المعالجة) مع دالة التحقق المترجمة"""
+
+    def __init__(self, fields, rules=(), required_message='الحقل {field} مطلوب'):
+        self.fields = tuple(fields)
+        self.rules = tuple(rules)
+        self.field_names = tuple(field.name for field in self.fields)
+        self.validate = _compile(self.fields, self.rules, required_message)
+
+    def extract(self, data):
+        """القيم المعرفة في المخطط فقط (تُستخدم لبناء processed_data)"""
+        return {name: data.get(name) for name in self.field_names}
+
+    def describe(self):
+        return {
+            'fields': [field.describe() for field in self.fields],
+            'rules': [rule.describe() for rule in self.rules],
+        }
+
+
+class RequestSchema:
+    def __init__(self, request_type, create, process=None):
+        self.type = request_type
+        self.create = create
+        self.process = process
+
+    def describe(self):
+        return {
+            'type': self.type,
+            'type_text': Request.get_type_text(self.type),
+            'create': self.create.describe(),
+            'process': self.process.describe() if self.process else None,
+        }
+
+
+def _schema(request_type, label, create_fields, rules=(), process_fields=None):
+    return RequestSchema(
+        request_type,
+        Stage(create_fields, rules, required_message='الحقل {field} مطلوب ' + label),
+        Stage(process_fields) if process_fields else None,
+    )
+
+
+SCHEMAS = {schema.type: schema for schema in (
+    _schema('appointment', 'للمواعيد', [
+        Field('specialty', max_length=100),
+        Field('city', max_length=100),
+        Field('preferredDate', 'date'),
+        Field('preferredTime', max_length=50),  # فترة من قائمة الواجهة (صباحاً/مساءً) وليست وقتاً محدداً
+    ], process_fields=[
+        Field('hospitalName'),
+        Field('doctorName'),
+        Field('doctorSpecialty'),
+        Field('doctorPhone', 'phone'),
+        Field('appointmentDate', 'date'),
+        Field('appointmentTime', 'time'),
+    ]),
+    _schema('consultation', 'للاستشارات', [
+        Field('consultationType'),
+        Field('description'),
+    ], process_fields=[
+        Field('doctorName'),
+        Field('doctorSpecialty'),
+        Field('doctorPhone', 'phone'),
+    ]),
+    _schema('medical_request', 'للتقارير الطبية', [
+        Field('reportType'),
+        Field('purpose'),
+    ]),
+    _schema('medical_excuse', 'للعذر الطبي', [
+        Field('startDate', 'date'),
+        Field('endDate', 'date'),
+        Field('region', max_length=100),
+        Field('workplace'),
+    ], rules=[DateOrder('startDate', 'endDate')]),
+    _schema('review_certificate', 'لمشهد المراجعة', [
+        Field('reviewDate', 'date'),
+        Field('region', max_length=100),
+        Field('workplace'),
+    ]),
+    _schema('patient_companion_report', 'لتقرير مرافق المريض', [
+        Field('patientName'),
+        Field('patientNationalId', 'national_id'),
+        Field('hospitalEntryDate', 'date'),
+        Field('hospitalExitDate', 'date'),
+        Field('medicalCondition'),
+        Field('region', max_length=100),
+        Field('companionName'),
+        Field('companionNationalId', 'national_id'),
+        Field('relationship'),
+    ], rules=[DateOrder('hospitalEntryDate', 'hospitalExitDate')]),
+)}
+
+
+def get_schema(request_type):
+    """مخطط النوع أو None إذا كان النوع غير معروف"""
+    return SCHEMAS.get(request_type)
+
+
+def describe_schemas():
+    return [SCHEMAS[request_type].describe() for request_type in REQUEST_TYPES]
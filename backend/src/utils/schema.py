@@ -0,0 +1,53 @@
+"""
+ترقية مخطط قاعدة البيانات دون أداة ترحيل خارجية
+- db.create_all ينشئ الجداول الجديدة فقط، لذا تُضاف الأعمدة الجديدة للجداول الموجودة بـ ALTER TABLE
+- تُنشأ الفهارس المعرفة على النماذج إذا لم تكن موجودة
+الأعمدة المضافة بهذه الطريقة يجب أن تقبل NULL أو أن يكون لها قيمة افتراضية على الخادم
+"""
+
+from sqlalchemy import inspect
+
+
+def add_missing_columns(db):
+    """إضافة أعمدة النماذج غير الموجودة في الجداول الحالية، وإرجاع أسمائها"""
+    inspector = inspect(db.engine)
+    dialect = db.engine.dialect
+    preparer = dialect.identifier_preparer
+    added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN ' \
+                  f'{preparer.format_column(column)} {column.type.compile(dialect=dialect)}'
+            if column.server_default is not None:
+                ddl += f' DEFAULT {column.server_default.arg.text}'
+            with db.engine.begin() as connection:
+                connection.execute(db.text(ddl))
+            added.append(f'{table.name}.{column.name}')
+    return added
+
+
+def create_missing_indexes(db):
+    """إنشاء الفهارس المعرفة على النماذج إذا لم تكن موجودة، وإرجاع أسمائها"""
+    inspector = inspect(db.engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=db.engine)
+                created.append(index.name)
+    return created
+
+
+def upgrade_schema(db):
+    """إنشاء الجداول ثم إضافة الأعمدة والفهارس الناقصة وتجهيز فهرس البحث"""
+    from src.utils.search import setup_search
+    db.create_all()
+    columns, indexes = add_missing_columns(db), create_missing_indexes(db)
+    setup_search(db)
+    return columns, indexes
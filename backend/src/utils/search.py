@@ -0,0 +1,193 @@
+"""
+البحث عن المستخدمين بأسماء عربية موحدة الكتابة
+- توحيد الكتابة: إزالة التشكيل والتطويل، توحيد الألف والهمزات، التاء المربوطة والألف المقصورة، الأرقام الهندية
+- واجهة موحدة مستقلة عن قاعدة البيانات: SQLite يستخدم FTS5، و PostgreSQL يستخدم pg_trgm،
+  وأي قاعدة أخرى تعود إلى LIKE على عمود الاسم الموحد
+- رقم الهوية والجوال يُطابقان كبادئة حتى يُستخدم الفهرس
+"""
+
+import re
+import sqlite3
+from functools import lru_cache
+from sqlalchemy import func, or_
+
+_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+_TRANSLATION = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ة': 'ه', 'ى': 'ي', 'ؤ': 'و', 'ئ': 'ي',
+    '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
+    '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9',
+})
+_WHITESPACE = re.compile(r'\s+')
+
+NORMALIZE_BATCH_SIZE = 1000
+
+
+def normalize_arabic(text):
+    """توحيد كتابة النص العربي للبحث"""
+    if not text:
+        return ''
+    text = _DIACRITICS.sub('', text).translate(_TRANSLATION).lower()
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def build_search_name(full_name):
+    """
+    نص الاسم المخزن للبحث: الاسم الموحد مع نسخ كلماته بدون أداة التعريف
+    حتى يطابق البحث عن "عتيبي" الاسم "العتيبي"
+    """
+    normalized = normalize_arabic(full_name)
+    extra = [token[2:] for token in normalized.split(' ') if token.startswith('ال') and len(token) > 4]
+    return ' '.join([normalized] + extra)[:200]
+
+
+def _like_filter(User, normalized):
+    return or_(
+        User.search_name.contains(normalized, autoescape=True),
+        User.national_id.startswith(normalized, autoescape=True),
+        User.phone.startswith(normalized, autoescape=True),
+        func.lower(User.email).contains(normalized, autoescape=True),
+    )
+
+
+class LikeSearchBackend:
+    """البحث عبر LIKE على الأعمدة الموحدة (لأي قاعدة بيانات، بدون فهرس نصي)"""
+    name = 'like'
+
+    def setup(self, db):
+        pass
+
+    def rebuild(self, db):
+        pass
+
+    def user_filter(self, User, query_text):
+        return _like_filter(User, normalize_arabic(query_text))
+
+
+class SQLiteFTSSearchBackend:
+    """
+    فهرس FTS5 خارجي المحتوى على جدول المستخدمين، تحدّثه محفزات (triggers) داخل SQLite
+    تُطابق كلمات الاسم كبادئات، ورقم الهوية والجوال كبادئة كاملة
+    """
+    name = 'sqlite_fts5'
+    table = 'user_search'
+    columns = ('search_name', 'national_id', 'phone', 'email')
+
+    def _statements(self):
+        cols = ', '.join(self.columns)
+        new_values = ', '.join(f'new.{c}' for c in self.columns)
+        old_values = ', '.join(f'old.{c}' for c in self.columns)
+        watched = ', '.join(self.columns)
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} USING fts5("
+            f"{cols}, content='user', content_rowid='id', prefix='2 3 4')",
+            f'CREATE TRIGGER IF NOT EXISTS {self.table}_ai AFTER INSERT ON "user" BEGIN '
+            f'INSERT INTO {self.table}(rowid, {cols}) VALUES (new.id, {new_values}); END',
+            f'CREATE TRIGGER IF NOT EXISTS {self.table}_ad AFTER DELETE ON "user" BEGIN '
+            f"INSERT INTO {self.table}({self.table}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); END",
+            f'CREATE TRIGGER IF NOT EXISTS {self.table}_au AFTER UPDATE OF {watched} ON "user" BEGIN '
+            f"INSERT INTO {self.table}({self.table}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); "
+            f'INSERT INTO {self.table}(rowid, {cols}) VALUES (new.id, {new_values}); END',
+        ]
+
+    def setup(self, db):
+        with db.engine.begin() as connection:
+            exists = connection.execute(db.text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+            ), {'name': self.table}).first()
+            for statement in self._statements():
+                connection.execute(db.text(statement))
+            if not exists:
+                connection.execute(db.text(f"INSERT INTO {self.table}({self.table}) VALUES ('rebuild')"))
+
+    def rebuild(self, db):
+        with db.engine.begin() as connection:
+            connection.execute(db.text(f"INSERT INTO {self.table}({self.table}) VALUES ('rebuild')"))
+
+    @staticmethod
+    def _match_expression(normalized):
+        tokens = [token.replace('"', '""') for token in normalized.split(' ') if token]
+        return ' AND '.join(f'"{token}"*' for token in tokens)
+
+    def user_filter(self, User, query_text):
+        from src.models import db
+        normalized = normalize_arabic(query_text)
+        match = self._match_expression(normalized)
+        if not match:
+            return _like_filter(User, normalized)
+        matching_ids = db.select(db.literal_column('rowid')).select_from(db.table(self.table)).where(
+            db.text(f'{self.table} MATCH :search_match').bindparams(search_match=match)
+        )
+        return User.id.in_(matching_ids)
+
+
+class PostgresTrigramSearchBackend:
+    """فهارس GIN بامتداد pg_trgm لمطابقة أجزاء الاسم والبريد، وفهارس btree للبادئات"""
+    name = 'pg_trgm'
+
+    statements = [
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        'CREATE INDEX IF NOT EXISTS idx_user_search_name_trgm ON "user" USING gin (search_name gin_trgm_ops)',
+        'CREATE INDEX IF NOT EXISTS idx_user_email_trgm ON "user" USING gin (lower(email) gin_trgm_ops)',
+        'CREATE INDEX IF NOT EXISTS idx_user_national_id_prefix ON "user" (national_id varchar_pattern_ops)',
+        'CREATE INDEX IF NOT EXISTS idx_user_phone_prefix ON "user" (phone varchar_pattern_ops)',
+    ]
+
+    def setup(self, db):
+        with db.engine.begin() as connection:
+            for statement in self.statements:
+                connection.execute(db.text(statement))
+
+    def rebuild(self, db):
+        pass
+
+    def user_filter(self, User, query_text):
+        return _like_filter(User, normalize_arabic(query_text))
+
+
+@lru_cache(maxsize=1)
+def _sqlite_has_fts5():
+    try:
+        sqlite3.connect(':memory:').execute('CREATE VIRTUAL TABLE fts5_probe USING fts5(value)')
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def get_search_backend(db):
+    """اختيار آلية البحث حسب نوع قاعدة البيانات"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite' and _sqlite_has_fts5():
+        return SQLiteFTSSearchBackend()
+    if dialect == 'postgresql':
+        return PostgresTrigramSearchBackend()
+    return LikeSearchBackend()
+
+
+def fill_search_names(db, only_missing=True, batch_size=NORMALIZE_BATCH_SIZE):
+    """حساب الاسم الموحد للمستخدمين على دفعات، وإرجاع عدد المستخدمين المحدثين"""
+    from src.models import User
+    last_id = 0
+    updated = 0
+    while True:
+        query = db.session.query(User.id, User.full_name).filter(User.id > last_id)
+        if only_missing:
+            query = query.filter(User.search_name.is_(None))
+        rows = query.order_by(User.id).limit(batch_size).all()
+        if not rows:
+            break
+        db.session.execute(db.update(User), [
+            {'id': user_id, 'search_name': build_search_name(full_name)} for user_id, full_name in rows
+        ])
+        db.session.commit()
+        last_id = rows[-1][0]
+        updated += len(rows)
+    return updated
+
+
+def setup_search(db):
+    """تجهيز فهرس البحث وملء الأسماء الموحدة الناقصة"""
+    fill_search_names(db)
+    backend = get_search_backend(db)
+    backend.setup(db)
+    return backend
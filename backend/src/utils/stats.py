@@ -0,0 +1,213 @@
+"""
+إحصائيات لوحة التحكم
+- تُحسب جميع الأرقام في استعلام تجميعي واحد (conditional aggregation)
+- تُخزن النتيجة في ذاكرة مؤقتة قصيرة العمر وتُبطل بعد حفظ المعاملة التي عدلت الطلبات
+  (لا قبله، حتى لا تعيد قراءة متزامنة تخزين الأرقام القديمة)
+- عند تفعيل STATS_USE_COUNTERS تُقرأ الإجماليات من جدول request_counter بدلاً من فحص جدول الطلبات
+- جدول العدادات يُبنى فقط في bootstrap أو بأمر rebuild-stats-counters، ويُحدّث مع كل تعديل أياً كانت قيمة
+  STATS_USE_COUNTERS؛ مسار القراءة لا يكتب أبداً ويعود للاستعلام التجميعي إذا لم يُبنَ الجدول
+"""
+
+from datetime import datetime, time, timedelta
+from flask import current_app
+from sqlalchemy import case, event, func, select
+from sqlalchemy.exc import IntegrityError
+from src.models import db, User, Request, RequestCounter
+from src.models.request import REQUEST_STATUSES, REQUEST_TYPES
+from src.utils.cache import TTLCache
+from src.utils.replica import RoutingSession
+
+DEFAULT_STATS_CACHE_TTL = 10  # بالثواني
+
+_stats_cache = TTLCache(maxsize=4, ttl=DEFAULT_STATS_CACHE_TTL)
+
+# مفتاح في session.info يُعلَّم عند تعديل الطلبات ويُبطل الذاكرة المؤقتة بعد الحفظ
+STATS_DIRTY_KEY = 'stats_dirty'
+
+
+def _counters_enabled():
+    return current_app.config.get('STATS_USE_COUNTERS', False)
+
+
+def _count_where(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def _time_windows():
+    """حدود الفترات الزمنية كنطاقات على created_date حتى يُستخدم الفهرس"""
+    now = datetime.utcnow()
+    return {
+        'today': datetime.combine(now.date(), time.min),
+        'last_7_days': now - timedelta(days=7),
+        'last_30_days': now - timedelta(days=30),
+    }
+
+
+def _user_subqueries(windows):
+    """عدد المستخدمين والمستخدمين الجدد كاستعلامات فرعية ضمن نفس الاستعلام"""
+    not_admin = User.national_id != 'admin'
+    total_users = select(func.count(User.id)).where(not_admin).scalar_subquery()
+    new_users = select(func.count(User.id)).where(
+        not_admin, User.registration_date >= windows['last_30_days']
+    ).scalar_subquery()
+    return total_users, new_users
+
+
+def _compute_aggregated():
+    """حساب جميع الأرقام في استعلام واحد على جدول الطلبات"""
+    windows = _time_windows()
+    total_users, new_users = _user_subqueries(windows)
+    columns = [func.count(Request.id)]
+    columns += [_count_where(Request.status == status) for status in REQUEST_STATUSES]
+    columns += [_count_where(Request.type == request_type) for request_type in REQUEST_TYPES]
+    columns += [
+        _count_where(Request.created_date >= windows['today']),
+        _count_where(Request.created_date >= windows['last_7_days']),
+        total_users,
+        new_users,
+    ]
+    row = db.session.query(*columns).select_from(Request).one()
+
+    values = iter(row)
+    stats = {'total': next(values)}
+    stats['by_status'] = {status: next(values) for status in REQUEST_STATUSES}
+    stats['by_type'] = {request_type: next(values) for request_type in REQUEST_TYPES}
+    stats['today'] = next(values)
+    stats['last_7_days'] = next(values)
+    stats['total_users'] = next(values) or 0
+    stats['new_users'] = next(values) or 0
+    return stats
+
+
+def _compute_from_counters():
+    """قراءة الإجماليات من جدول العدادات ثم الفترات الزمنية في استعلام واحد على فهرس created_date"""
+    counters = dict(db.session.query(RequestCounter.name, RequestCounter.value).all())
+    if 'total' not in counters:
+        # لم يُبنَ الجدول بعد (flask --app src.main rebuild-stats-counters)
+        return _compute_aggregated()
+
+    windows = _time_windows()
+    total_users, new_users = _user_subqueries(windows)
+    row = db.session.query(
+        _count_where(Request.created_date >= windows['today']),
+        func.count(Request.id),
+        total_users,
+        new_users,
+    ).select_from(Request).filter(Request.created_date >= windows['last_7_days']).one()
+
+    return {
+        'total': counters.get('total', 0),
+        'by_status': {status: counters.get(f'status:{status}', 0) for status in REQUEST_STATUSES},
+        'by_type': {request_type: counters.get(f'type:{request_type}', 0) for request_type in REQUEST_TYPES},
+        'today': row[0],
+        'last_7_days': row[1],
+        'total_users': row[2] or 0,
+        'new_users': row[3] or 0,
+    }
+
+
+def get_request_stats():
+    """إرجاع أرقام لوحة التحكم من الذاكرة المؤقتة أو حسابها"""
+    _stats_cache.ttl = current_app.config.get('STATS_CACHE_TTL', DEFAULT_STATS_CACHE_TTL)
+    if _counters_enabled():
+        return _stats_cache.get_or_set('counters', _compute_from_counters)
+    return _stats_cache.get_or_set('aggregated', _compute_aggregated)
+
+
+def invalidate_stats():
+    """إبطال الإحصائيات المخزنة مؤقتاً"""
+    _stats_cache.clear()
+
+
+def _mark_dirty():
+    """تأجيل الإبطال إلى ما بعد حفظ المعاملة الحالية"""
+    db.session.info[STATS_DIRTY_KEY] = True
+
+
+def _after_commit(session):
+    if session.info.pop(STATS_DIRTY_KEY, False):
+        invalidate_stats()
+
+
+def _after_rollback(session):
+    session.info.pop(STATS_DIRTY_KEY, None)
+
+
+def init_stats():
+    """تسجيل إبطال الإحصائيات بعد حفظ أي معاملة عدلت الطلبات"""
+    if not event.contains(RoutingSession, 'after_commit', _after_commit):
+        event.listen(RoutingSession, 'after_commit', _after_commit)
+    if not event.contains(RoutingSession, 'after_rollback', _after_rollback):
+        event.listen(RoutingSession, 'after_rollback', _after_rollback)
+
+
+def _bump(name, delta):
+    """
+    زيادة أو إنقاص عداد ضمن المعاملة الحالية
+    إذا لم يُبنَ الجدول بعد فلا يُنشأ شيء؛ يبقى مسار القراءة على الاستعلام التجميعي
+    """
+    db.session.execute(
+        db.update(RequestCounter)
+        .where(RequestCounter.name == name)
+        .values(value=RequestCounter.value + delta)
+    )
+
+
+def record_request_created(request_type, status='pending'):
+    """يُستدعى عند إنشاء طلب قبل حفظ المعاملة"""
+    _bump('total', 1)
+    _bump(f'status:{status}', 1)
+    _bump(f'type:{request_type}', 1)
+    _mark_dirty()
+
+
+def record_status_change(old_status, new_status, count=1):
+    """يُستدعى عند تغيير حالة طلب (أو عدة طلبات) قبل حفظ المعاملة"""
+    if old_status == new_status or not count:
+        return
+    _bump(f'status:{old_status}', -count)
+    _bump(f'status:{new_status}', count)
+    _mark_dirty()
+
+
+def record_requests_deleted(groups):
+    """يُستدعى قبل حذف مجموعة طلبات؛ groups قائمة من (type, status, count)"""
+    total = 0
+    for request_type, status, count in groups:
+        _bump(f'status:{status}', -count)
+        _bump(f'type:{request_type}', -count)
+        total += count
+    if total:
+        _bump('total', -total)
+    _mark_dirty()
+
+
+def rebuild_counters():
+    """إعادة بناء جدول العدادات بالكامل من جدول الطلبات؛ يحفظ المستدعي المعاملة"""
+    db.session.query(RequestCounter).delete()
+    values = {'total': 0}
+    values.update({f'status:{status}': 0 for status in REQUEST_STATUSES})
+    values.update({f'type:{request_type}': 0 for request_type in REQUEST_TYPES})
+    for request_type, status, count in db.session.query(
+        Request.type, Request.status, func.count(Request.id)
+    ).group_by(Request.type, Request.status):
+        values['total'] += count
+        values[f'status:{status}'] = values.get(f'status:{status}', 0) + count
+        values[f'type:{request_type}'] = values.get(f'type:{request_type}', 0) + count
+    db.session.add_all(RequestCounter(name=name, value=value) for name, value in values.items())
+    _mark_dirty()
+    return values
+
+
+def ensure_counters():
+    """بناء جدول العدادات إذا لم يُبنَ بعد (من bootstrap)؛ يُرجع True إذا بُني الآن"""
+    if db.session.query(RequestCounter.name).filter_by(name='total').first():
+        return False
+    rebuild_counters()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # بنته عملية bootstrap متزامنة
+        db.session.rollback()
+        return False
+    return True
@@ -0,0 +1,338 @@
+"""
+تخزين ملفات PDF بعنوان المحتوى (content-addressed)
+- اسم الملف هو بصمة SHA-256 لمحتواه، موزع على مجلدين فرعيين: ab/cd/abcd...ef.pdf
+  فلا يتجاوز أي مجلد بضع مئات من الملفات، والملف المرفوع مرتين يُخزن مرة واحدة
+- عدد المراجع هو عدد سجلات pdf_file التي تشير إلى نفس المسار، فلا يُحذف الملف إلا بعد حفظ حذف آخر سجل؛
+  الإضافة والحذف تحت قفل ملف مشترك بين العمليات، والملف المستخدم حديثاً لا يُحذف (قد يكون رفع متزامن
+  أعاد استخدامه ولم يُحفظ سجله بعد) ويتركه لجمع الملفات اليتيمة
+- الملفات تُكتب أولاً في مجلد مؤقت ثم تُنقل إلى مكانها بعملية ذرية (os.replace)
+- الملفات القديمة ذات الأسماء العشوائية في جذر مجلد الرفع تُنقل عبر أمر migrate-pdf-storage
+- الفحص الدوري (scan-pdf-files) يمسح المجلد مرة واحدة ويحدث حالة كل سجل على دفعات،
+  ويحفظ آخر تقرير في .integrity.json داخل مجلد الرفع
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from flask import current_app
+from src.models import db, PDFFile
+from src.utils.uploads import SESSIONS_DIRNAME, PDFStreamValidator, copy_stream
+from src.utils.versioning import bump_file_owners
+
+TEMP_DIRNAME = '.tmp'
+# صور المعاينة المولدة في الخلفية، باسم بصمة الملف الأصلي
+PREVIEWS_DIRNAME = '.previews'
+BLOB_EXTENSION = '.pdf'
+# الملفات المؤقتة أو اليتيمة الأحدث من هذه المدة لا تُحذف (قد يكون رفعها جارياً)
+GC_GRACE_SECONDS = 3600
+# الملف الموزع المعدل خلال هذه المدة لا يحذفه release_blob؛ commit_temp يحدث وقت تعديله عند إعادة الاستخدام
+RELEASE_GRACE_SECONDS = 120
+LOCK_FILENAME = '.blobs.lock'
+REPORT_FILENAME = '.integrity.json'
+# الحد الأقصى لعدد العناصر المحفوظة من كل قائمة في التقرير (الأعداد الكاملة تُحفظ دائماً)
+REPORT_MAX_ITEMS = 1000
+
+
+class LocalBlobStorage:
+    """مخزن ملفات محلي بعنوان المحتوى داخل مجلد الرفع"""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.temp_dir = os.path.join(self.root, TEMP_DIRNAME)
+        self.previews_dir = os.path.join(self.root, PREVIEWS_DIRNAME)
+
+    def blob_path(self, content_hash):
+        return os.path.join(self.root, content_hash[:2], content_hash[2:4], content_hash + BLOB_EXTENSION)
+
+    def preview_path(self, content_hash):
+        return os.path.join(self.previews_dir, content_hash[:2], content_hash + '.png')
+
+    def is_blob_path(self, file_path):
+        name = os.path.basename(file_path)
+        content_hash = name[:-len(BLOB_EXTENSION)]
+        return len(content_hash) == 64 and os.path.abspath(file_path) == self.blob_path(content_hash)
+
+    @contextmanager
+    def lock(self):
+        """قفل حصري بين العمليات يجمع فحص وجود الملف الموزع مع إضافته أو حذفه"""
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, LOCK_FILENAME), 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def temp_path(self):
+        os.makedirs(self.temp_dir, exist_ok=True)
+        return os.path.join(self.temp_dir, f'{uuid.uuid4().hex}.part')
+
+    def commit_temp(self, temp_path, content_hash):
+        """نقل ملف مؤقت إلى موقعه النهائي، أو حذفه إذا كان المحتوى نفسه مخزناً مسبقاً"""
+        final_path = self.blob_path(content_hash)
+        with self.lock():
+            if os.path.exists(final_path):
+                os.remove(temp_path)
+                # تحديث وقت التعديل حتى لا يحذفه release_blob أو جمع الملفات اليتيمة قبل حفظ السجل الجديد
+                os.utime(final_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(temp_path, final_path)
+        return final_path
+
+    def save_stream(self, stream, max_size=None):
+        """
+        حفظ تدفق ملف PDF على دفعات مع حساب البصمة وفحص المحتوى أثناء القراءة
+        يُرجع (المسار، البصمة، الحجم) أو يرفع InvalidPDF دون ترك أي ملف
+        """
+        temp_path = self.temp_path()
+        digest = hashlib.sha256()
+        validator = PDFStreamValidator(max_size=max_size)
+        try:
+            with open(temp_path, 'wb') as handle:
+                copy_stream(stream, handle, digest=digest, validator=validator)
+            validator.finish()
+            content_hash = digest.hexdigest()
+            return self.commit_temp(temp_path, content_hash), content_hash, validator.size
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def save_upload(self, file_storage, max_size=None):
+        """حفظ ملف مرفوع عبر multipart (FileStorage)"""
+        return self.save_stream(file_storage.stream, max_size=max_size)
+
+    def import_file(self, file_path, content_hash=None):
+        """نقل ملف موجود (قديم) إلى موقعه بعنوان المحتوى وإرجاع (المسار الجديد، البصمة)"""
+        content_hash = content_hash or PDFFile.compute_hash(file_path)
+        final_path = self.blob_path(content_hash)
+        with self.lock():
+            if os.path.exists(final_path):
+                os.remove(file_path)
+                os.utime(final_path)
+            else:
+                os.makedirs(os.path.dirname(final_path), exist_ok=True)
+                os.replace(file_path, final_path)
+        return final_path, content_hash
+
+    def scan(self):
+        """
+        مسح مجلد الرفع مرة واحدة عبر os.scandir وإرجاع قاموس {المسار: (الحجم، وقت التعديل)}
+        يشمل الملفات الموزعة والملفات القديمة في الجذر، ولا يشمل الملفات والمجلدات المخفية
+        (المجلد المؤقت، المعاينات، التقرير)
+        """
+        found = {}
+        if not os.path.isdir(self.root):
+            return found
+
+        def walk(directory, depth):
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        if depth < 2:
+                            walk(entry.path, depth + 1)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        found[entry.path] = (stat.st_size, stat.st_mtime)
+
+        walk(self.root, 0)
+        return found
+
+    def stale_temp_files(self, grace_seconds=GC_GRACE_SECONDS):
+        """الملفات المؤقتة وجلسات الرفع المجزأ المتروكة (آخر تعديل أقدم من مهلة السماح)"""
+        cutoff = time.time() - grace_seconds
+        stale = []
+        for directory, want_dirs in ((self.temp_dir, False), (os.path.join(self.temp_dir, SESSIONS_DIRNAME), True)):
+            if not os.path.isdir(directory):
+                continue
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False) != want_dirs:
+                        continue
+                    path = os.path.join(entry.path, 'data.part') if want_dirs else entry.path
+                    if os.path.exists(path) and os.stat(path).st_mtime < cutoff:
+                        stale.append(entry.path)
+        return stale
+
+
+def get_storage():
+    """المخزن المستخدم للتطبيق الحالي"""
+    return LocalBlobStorage(current_app.config['UPLOAD_FOLDER'])
+
+
+def is_referenced(file_path, exclude_id=None):
+    """هل يشير أي سجل pdf_file (غير المستثنى) إلى هذا المسار"""
+    query = db.session.query(PDFFile.id).filter(PDFFile.file_path == file_path)
+    if exclude_id is not None:
+        query = query.filter(PDFFile.id != exclude_id)
+    return query.first() is not None
+
+
+def release_blob(file_path, grace_seconds=RELEASE_GRACE_SECONDS):
+    """
+    حذف الملف من القرص إذا لم يعد أي سجل محفوظ يشير إليه؛ يُرجع True إذا حُذف
+    يُستدعى بعد حفظ حذف السجل (commit)، ولا يحذف ملفاً عُدل خلال grace_seconds
+    """
+    if is_referenced(file_path):
+        return False
+    storage = get_storage()
+    with storage.lock():
+        try:
+            if os.path.getmtime(file_path) > time.time() - grace_seconds:
+                return False
+            os.remove(file_path)
+        except FileNotFoundError:
+            return False
+    if storage.is_blob_path(file_path):
+        preview = storage.preview_path(os.path.basename(file_path)[:-len(BLOB_EXTENSION)])
+        if os.path.exists(preview):
+            os.remove(preview)
+    return True
+
+
+def migrate_legacy_files(batch_size=500, progress=None):
+    """
+    نقل الملفات القديمة (أسماء عشوائية في جذر مجلد الرفع) إلى التخزين بعنوان المحتوى
+    تُحدث جميع السجلات المشيرة إلى نفس الملف في استعلام واحد؛ يُرجع (عدد الملفات المنقولة، عدد المفقودة)
+    """
+    storage = get_storage()
+    migrated = missing = 0
+    last_id = 0
+    while True:
+        rows = db.session.query(PDFFile.id, PDFFile.file_path, PDFFile.content_hash).filter(
+            PDFFile.id > last_id
+        ).order_by(PDFFile.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        for row in rows:
+            if storage.is_blob_path(row.file_path):
+                continue
+            if not os.path.exists(row.file_path):
+                missing += 1
+                continue
+            new_path, content_hash = storage.import_file(row.file_path)
+            db.session.execute(
+                db.update(PDFFile).where(PDFFile.file_path == row.file_path).values(
+                    file_path=new_path,
+                    filename=os.path.basename(new_path),
+                    content_hash=content_hash
+                )
+            )
+            bump_file_owners(PDFFile.file_path == new_path)
+            db.session.commit()
+            migrated += 1
+        if progress:
+            progress(migrated, last_id)
+    return migrated, missing
+
+
+def reconcile_storage(grace_seconds=GC_GRACE_SECONDS, persist=True, batch_size=1000):
+    """
+    مقارنة محتوى مجلد الرفع بسجلات pdf_file بمسح واحد للقرص وقراءة السجلات على دفعات
+    عند persist تُحدث أعمدة exists_on_disk و size_mismatch و verified_at لكل سجل في
+    استعلام مجمع لكل دفعة، ويُحفظ التقرير في مجلد الرفع
+    يُرجع قاموساً: orphans (ملفات بلا سجل وأقدم من مهلة السماح)، missing (سجلات بلا ملف)،
+    size_mismatch (حجم الملف يختلف عن المسجل)، stale_temp (ملفات مؤقتة متروكة)
+    """
+    storage = get_storage()
+    on_disk = storage.scan()
+    cutoff = time.time() - grace_seconds
+    scanned_at = datetime.utcnow()
+
+    referenced = set()
+    missing = []
+    size_mismatch = []
+    checked = 0
+    last_id = 0
+    while True:
+        rows = db.session.query(
+            PDFFile.id, PDFFile.file_path, PDFFile.file_size, PDFFile.exists_on_disk, PDFFile.size_mismatch
+        ).filter(PDFFile.id > last_id).order_by(PDFFile.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        updates = []
+        changed = []
+        for file_id, file_path, file_size, was_on_disk, was_mismatch in rows:
+            path = os.path.abspath(file_path)
+            referenced.add(path)
+            entry = on_disk.get(path)
+            mismatch = entry is not None and entry[0] != file_size
+            if entry is None:
+                missing.append({'id': file_id, 'file_path': file_path})
+            elif mismatch:
+                size_mismatch.append({'id': file_id, 'file_path': file_path,
+                                      'recorded_size': file_size, 'actual_size': entry[0]})
+            updates.append({'id': file_id, 'exists_on_disk': entry is not None,
+                            'size_mismatch': mismatch, 'verified_at': scanned_at})
+            if was_on_disk != (entry is not None) or bool(was_mismatch) != mismatch:
+                changed.append(file_id)
+        checked += len(rows)
+        if persist:
+            db.session.execute(db.update(PDFFile), updates)
+            # verified_at وحده لا يغير رقم الإصدار حتى لا يُبطل كل فحص دوري ذاكرة الواجهة لجميع المستخدمين
+            if changed:
+                bump_file_owners(PDFFile.id.in_(changed))
+            db.session.commit()
+
+    orphans = [path for path, (size, mtime) in on_disk.items() if path not in referenced and mtime < cutoff]
+    report = {
+        'scanned_at': scanned_at.isoformat(),
+        'files_checked': checked,
+        'files_on_disk': len(on_disk),
+        'orphans': sorted(orphans),
+        'missing': missing,
+        'size_mismatch': size_mismatch,
+        'stale_temp': storage.stale_temp_files(grace_seconds),
+    }
+    if persist:
+        _save_report(storage, report)
+    return report
+
+
+def check_storage(grace_seconds=GC_GRACE_SECONDS):
+    """مقارنة مجلد الرفع بالسجلات دون تحديثها (fsck)"""
+    return reconcile_storage(grace_seconds, persist=False)
+
+
+def _save_report(storage, report):
+    summary = dict(report)
+    for key in ('orphans', 'missing', 'size_mismatch', 'stale_temp'):
+        summary[f'{key}_count'] = len(report[key])
+        summary[key] = report[key][:REPORT_MAX_ITEMS]
+    path = os.path.join(storage.root, REPORT_FILENAME)
+    temp_path = path + '.part'
+    with open(temp_path, 'w', encoding='utf-8') as handle:
+        json.dump(summary, handle, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def last_scan_report():
+    """آخر تقرير محفوظ من الفحص الدوري، أو None إذا لم يُشغل الفحص بعد"""
+    path = os.path.join(get_storage().root, REPORT_FILENAME)
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+
+def verify_blob_hashes():
+    """إعادة حساب بصمة كل ملف موزع ومقارنتها باسمه؛ يُرجع قائمة المسارات التالفة"""
+    storage = get_storage()
+    corrupted = []
+    for path in storage.scan():
+        if storage.is_blob_path(path):
+            expected = os.path.basename(path)[:-len(BLOB_EXTENSION)]
+            if PDFFile.compute_hash(path) != expected:
+                corrupted.append(path)
+    return corrupted
@@ -0,0 +1,161 @@
+"""
+رفع ملفات PDF على شكل تدفق بذاكرة ثابتة
+- يُقرأ جسم الطلب على دفعات بحجم UPLOAD_CHUNK_SIZE وتُحسب البصمة ويُفحص المحتوى أثناء القراءة
+  (بداية الملف %PDF- ونهايته %%EOF) ثم يُنقل الملف المؤقت إلى مكانه بعملية ذرية
+- الرفع القابل للاستئناف: تُنشأ جلسة رفع على القرص (.tmp/sessions/<id>) وتُرسل الأجزاء بالترتيب
+  مع ترويسة Upload-Offset؛ عند انقطاع الاتصال يُستأنف الرفع من آخر بايت محفوظ
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+PDF_MAGIC = b'%PDF-'
+PDF_TRAILER = b'%%EOF'
+# يسمح معيار PDF ببيانات قبل %PDF- ضمن أول 1024 بايت وبعد %%EOF ضمن آخر 1024 بايت
+MAGIC_WINDOW = 1024
+TRAILER_WINDOW = 1024
+SESSIONS_DIRNAME = 'sessions'
+
+
+class InvalidPDF(ValueError):
+    """المحتوى المرفوع ليس ملف PDF صالحاً أو يتجاوز الحجم المسموح"""
+
+
+class OffsetMismatch(Exception):
+    """الجزء المرسل لا يبدأ عند نهاية الجزء المحفوظ؛ offset هي الإزاحة الصحيحة"""
+
+    def __init__(self, offset):
+        super().__init__(offset)
+        self.offset = offset
+
+
+class PDFStreamValidator:
+    """فحص توقيع PDF في بداية المحتوى ونهايته أثناء القراءة دون الاحتفاظ بالملف في الذاكرة"""
+
+    def __init__(self, max_size=None, check_head=True):
+        self.max_size = max_size
+        self.size = 0
+        self.head = b'' if check_head else PDF_MAGIC
+        self.tail = b''
+
+    def feed(self, chunk):
+        self.size += len(chunk)
+        if self.max_size is not None and self.size > self.max_size:
+            raise InvalidPDF('حجم الملف يتجاوز الحد المسموح')
+        if len(self.head) < MAGIC_WINDOW:
+            self.head += chunk[:MAGIC_WINDOW - len(self.head)]
+            if len(self.head) >= MAGIC_WINDOW and PDF_MAGIC not in self.head:
+                raise InvalidPDF('الملف ليس بصيغة PDF')
+        self.tail = (self.tail + chunk)[-TRAILER_WINDOW:]
+
+    def finish(self):
+        if self.size == 0:
+            raise InvalidPDF('الملف فارغ')
+        if PDF_MAGIC not in self.head:
+            raise InvalidPDF('الملف ليس بصيغة PDF')
+        if PDF_TRAILER not in self.tail:
+            raise InvalidPDF('ملف PDF غير مكتمل أو تالف')
+
+
+def copy_stream(stream, handle, digest=None, validator=None, chunk_size=UPLOAD_CHUNK_SIZE):
+    """نسخ تدفق إلى ملف على دفعات مع تحديث البصمة والفحص، وإرجاع عدد البايتات"""
+    written = 0
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return written
+        if validator:
+            validator.feed(chunk)
+        if digest:
+            digest.update(chunk)
+        handle.write(chunk)
+        written += len(chunk)
+
+
+class UploadSession:
+    """جلسة رفع قابلة للاستئناف محفوظة على القرص (بيانات وصفية + ملف جزئي)"""
+
+    def __init__(self, storage, upload_id):
+        if not upload_id or not all(c in '0123456789abcdef' for c in upload_id):
+            raise KeyError(upload_id)
+        self.storage = storage
+        self.upload_id = upload_id
+        self.directory = os.path.join(storage.temp_dir, SESSIONS_DIRNAME, upload_id)
+        self.meta_path = os.path.join(self.directory, 'meta.json')
+        self.data_path = os.path.join(self.directory, 'data.part')
+
+    @classmethod
+    def create(cls, storage, request_id, filename, size, notes=''):
+        session = cls(storage, uuid.uuid4().hex)
+        os.makedirs(session.directory)
+        meta = {
+            'request_id': request_id, 'filename': filename, 'size': size,
+            'notes': notes, 'created_at': time.time(),
+        }
+        with open(session.meta_path, 'w', encoding='utf-8') as handle:
+            json.dump(meta, handle, ensure_ascii=False)
+        open(session.data_path, 'wb').close()
+        return session
+
+    @classmethod
+    def load(cls, storage, upload_id):
+        """تحميل جلسة موجودة؛ يرفع KeyError إذا لم توجد"""
+        session = cls(storage, upload_id)
+        if not os.path.exists(session.meta_path):
+            raise KeyError(upload_id)
+        return session
+
+    @property
+    def meta(self):
+        with open(self.meta_path, encoding='utf-8') as handle:
+            return json.load(handle)
+
+    @property
+    def offset(self):
+        return os.path.getsize(self.data_path)
+
+    def append(self, stream, offset, size):
+        """
+        إلحاق جزء بالملف الجزئي بشرط أن يبدأ عند الإزاحة الحالية؛ يُرجع الإزاحة الجديدة
+        فحص الإزاحة والإلحاق تحت قفل على الملف الجزئي، فلا يُلحق طلبان متزامنان (إعادة إرسال) نفس الجزء مرتين
+        """
+        with open(self.data_path, 'ab') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            current = os.fstat(handle.fileno()).st_size
+            if offset != current:
+                raise OffsetMismatch(current)
+            # بداية الملف تُفحص في الجزء الأول فقط، ونهايته عند الإكمال
+            validator = PDFStreamValidator(max_size=size - current, check_head=current == 0)
+            try:
+                written = copy_stream(stream, handle, validator=validator)
+            except InvalidPDF:
+                handle.truncate(current)
+                raise
+        return current + written
+
+    def finalize(self):
+        """
+        فحص الملف المكتمل وحساب بصمته بقراءة واحدة على دفعات ثم نقله إلى التخزين
+        يُرجع (المسار، البصمة، الحجم)
+        """
+        digest = hashlib.sha256()
+        validator = PDFStreamValidator()
+        with open(self.data_path, 'rb') as handle:
+            for chunk in iter(lambda: handle.read(UPLOAD_CHUNK_SIZE), b''):
+                validator.feed(chunk)
+                digest.update(chunk)
+        validator.finish()
+        content_hash = digest.hexdigest()
+        file_path = self.storage.commit_temp(self.data_path, content_hash)
+        self.discard()
+        return file_path, content_hash, validator.size
+
+    def discard(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
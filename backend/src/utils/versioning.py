@@ -0,0 +1,95 @@
+"""
+رقم إصدار لبيانات كل مستخدم (user.data_version) لطلبات GET الشرطية في المسارات التي تستطلعها الواجهة
+- يزيد الرقم مع أي تعديل على المستخدم أو طلباته أو ملفاتها: تعديلات ORM تُلتقط تلقائياً بعد flush،
+  والتحديثات المجمعة (UPDATE مباشر) تستدعي bump_* صراحة في نفس المعاملة
+- ETag ضعيف من معرف المستخدم ورقم الإصدار والمسار، فيُجاب If-None-Match بـ 304 بعد استعلام عمود واحد
+  ودون تحميل الطلبات أو تسلسلها
+"""
+
+import hashlib
+from sqlalchemy import event
+from flask import current_app, request
+from werkzeug.http import is_resource_modified
+from src.models import db, User, Request, PDFFile
+from src.utils.replica import RoutingSession
+
+
+def _bump(condition):
+    return db.update(User).where(condition).values(
+        data_version=User.data_version + 1
+    ).execution_options(synchronize_session=False)
+
+
+def bump_users(user_ids):
+    """زيادة رقم الإصدار لمستخدمين محددين"""
+    user_ids = set(user_ids)
+    if user_ids:
+        db.session.execute(_bump(User.id.in_(user_ids)))
+
+
+def bump_request_owners(*conditions):
+    """زيادة رقم الإصدار لأصحاب الطلبات المطابقة للشروط"""
+    db.session.execute(_bump(User.id.in_(db.select(Request.user_id).where(*conditions))))
+
+
+def bump_file_owners(*conditions):
+    """زيادة رقم الإصدار لأصحاب الملفات المطابقة للشروط"""
+    db.session.execute(_bump(User.id.in_(
+        db.select(Request.user_id).join(PDFFile, PDFFile.request_id == Request.id).where(*conditions)
+    )))
+
+
+def _after_flush(session, flush_context):
+    user_ids, request_ids = set(), set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        if isinstance(obj, User):
+            user_ids.add(obj.id)
+        elif isinstance(obj, Request):
+            user_ids.add(obj.user_id)
+        elif isinstance(obj, PDFFile):
+            request_ids.add(obj.request_id)
+    # على اتصال الجلسة نفسه: الرقم يُحفظ أو يُلغى مع التعديل في نفس المعاملة
+    connection = session.connection()
+    user_ids.discard(None)
+    if user_ids:
+        connection.execute(_bump(User.id.in_(user_ids)))
+    request_ids.discard(None)
+    if request_ids:
+        connection.execute(_bump(User.id.in_(db.select(Request.user_id).where(Request.id.in_(request_ids)))))
+
+
+def init_data_versions():
+    """تسجيل زيادة رقم الإصدار بعد كل flush يعدل بيانات مستخدم"""
+    if not event.contains(RoutingSession, 'after_flush', _after_flush):
+        event.listen(RoutingSession, 'after_flush', _after_flush)
+
+
+def user_etag(user_id, version=None):
+    """ETag لاستجابة المسار الحالي لهذا المستخدم؛ يقرأ رقم الإصدار إذا لم يُمرر"""
+    if version is None:
+        version = db.session.query(User.data_version).filter(User.id == user_id).scalar()
+    key = f'{user_id}:{version}:{request.path}?{request.query_string.decode("latin-1")}'
+    return hashlib.blake2s(key.encode(), digest_size=12).hexdigest()
+
+
+def private_cache(response, etag=None, last_modified=None):
+    """ترويسات استجابة خاصة بالمستخدم: لا تُخزن في الوسطاء، ويُعاد التحقق منها مع كل استخدام"""
+    if etag:
+        response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response
+
+
+def is_unchanged(etag, last_modified=None):
+    """هل نسخة العميل (If-None-Match أو If-Modified-Since) ما زالت صالحة"""
+    return not is_resource_modified(request.environ, etag=etag, last_modified=last_modified)
+
+
+def unchanged_response(etag, last_modified=None):
+    return private_cache(current_app.response_class(status=304), etag, last_modified)
@@ -0,0 +1,111 @@
+"""
+إعدادات الاختبارات: تطبيق جديد على قاعدة SQLite مؤقتة لكل اختبار
+التشغيل من مجلد backend: python -m pytest -q
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from src.main import create_app
+from src.models import db, User, Request, PDFFile
+from src.utils.bootstrap import bootstrap
+from src.utils.stats import invalidate_stats
+
+OWNER_NATIONAL_ID = '1000000000'
+
+
+@pytest.fixture
+def app(tmp_path):
+    # الذاكرات المؤقتة على مستوى العملية معطلة حتى لا تنتقل القيم بين قواعد الاختبارات
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'UPLOAD_FOLDER': str(tmp_path / 'uploads'),
+        'AUTH_CACHE_TTL': 0,
+        'STATS_CACHE_TTL': 0,
+    })
+    bootstrap(app)
+    invalidate_stats()
+    with app.app_context():
+        owner = User(full_name='مستخدم الاختبار', national_id=OWNER_NATIONAL_ID,
+                     email='owner@example.com', phone='0500000000')
+        db.session.add(owner)
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+def login(app, national_id):
+    client = app.test_client()
+    response = client.post('/api/login', json={'national_id': national_id})
+    assert response.status_code == 200, response.get_json()
+    return client
+
+
+@pytest.fixture
+def admin_client(app):
+    return login(app, 'admin')
+
+
+@pytest.fixture
+def user_client(app):
+    return login(app, OWNER_NATIONAL_ID)
+
+
+def seed(app, count):
+    """
+    إضافة count طلب تقرير طبي بملف PDF للمستخدم المالك، و count مستخدماً جديداً لكل منهم طلب بملف
+    يمكن استدعاؤها أكثر من مرة على نفس القاعدة
+    """
+    with app.app_context():
+        folder = app.config['UPLOAD_FOLDER']
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, 'report.pdf')
+        with open(path, 'wb') as handle:
+            handle.write(b'%PDF-1.4\n%%EOF\n')
+
+        owner = User.query.filter_by(national_id=OWNER_NATIONAL_ID).one()
+        start = User.query.count()
+        users = [owner] * count
+        for index in range(count):
+            user = User(full_name=f'مستخدم {start + index}', national_id=f'2{start + index:09d}',
+                        email=f'user{start + index}@example.com', phone='0500000000')
+            db.session.add(user)
+            users.append(user)
+        db.session.flush()
+
+        for user in users:
+            req = Request(user_id=user.id, type='medical_request', status='pending')
+            req.set_data({'reportType': 'تقرير طبي', 'purpose': 'جهة العمل'})
+            db.session.add(req)
+            db.session.flush()
+            db.session.add(PDFFile(request_id=req.id, filename='report.pdf', original_filename='report.pdf',
+                                   file_path=path, file_size=os.path.getsize(path)))
+        db.session.commit()
+        invalidate_stats()
+
+
+@contextmanager
+def count_queries(app):
+    """عدد استعلامات SQL المنفذة داخل الكتلة (بما فيها المنفذة أثناء قراءة الاستجابات المتدفقة)"""
+    counter = {'count': 0}
+
+    def listener(*args):
+        counter['count'] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
@@ -0,0 +1,76 @@
+"""مسار قائمة طلبات الإدارة: تسجيل واحد لكل (مسار، طريقة)، أوضاع التصفح الثلاثة، والبحث"""
+
+from conftest import seed
+
+IGNORED_METHODS = {'HEAD', 'OPTIONS'}
+
+
+def test_no_duplicate_routes(app):
+    seen = {}
+    duplicates = []
+    for rule in app.url_map.iter_rules():
+        for method in rule.methods - IGNORED_METHODS:
+            key = (rule.rule, method)
+            if key in seen:
+                duplicates.append(f'{method} {rule.rule}: {seen[key]} / {rule.endpoint}')
+            seen[key] = rule.endpoint
+    assert not duplicates
+
+
+def test_full_list_without_pagination(app, admin_client):
+    seed(app, 3)
+    response = admin_client.get('/api/admin/requests')
+    assert response.status_code == 200
+    assert len(response.get_json()) == 6
+
+
+def test_offset_pages(app, admin_client):
+    seed(app, 3)
+    first = admin_client.get('/api/admin/requests?page=1&per_page=4').get_json()
+    second = admin_client.get('/api/admin/requests?page=2&per_page=4').get_json()
+
+    assert [len(first['requests']), len(second['requests'])] == [4, 2]
+    assert first['pagination']['total'] == 6
+    assert first['pagination']['pages'] == 2
+    assert first['pagination']['has_next'] and not second['pagination']['has_next']
+    ids = [req['id'] for req in first['requests'] + second['requests']]
+    assert len(set(ids)) == 6
+
+
+def test_offset_page_without_count_continues_with_cursor(app, admin_client):
+    seed(app, 3)
+    first = admin_client.get('/api/admin/requests?per_page=4&count=none').get_json()
+    assert first['pagination']['total'] is None
+    assert first['pagination']['has_next']
+
+    cursor = first['pagination']['next_cursor']
+    second = admin_client.get(f'/api/admin/requests?per_page=4&cursor={cursor}').get_json()
+    assert len(second['requests']) == 2
+    assert not second['pagination']['has_next']
+    assert {req['id'] for req in first['requests']}.isdisjoint(req['id'] for req in second['requests'])
+
+
+def test_keyset_list_with_header_cursor(app, admin_client):
+    seed(app, 3)
+    first = admin_client.get('/api/admin/requests?limit=4')
+    assert len(first.get_json()) == 4
+    cursor = first.headers['X-Next-Cursor']
+
+    second = admin_client.get(f'/api/admin/requests?limit=4&cursor={cursor}')
+    assert len(second.get_json()) == 2
+    assert 'X-Next-Cursor' not in second.headers
+
+
+def test_search_narrows_by_applicant(app, admin_client):
+    seed(app, 3)
+    everyone = admin_client.get('/api/admin/requests').get_json()
+    # اسم المالك "مستخدم الاختبار"؛ الهمزة تُوحد قبل المطابقة
+    matched = admin_client.get('/api/admin/requests?search=الإختبار').get_json()
+    assert len(everyone) == 6
+    assert len(matched) == 3
+    assert {req['user']['full_name'] for req in matched} == {'مستخدم الاختبار'}
+
+    paged = admin_client.get('/api/admin/requests?search=الاختبار&per_page=2').get_json()
+    assert paged['pagination']['total'] == 3
+
+    assert admin_client.get('/api/admin/requests?search=غيرموجود').get_json() == []
@@ -0,0 +1,66 @@
+"""الذاكرة المؤقتة للمستخدم المصادق: إبطال يقع أثناء القراءة يمنع تخزين الموجز القديم"""
+
+from conftest import OWNER_NATIONAL_ID, login
+from src.models import db, User
+from src.utils import auth
+from src.utils.cache import TTLCache
+
+
+def test_value_computed_across_invalidation_is_not_stored():
+    cache = TTLCache(ttl=60)
+
+    def stale_read():
+        cache.pop('key')  # إبطال من طلب آخر بعد القراءة وقبل التخزين
+        return 'old'
+
+    assert cache.get_or_set('key', stale_read) == 'old'
+    assert cache.get('key') is None
+    assert cache.get_or_set('key', lambda: 'new') == 'new'
+    assert cache.get('key') == 'new'
+
+
+def test_block_during_login_check_is_not_undone(app, monkeypatch):
+    app.config['AUTH_CACHE_TTL'] = 30
+    auth._principal_cache.clear()
+    client = login(app, OWNER_NATIONAL_ID)
+    with app.app_context():
+        owner_id = User.query.filter_by(national_id=OWNER_NATIONAL_ID).one().id
+    auth._principal_cache.clear()
+
+    fetch = auth._fetch_principal
+
+    def fetch_then_block(user_id):
+        principal = fetch(user_id)
+        # الإدارة تحظر المستخدم بعد أن قرأ هذا الطلب حالته النشطة
+        user = db.session.get(User, user_id)
+        user.status = 'blocked'
+        db.session.commit()
+        auth.invalidate_user(user_id)
+        return principal
+
+    monkeypatch.setattr(auth, '_fetch_principal', fetch_then_block)
+    assert client.get('/api/requests').status_code == 200
+    monkeypatch.setattr(auth, '_fetch_principal', fetch)
+
+    assert auth._principal_cache.get(owner_id) is None
+    assert client.get('/api/requests').status_code == 401
+    auth._principal_cache.clear()
+
+
+def test_block_from_another_worker_stops_writes_at_once(app):
+    app.config['AUTH_CACHE_TTL'] = 30
+    auth._principal_cache.clear()
+    client = login(app, OWNER_NATIONAL_ID)
+    assert client.get('/api/requests').status_code == 200
+
+    # الحظر نفذته عملية أخرى: لا إبطال لذاكرة هذه العملية
+    with app.app_context():
+        User.query.filter_by(national_id=OWNER_NATIONAL_ID).one().status = 'blocked'
+        db.session.commit()
+
+    response = client.post('/api/requests', json={'type': 'consultation', 'data': {
+        'consultationType': 'عامة', 'description': 'استشارة'}})
+    assert response.status_code == 401
+    # والقراءة التالية ترى الموجز المحدث من طلب الكتابة
+    assert client.get('/api/requests').status_code == 401
+    auth._principal_cache.clear()
@@ -0,0 +1,87 @@
+"""تسليم ملفات PDF: ETag قوي و 304 دون لمس القرص، طلبات Range، وترويسات الخادم الأمامي"""
+
+import hashlib
+import os
+
+import pytest
+
+from src.models import db, Request, PDFFile
+
+CONTENT = b'%PDF-1.4\n' + b'0123456789' * 20 + b'\n%%EOF\n'
+CONTENT_HASH = hashlib.sha256(CONTENT).hexdigest()
+
+
+def _attach(app, file_path):
+    with open(file_path, 'wb') as handle:
+        handle.write(CONTENT)
+    with app.app_context():
+        req = Request(user_id=1, type='medical_request', status='completed')
+        req.set_data({})
+        db.session.add(req)
+        db.session.flush()
+        pdf_file = PDFFile(request_id=req.id, filename=os.path.basename(file_path), original_filename='report.pdf',
+                           file_path=file_path, file_size=len(CONTENT), content_hash=CONTENT_HASH)
+        db.session.add(pdf_file)
+        db.session.commit()
+        return pdf_file.id
+
+
+@pytest.fixture
+def stored(app):
+    folder = os.path.join(app.config['UPLOAD_FOLDER'], 'ab')
+    os.makedirs(folder, exist_ok=True)
+    file_path = os.path.join(folder, f'{CONTENT_HASH}.pdf')
+    return _attach(app, file_path), file_path
+
+
+def test_if_none_match_is_answered_without_touching_disk(app, admin_client, stored):
+    file_id, file_path = stored
+    first = admin_client.get(f'/api/pdf/view/{file_id}')
+    assert first.status_code == 200
+    assert first.data == CONTENT
+    etag = first.headers['ETag']
+    assert etag == f'"{CONTENT_HASH}"'
+
+    # الملف لم يعد على القرص: لو فُحص لكانت الاستجابة 404
+    os.remove(file_path)
+    again = admin_client.get(f'/api/pdf/view/{file_id}', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+
+
+def test_range_request_returns_partial_content(app, admin_client, stored):
+    file_id, _ = stored
+    response = admin_client.get(f'/api/pdf/view/{file_id}', headers={'Range': 'bytes=0-9'})
+    assert response.status_code == 206
+    assert response.headers['Content-Range'] == f'bytes 0-9/{len(CONTENT)}'
+    assert response.data == CONTENT[:10]
+
+
+def test_x_accel_mode_emits_internal_redirect(app, admin_client, stored):
+    file_id, _ = stored
+    app.config.update(PDF_DELIVERY_MODE='x-accel', PDF_ACCEL_PREFIX='/protected-uploads/')
+    response = admin_client.get(f'/api/pdf/download/{file_id}')
+    assert response.status_code == 200
+    assert response.headers['X-Accel-Redirect'] == f'/protected-uploads/ab/{CONTENT_HASH}.pdf'
+    assert 'X-Sendfile' not in response.headers
+    assert response.headers['ETag'] == f'"{CONTENT_HASH}"'
+    assert response.data == b''
+
+
+def test_x_sendfile_mode_emits_sendfile_header(app, admin_client, stored):
+    file_id, file_path = stored
+    app.config['PDF_DELIVERY_MODE'] = 'x-sendfile'
+    response = admin_client.get(f'/api/pdf/download/{file_id}')
+    assert response.status_code == 200
+    assert response.headers['X-Sendfile'] == file_path
+    assert 'X-Accel-Redirect' not in response.headers
+
+
+def test_x_accel_falls_back_to_python_outside_upload_folder(app, admin_client, tmp_path):
+    file_id = _attach(app, str(tmp_path / 'legacy.pdf'))
+    app.config['PDF_DELIVERY_MODE'] = 'x-accel'
+    response = admin_client.get(f'/api/pdf/view/{file_id}')
+    assert response.status_code == 200
+    assert 'X-Accel-Redirect' not in response.headers
+    assert 'X-Sendfile' not in response.headers
+    assert response.data == CONTENT
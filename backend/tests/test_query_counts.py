@@ -0,0 +1,41 @@
+"""عدد الاستعلامات في مسارات القوائم ثابت مهما زاد عدد الصفوف (لا استعلامات N+1)"""
+
+import pytest
+
+from conftest import count_queries, seed
+
+SEED_ROWS = 5
+
+LIST_ENDPOINTS = [
+    ('admin_client', '/api/admin/requests'),
+    ('admin_client', '/api/admin/requests?limit=100'),
+    ('admin_client', '/api/pdf/admin/files'),
+    ('admin_client', '/api/admin/export/requests'),
+    ('admin_client', '/api/admin/export/requests?format=ndjson'),
+    ('admin_client', '/api/admin/export/requests?format=csv'),
+    ('user_client', '/api/requests'),
+    ('user_client', '/api/requests?limit=100'),
+    ('user_client', '/api/pdf/user-files'),
+]
+
+
+def _measure(app, client, url):
+    with count_queries(app) as counter:
+        response = client.get(url)
+        body = response.get_data()
+    assert response.status_code == 200, body[:200]
+    return counter['count'], len(body)
+
+
+@pytest.mark.parametrize('client_name, url', LIST_ENDPOINTS)
+def test_list_query_count_is_constant(app, request, client_name, url):
+    client = request.getfixturevalue(client_name)
+
+    seed(app, SEED_ROWS)
+    queries, size = _measure(app, client, url)
+
+    seed(app, SEED_ROWS)
+    queries_doubled, size_doubled = _measure(app, client, url)
+
+    assert size_doubled > size
+    assert queries_doubled == queries, f'{url}: {queries} queries for N rows, {queries_doubled} for 2N'
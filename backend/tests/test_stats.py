@@ -0,0 +1,61 @@
+"""عدادات الإحصائيات: القراءة لا تكتب، التحديث مستقل عن STATS_USE_COUNTERS، والإبطال بعد الحفظ"""
+
+from conftest import seed
+from src.models import db, Request, RequestCounter
+from src.utils.stats import get_request_stats, record_request_created
+
+
+def _counters(app):
+    with app.app_context():
+        return dict(db.session.query(RequestCounter.name, RequestCounter.value).all())
+
+
+def test_bootstrap_builds_counters(app):
+    assert _counters(app)['total'] == 0
+
+
+def test_missing_counters_fall_back_without_writing(app, admin_client):
+    seed(app, 2)
+    with app.app_context():
+        db.session.query(RequestCounter).delete()
+        db.session.commit()
+    app.config['STATS_USE_COUNTERS'] = True
+
+    response = admin_client.get('/api/admin/statistics')
+    assert response.status_code == 200
+    assert response.get_json()['total_requests'] == 4
+    assert _counters(app) == {}
+
+
+def test_counters_follow_changes_while_disabled(app, user_client, admin_client):
+    assert not app.config.get('STATS_USE_COUNTERS')
+    response = user_client.post('/api/requests', json={'type': 'consultation', 'data': {
+        'consultationType': 'عامة', 'description': 'استشارة'}})
+    assert response.status_code == 201, response.get_json()
+
+    counters = _counters(app)
+    assert counters['total'] == 1
+    assert counters['type:consultation'] == 1
+    assert counters['status:pending'] == 1
+
+    app.config['STATS_USE_COUNTERS'] = True
+    assert admin_client.get('/api/admin/statistics').get_json()['consultation_requests'] == 1
+
+
+def test_cache_is_invalidated_after_commit(app):
+    app.config['STATS_CACHE_TTL'] = 60
+    with app.app_context():
+        assert get_request_stats()['total'] == 0
+
+        new_request = Request(user_id=1, type='medical_request', status='pending')
+        new_request.set_data({})
+        db.session.add(new_request)
+        record_request_created('medical_request')
+        db.session.flush()
+
+        # قراءة متزامنة قبل الحفظ تخزن الأرقام القديمة
+        with app.app_context():
+            assert get_request_stats()['total'] == 0
+
+        db.session.commit()
+        assert get_request_stats()['total'] == 1
@@ -0,0 +1,115 @@
+"""انتقالات الحالة: نفس القواعد في المسارات الفردية والمجمعة، وملخص المجمع مما حُدّث فعلاً"""
+
+import io
+
+from sqlalchemy import event
+
+from src.models import db, Request
+from src.utils.bulk import bulk_update_status
+
+PROCESS_DATA = {'doctorName': 'د. أحمد', 'doctorSpecialty': 'باطنية', 'doctorPhone': '0500000000'}
+
+
+def _create(app, status, request_type='consultation', count=1):
+    with app.app_context():
+        requests = [Request(user_id=1, type=request_type, status=status) for _ in range(count)]
+        for req in requests:
+            req.set_data({})
+        db.session.add_all(requests)
+        db.session.commit()
+        return [req.id for req in requests]
+
+
+def _status(app, request_id):
+    with app.app_context():
+        return db.session.get(Request, request_id).status
+
+
+def test_status_put_rejects_disallowed_transition(app, admin_client):
+    request_id, = _create(app, 'cancelled')
+    response = admin_client.put(f'/api/admin/requests/{request_id}/status', json={'status': 'completed'})
+    assert response.status_code == 400
+    assert _status(app, request_id) == 'cancelled'
+
+    response = admin_client.put(f'/api/admin/requests/{request_id}/status', json={'status': 'pending'})
+    assert response.status_code == 200
+    assert _status(app, request_id) == 'pending'
+
+
+def test_admin_put_rejects_disallowed_transition(app, admin_client):
+    request_id, = _create(app, 'completed')
+    response = admin_client.put(f'/api/admin/requests/{request_id}', json={'status': 'cancelled'})
+    assert response.status_code == 400
+    assert _status(app, request_id) == 'completed'
+
+    # إبقاء الحالة مع تعديل الملاحظات مسموح
+    response = admin_client.put(f'/api/admin/requests/{request_id}', json={'status': 'completed', 'notes': 'تم'})
+    assert response.status_code == 200
+
+
+def test_process_rejects_cancelled_request(app, admin_client):
+    cancelled_id, pending_id = _create(app, 'cancelled') + _create(app, 'pending')
+    assert admin_client.post(f'/api/admin/requests/{cancelled_id}/process', json=PROCESS_DATA).status_code == 400
+    assert _status(app, cancelled_id) == 'cancelled'
+
+    assert admin_client.post(f'/api/admin/requests/{pending_id}/process', json=PROCESS_DATA).status_code == 200
+    assert _status(app, pending_id) == 'completed'
+
+
+def test_bulk_reports_only_rows_actually_updated(app):
+    ids = _create(app, 'pending', count=3)
+    raced_id = ids[1]
+
+    with app.app_context():
+        engine = db.engine
+        state = {'done': False}
+
+        def concurrent_cancel(conn, cursor, statement, parameters, context, executemany):
+            # تعديل متزامن بين قراءة الدفعة وتحديثها
+            if not state['done'] and statement.lstrip().upper().startswith('UPDATE REQUEST '):
+                state['done'] = True
+                cursor.execute("UPDATE request SET status = 'cancelled' WHERE id = ?", (raced_id,))
+
+        event.listen(engine, 'before_cursor_execute', concurrent_cancel)
+        try:
+            summary = bulk_update_status('in_progress', ids=ids, verbose=True)
+        finally:
+            event.remove(engine, 'before_cursor_execute', concurrent_cancel)
+
+    assert state['done']
+    assert summary['updated'] == 2
+    assert summary['transitions'] == {'pending': 2}
+    assert summary['updated_ids'] == [ids[0], ids[2]]
+    assert summary['skipped_ids'] == [raced_id]
+    assert _status(app, raced_id) == 'cancelled'
+
+
+PDF = b'%PDF-1.4\n' + b'0' * 64 + b'\n%%EOF\n'
+
+
+def test_pdf_upload_rejects_cancelled_request(app, admin_client):
+    request_id, = _create(app, 'cancelled', request_type='medical_request')
+
+    response = admin_client.post(f'/api/pdf/upload/{request_id}', data={'file': (io.BytesIO(PDF), 'a.pdf')},
+                                 content_type='multipart/form-data')
+    assert response.status_code == 400
+    response = admin_client.post(f'/api/pdf/upload/{request_id}/stream?filename=a.pdf', data=PDF,
+                                 headers={'Content-Type': 'application/pdf'})
+    assert response.status_code == 400
+    response = admin_client.post('/api/pdf/uploads', json={'request_id': request_id, 'filename': 'a.pdf', 'size': len(PDF)})
+    assert response.status_code == 400
+    assert _status(app, request_id) == 'cancelled'
+
+
+def test_resumable_upload_rejects_request_cancelled_meanwhile(app, admin_client):
+    request_id, = _create(app, 'pending', request_type='medical_request')
+    upload = admin_client.post('/api/pdf/uploads', json={'request_id': request_id, 'filename': 'a.pdf', 'size': len(PDF)})
+    assert upload.status_code == 201
+    assert admin_client.put(f'/api/admin/requests/{request_id}/status', json={'status': 'cancelled'}).status_code == 200
+
+    response = admin_client.patch(f"/api/pdf/uploads/{upload.get_json()['upload_id']}", data=PDF,
+                                  headers={'Upload-Offset': '0', 'Content-Type': 'application/offset+octet-stream'})
+    assert response.status_code == 400
+    assert _status(app, request_id) == 'cancelled'
+    with app.app_context():
+        assert not db.session.get(Request, request_id).pdf_files
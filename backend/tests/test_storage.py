@@ -0,0 +1,168 @@
+"""
+حذف الملفات الموزعة: بعد حفظ حذف السجل فقط، ودون حذف ملف أعاد رفع متزامن استخدامه
+والفحص الدوري (reconcile_storage): المفقود، اختلاف الحجم، اليتيم بعد مهلة السماح، وتقرير السلامة
+"""
+
+import os
+import time
+
+from src.models import db, Request, PDFFile
+from src.utils.storage import RELEASE_GRACE_SECONDS, get_storage, reconcile_storage
+
+CONTENT = b'%PDF-1.4\nshared\n%%EOF\n'
+
+
+def _store(app, content=CONTENT):
+    """حفظ المحتوى عبر commit_temp كما في الرفع؛ يُرجع (المسار، البصمة)"""
+    import hashlib
+    with app.test_request_context():
+        storage = get_storage()
+        temp_path = storage.temp_path()
+        with open(temp_path, 'wb') as handle:
+            handle.write(content)
+        content_hash = hashlib.sha256(content).hexdigest()
+        return storage.commit_temp(temp_path, content_hash), content_hash
+
+
+def _age(path, seconds=RELEASE_GRACE_SECONDS * 2):
+    old = time.time() - seconds
+    os.utime(path, (old, old))
+
+
+def _attach(app, file_path, content_hash, file_size=len(CONTENT)):
+    with app.app_context():
+        req = Request(user_id=1, type='medical_request', status='pending')
+        req.set_data({})
+        db.session.add(req)
+        db.session.flush()
+        pdf_file = PDFFile(request_id=req.id, filename=os.path.basename(file_path), original_filename='a.pdf',
+                           file_path=file_path, file_size=file_size, content_hash=content_hash)
+        db.session.add(pdf_file)
+        db.session.commit()
+        return pdf_file.id
+
+
+def test_delete_removes_unreferenced_blob_after_commit(app, admin_client):
+    file_path, content_hash = _store(app)
+    file_id = _attach(app, file_path, content_hash)
+    _age(file_path)
+
+    response = admin_client.delete(f'/api/pdf/admin/files/{file_id}')
+    assert response.status_code == 200
+    assert not os.path.exists(file_path)
+    with app.app_context():
+        assert db.session.get(PDFFile, file_id) is None
+
+
+def test_delete_keeps_blob_while_dedup_upload_is_uncommitted(app, admin_client):
+    file_path, content_hash = _store(app)
+    file_id = _attach(app, file_path, content_hash)
+    _age(file_path)
+
+    # رفع متزامن بنفس المحتوى: أعاد استخدام الملف ولم يُحفظ سجله بعد
+    dedup_path, _ = _store(app)
+    assert dedup_path == file_path
+
+    assert admin_client.delete(f'/api/pdf/admin/files/{file_id}').status_code == 200
+    assert os.path.exists(file_path)
+
+    _attach(app, dedup_path, content_hash)
+    assert os.path.exists(file_path)
+
+
+def test_delete_keeps_blob_referenced_by_another_row(app, admin_client):
+    file_path, content_hash = _store(app)
+    first_id = _attach(app, file_path, content_hash)
+    _attach(app, file_path, content_hash)
+    _age(file_path)
+
+    assert admin_client.delete(f'/api/pdf/admin/files/{first_id}').status_code == 200
+    assert os.path.exists(file_path)
+
+
+def _scan_fixture(app):
+    """ثلاثة سجلات: سليم، ملفه محذوف من القرص، وحجمه المسجل خاطئ"""
+    ok_path, ok_hash = _store(app, b'%PDF-1.4\nok\n%%EOF\n')
+    gone_path, gone_hash = _store(app, b'%PDF-1.4\ngone\n%%EOF\n')
+    bad_path, bad_hash = _store(app, b'%PDF-1.4\nbad size\n%%EOF\n')
+    ids = {
+        'ok': _attach(app, ok_path, ok_hash, os.path.getsize(ok_path)),
+        'missing': _attach(app, gone_path, gone_hash, os.path.getsize(gone_path)),
+        'mismatch': _attach(app, bad_path, bad_hash, 999),
+    }
+    os.remove(gone_path)
+    return ids, gone_path, bad_path
+
+
+def test_reconcile_flags_missing_and_size_mismatch(app):
+    ids, gone_path, bad_path = _scan_fixture(app)
+    with app.app_context():
+        report = reconcile_storage()
+        assert report['files_checked'] == 3
+        assert [item['id'] for item in report['missing']] == [ids['missing']]
+        assert report['size_mismatch'] == [{'id': ids['mismatch'], 'file_path': bad_path,
+                                            'recorded_size': 999, 'actual_size': os.path.getsize(bad_path)}]
+        flags = {pdf_file.id: (pdf_file.exists_on_disk, pdf_file.size_mismatch, pdf_file.verified_at is not None)
+                 for pdf_file in PDFFile.query}
+    assert flags == {
+        ids['ok']: (True, False, True),
+        ids['missing']: (False, False, True),
+        ids['mismatch']: (True, True, True),
+    }
+
+
+def test_reconcile_reports_orphans_only_after_grace(app):
+    referenced_path, content_hash = _store(app)
+    _attach(app, referenced_path, content_hash)
+    fresh_path, _ = _store(app, b'%PDF-1.4\nfresh orphan\n%%EOF\n')
+    old_path, _ = _store(app, b'%PDF-1.4\nold orphan\n%%EOF\n')
+    _age(old_path, 7200)
+    _age(referenced_path, 7200)
+
+    with app.app_context():
+        report = reconcile_storage(grace_seconds=3600)
+    assert report['orphans'] == [old_path]
+    assert fresh_path not in report['orphans'] and referenced_path not in report['orphans']
+    # الفحص يبلغ فقط ولا يحذف
+    assert os.path.exists(old_path)
+
+
+def test_integrity_endpoint_and_scan_command(app, admin_client):
+    ids, _, _ = _scan_fixture(app)
+    before = admin_client.get('/api/pdf/admin/integrity').get_json()
+    assert before['scanned_at'] is None
+    assert before['unverified_count'] == 3 and before['missing_count'] == 0
+
+    result = app.test_cli_runner().invoke(args=['scan-pdf-files'])
+    assert result.exit_code == 0, result.output
+    assert '1 مفقود' in result.output
+
+    report = admin_client.get('/api/pdf/admin/integrity').get_json()
+    assert report['scanned_at'] is not None
+    assert (report['total_files'], report['missing_count'], report['size_mismatch_count'],
+            report['unverified_count']) == (3, 1, 1, 0)
+    assert [item['id'] for item in report['missing']] == [ids['missing']]
+    assert report['missing'][0]['file_exists'] is False
+    assert [item['id'] for item in report['size_mismatch']] == [ids['mismatch']]
+
+    rescanned = admin_client.get('/api/pdf/admin/integrity?scan=1').get_json()
+    assert rescanned['missing_count'] == 1
+
+
+def test_to_dict_does_not_touch_disk(app, monkeypatch):
+    _scan_fixture(app)
+    with app.app_context():
+        reconcile_storage()
+        files = PDFFile.query.order_by(PDFFile.id).all()
+
+        def no_disk(*args, **kwargs):
+            raise AssertionError('to_dict accessed the disk')
+
+        for name in ('stat', 'lstat', 'scandir'):
+            monkeypatch.setattr(os, name, no_disk)
+        for name in ('exists', 'isfile', 'getsize', 'getmtime'):
+            monkeypatch.setattr(os.path, name, no_disk)
+        serialized = [pdf_file.to_dict() for pdf_file in files]
+        monkeypatch.undo()
+
+    assert [item['file_exists'] for item in serialized] == [True, False, True]
@@ -0,0 +1,84 @@
+"""حدود الرفع بالتدفق (MAX_PDF_UPLOAD_SIZE لا MAX_CONTENT_LENGTH) وقفل إلحاق أجزاء الرفع المجزأ"""
+
+import io
+import threading
+import time
+
+import pytest
+
+from src.models import db, Request
+from src.utils.storage import get_storage
+from src.utils.uploads import OffsetMismatch, UploadSession
+
+
+def _pdf(size):
+    body = b'%PDF-1.4\n'
+    trailer = b'\n%%EOF\n'
+    return body + b'0' * (size - len(body) - len(trailer)) + trailer
+
+
+@pytest.fixture
+def target(app):
+    app.config.update(MAX_CONTENT_LENGTH=1024, MAX_PDF_UPLOAD_SIZE=8192)
+    with app.app_context():
+        req = Request(user_id=1, type='medical_request', status='pending')
+        req.set_data({})
+        db.session.add(req)
+        db.session.commit()
+        return req.id
+
+
+def _stream(client, request_id, content, **kwargs):
+    return client.post(f'/api/pdf/upload/{request_id}/stream?filename=a.pdf',
+                       headers={'Content-Type': 'application/pdf'}, **kwargs, data=content)
+
+
+def test_stream_upload_is_limited_by_pdf_size_not_request_size(app, admin_client, target):
+    response = _stream(admin_client, target, _pdf(4096))
+    assert response.status_code == 201, response.get_json()
+    assert response.get_json()['file']['file_size'] == 4096
+
+
+def test_stream_upload_over_pdf_limit_is_413(app, admin_client, target):
+    response = _stream(admin_client, target, _pdf(9000))
+    assert response.status_code == 413
+    assert 'error' in response.get_json()
+
+
+def test_chunked_stream_upload_over_pdf_limit_is_413(app, admin_client, target):
+    # بلا Content-Length: الحد يُطبق أثناء القراءة
+    response = admin_client.post(
+        f'/api/pdf/upload/{target}/stream?filename=a.pdf',
+        input_stream=io.BytesIO(_pdf(9000)),
+        headers={'Content-Type': 'application/pdf', 'Transfer-Encoding': 'chunked'},
+        environ_overrides={'wsgi.input_terminated': True},
+    )
+    assert response.status_code == 413
+
+
+class SlowStream(io.BytesIO):
+    def read(self, size=-1):
+        time.sleep(0.05)
+        return super().read(size)
+
+
+def test_concurrent_append_of_same_chunk_is_rejected(app):
+    content = _pdf(2048)
+    with app.app_context():
+        upload = UploadSession.create(get_storage(), 1, 'a.pdf', len(content))
+    results = []
+
+    def send():
+        try:
+            results.append(upload.append(SlowStream(content[:1024]), 0, len(content)))
+        except OffsetMismatch as e:
+            results.append(('mismatch', e.offset))
+
+    threads = [threading.Thread(target=send) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == 2 and 1024 in results and ('mismatch', 1024) in results
+    assert upload.offset == 1024
@@ -0,0 +1,28 @@
+"""ETag قائمة ملفات المستخدم: 304 دون تغيير، ويتغير مع أي تعديل على الملفات لا مع العدد وأحدث رفع فقط"""
+
+from conftest import seed
+from src.models import db, PDFFile
+
+
+def test_unchanged_list_is_not_modified(app, user_client):
+    seed(app, 2)
+    first = user_client.get('/api/pdf/user-files')
+    assert first.status_code == 200 and len(first.get_json()) == 2
+
+    again = user_client.get('/api/pdf/user-files', headers={'If-None-Match': first.headers['ETag']})
+    assert again.status_code == 304
+
+
+def test_etag_changes_when_a_file_changes_in_place(app, user_client):
+    seed(app, 2)
+    first = user_client.get('/api/pdf/user-files')
+
+    # نفس العدد ونفس أحدث رفع ولا ملفات قيد المعالجة: المفتاح السابق لم يكن يتغير
+    with app.app_context():
+        pdf_file = PDFFile.query.order_by(PDFFile.id).first()
+        pdf_file.original_filename = 'renamed.pdf'
+        db.session.commit()
+
+    second = user_client.get('/api/pdf/user-files', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert 'renamed.pdf' in {item['original_filename'] for item in second.get_json()}